@@ -0,0 +1,263 @@
+"""
+PDF下载引擎吞吐量基准测试
+
+在本机启动一个模拟的PDF服务器（asyncio，HTTP/1.1 长连接，支持 Range），
+按可配置的首字节延迟和单连接带宽返回合成PDF，然后分别用线程池引擎
+（PDFDownloader）和异步引擎（AsyncPDFDownloader，每个已安装的HTTP客户端）
+下载同一批论文，报告耗时、文件/秒和MB/秒，并检查所有文件完整。
+
+论文分布在多个"主机"上：127.0.0.1、127.0.0.2 …（都是回环地址），
+以便按主机的连接池和并发限制生效。限速器不限速，测量的是引擎本身。
+
+用法:
+    python benchmarks/bench_download.py
+    python benchmarks/bench_download.py --papers 5000 --latency 0.2 --bandwidth 512
+    python benchmarks/bench_download.py --engine async-httpx --concurrency 2000
+    python benchmarks/bench_download.py --check-upgrade   # 在旧表结构的数据库上下载，失败时返回非0
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from paper_tools import AsyncPDFDownloader, PDFDownloader, is_complete_pdf  # noqa: E402
+from utils.database import DatabaseManager  # noqa: E402
+from utils.models import Paper  # noqa: E402
+from utils.rate_limiter import RateLimiter  # noqa: E402
+
+
+def synthetic_pdf(size: int) -> bytes:
+    """指定大小的合成PDF（有 %PDF- 文件头和 %%EOF 结尾）"""
+    head, tail = b'%PDF-1.4\n', b'\n%%EOF\n'
+    return head + b'0' * max(0, size - len(head) - len(tail)) + tail
+
+
+class PDFServer:
+    """
+    在后台线程的事件循环中运行的模拟PDF服务器
+    
+    每个请求先等待 latency 秒再返回响应头，响应体按 bandwidth（字节/秒，
+    0表示不限）分块发送。所有路径都返回同一个合成PDF。
+    """
+    
+    def __init__(self, hosts, body: bytes, latency: float, bandwidth: int):
+        self.hosts = hosts
+        self.body = body
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.port = None
+        self.requests = 0
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+    
+    def __enter__(self):
+        self._thread.start()
+        self._ready.wait()
+        return self
+    
+    def __exit__(self, *exc):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+    
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        # 端口0时每个地址会分到不同端口：先绑定第一个地址，其余地址使用同一端口
+        servers = [self._loop.run_until_complete(
+            asyncio.start_server(self._handle, self.hosts[0], 0, backlog=4096))]
+        self.port = servers[0].sockets[0].getsockname()[1]
+        if self.hosts[1:]:
+            servers.append(self._loop.run_until_complete(
+                asyncio.start_server(self._handle, self.hosts[1:], self.port, backlog=4096)))
+        self._ready.set()
+        self._loop.run_forever()
+        for server in servers:
+            server.close()
+        # 取消仍在处理的长连接，再关闭事件循环
+        tasks = asyncio.all_tasks(self._loop)
+        for task in tasks:
+            task.cancel()
+        self._loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        self._loop.close()
+    
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                head = await reader.readuntil(b'\r\n\r\n')
+                self.requests += 1
+                headers = {}
+                for line in head.decode('latin-1').split('\r\n')[1:]:
+                    name, _, value = line.partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                body = memoryview(self.body)
+                status = '200 OK'
+                extra = ''
+                range_header = headers.get('range', '')
+                if range_header.startswith('bytes='):
+                    start = int(range_header[len('bytes='):].split('-')[0])
+                    if start >= len(self.body):
+                        writer.write(f"HTTP/1.1 416 Range Not Satisfiable\r\n"
+                                     f"Content-Range: bytes */{len(self.body)}\r\n"
+                                     f"Content-Length: 0\r\n\r\n".encode())
+                        continue
+                    status = '206 Partial Content'
+                    extra = f"Content-Range: bytes {start}-{len(self.body) - 1}/{len(self.body)}\r\n"
+                    body = body[start:]
+                writer.write(f"HTTP/1.1 {status}\r\nContent-Type: application/pdf\r\n"
+                             f"Content-Length: {len(body)}\r\n{extra}\r\n".encode())
+                
+                if not self.bandwidth:
+                    writer.write(body)
+                    await writer.drain()
+                    continue
+                step = max(1, min(64 * 1024, self.bandwidth // 10))
+                for i in range(0, len(body), step):
+                    writer.write(body[i:i + step])
+                    await writer.drain()
+                    await asyncio.sleep(step / self.bandwidth)
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            # 关闭服务器时取消仍保持着的长连接，正常结束
+            pass
+        finally:
+            writer.close()
+
+
+def prepare_db(path: str, papers: int, hosts, port: int):
+    """建立论文数据库，论文轮流分配到各主机"""
+    with DatabaseManager(path) as db:
+        db.upsert_papers(Paper(f"Paper {i}", 'CRYPTO', 2025,
+                               pdf_url=f"http://{hosts[i % len(hosts)]}:{port}/{i}.pdf")
+                         for i in range(papers))
+
+
+# 本系列改动之前的表结构（只有 papers 和 download_log），用于检查旧数据库的升级
+LEGACY_SCHEMA = """
+    CREATE TABLE papers (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        authors TEXT,
+        abstract TEXT,
+        year INTEGER,
+        conference TEXT NOT NULL,
+        url TEXT,
+        pdf_url TEXT,
+        pdf_path TEXT,
+        doi TEXT,
+        dblp_key TEXT UNIQUE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        download_status TEXT DEFAULT 'pending',
+        notes TEXT
+    );
+    CREATE INDEX idx_conference_year ON papers(conference, year);
+    CREATE INDEX idx_download_status ON papers(download_status);
+    CREATE TABLE download_log (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        paper_id INTEGER,
+        attempt_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        status TEXT,
+        error_message TEXT,
+        FOREIGN KEY (paper_id) REFERENCES papers(id)
+    );
+"""
+
+
+def prepare_legacy_db(path: str, papers: int, hosts, port: int):
+    """用旧表结构建立论文数据库，不经过 DatabaseManager（由下载器打开时升级）"""
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.executescript(LEGACY_SCHEMA)
+        conn.executemany(
+            "INSERT INTO papers (title, year, conference, pdf_url) VALUES (?, ?, ?, ?)",
+            [(f"Paper {i}", 2025, 'CRYPTO', f"http://{hosts[i % len(hosts)]}:{port}/{i}.pdf")
+             for i in range(papers)])
+    conn.close()
+
+
+def run_engine(name: str, db_path: str, workdir: str, args) -> dict:
+    """用一个引擎下载全部论文，返回统计"""
+    output_dir = os.path.join(workdir, name)
+    options = dict(db_path=db_path, output_dir=output_dir,
+                   rate_limiter=RateLimiter(default_rate=0), chunk_size=args.chunk_size * 1024)
+    if name == 'thread':
+        downloader = PDFDownloader(**options)
+        workers = args.workers
+    else:
+        downloader = AsyncPDFDownloader(client=name.split('-', 1)[1], **options)
+        workers = args.concurrency
+    
+    started = time.perf_counter()
+    stats = downloader.download_batch(max_workers=workers, max_per_host=args.per_host)
+    elapsed = time.perf_counter() - started
+    
+    # 只统计 <会议>_<年份>/ 下的文件（objects/ 中的对象是它们的硬链接）
+    files = [os.path.join(root, f) for root, _, names in os.walk(output_dir)
+             for f in names if f.endswith('.pdf')]
+    complete = sum(1 for f in files if is_complete_pdf(f))
+    return {'elapsed': elapsed, 'success': stats['success'], 'complete': complete,
+            'bytes': sum(os.path.getsize(f) for f in files)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='PDF下载引擎吞吐量基准测试')
+    parser.add_argument('--papers', type=int, default=1000, help='论文数')
+    parser.add_argument('--hosts', type=int, default=4, help='主机数（127.0.0.1 起的回环地址）')
+    parser.add_argument('--size', type=int, default=256, help='每个PDF的大小(KB)')
+    parser.add_argument('--latency', type=float, default=0.1, help='首字节延迟(秒)')
+    parser.add_argument('--bandwidth', type=int, default=1024, help='单连接带宽(KB/秒)，0表示不限')
+    parser.add_argument('--engine', action='append', help='只测试指定引擎，可重复，如 thread、async-httpx')
+    parser.add_argument('--workers', type=int, default=32, help='线程池引擎的线程数')
+    parser.add_argument('--concurrency', type=int, default=1000, help='异步引擎同时进行的最多下载数')
+    parser.add_argument('--per-host', type=int, default=1000, help='每个主机的并发上限')
+    parser.add_argument('--chunk-size', type=int, default=256, help='读写块大小(KB)')
+    parser.add_argument('--check-upgrade', action='store_true',
+                        help='在旧表结构的数据库上下载（升级路径检查），有论文未下载时返回非0')
+    args = parser.parse_args()
+    
+    logging.getLogger().setLevel(logging.WARNING)
+    engines = args.engine or ['thread'] + [
+        f"async-{client}" for client in AsyncPDFDownloader.available_modules(*AsyncPDFDownloader.CLIENTS)]
+    hosts = [f"127.0.0.{i + 1}" for i in range(args.hosts)]
+    body = synthetic_pdf(args.size * 1024)
+    
+    print(f"论文: {args.papers}  主机: {args.hosts}  大小: {args.size} KB  "
+          f"延迟: {args.latency * 1000:.0f} ms  单连接带宽: {args.bandwidth or '不限'} KB/s\n")
+    print(f"{'引擎':<16} {'并发':>6} {'耗时(s)':>9} {'文件/秒':>9} {'MB/秒':>8} {'完整':>11}")
+    print('-' * 66)
+    
+    failures = 0
+    with tempfile.TemporaryDirectory() as workdir, \
+            PDFServer(hosts, body, args.latency, args.bandwidth * 1024) as server:
+        for name in engines:
+            # 下载器会记录下载状态，每个引擎使用自己的数据库
+            db_path = os.path.join(workdir, f"{name}.db")
+            if args.check_upgrade:
+                prepare_legacy_db(db_path, args.papers, hosts, server.port)
+            else:
+                prepare_db(db_path, args.papers, hosts, server.port)
+            result = run_engine(name, db_path, workdir, args)
+            failures += result['complete'] != args.papers
+            concurrency = args.workers if name == 'thread' else args.concurrency
+            print(f"{name:<16} {concurrency:>6} {result['elapsed']:>9.2f} "
+                  f"{args.papers / result['elapsed']:>9.0f} "
+                  f"{result['bytes'] / result['elapsed'] / 1e6:>8.1f} "
+                  f"{result['complete']:>5}/{args.papers:<5}")
+    
+    if args.check_upgrade and failures:
+        print(f"\n✗ {failures} 个引擎未能在旧表结构的数据库上下载全部论文")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
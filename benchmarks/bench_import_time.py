@@ -0,0 +1,147 @@
+"""
+命令行启动时间基准测试
+
+在子进程中运行只查询数据库的短命令（query_db.py、paper_tools.py 的状态和导出
+命令、update_iacr_data.py --help），用 -X importtime 统计命令自身导入模块的
+耗时，并测量整条命令的墙钟时间。同时检查这些命令没有导入爬虫、HTTP客户端和
+HTML解析库——它们应只在真正收集或下载时才导入（见 crawlers/registry.py）。
+
+测量前先用 compileall 生成字节码：cron 中反复运行的命令总是命中字节码缓存，
+环境设置了 PYTHONDONTWRITEBYTECODE 时不预编译会把编译时间算进导入耗时。
+
+用法:
+    python benchmarks/bench_import_time.py
+    python benchmarks/bench_import_time.py --check            # 超出预算时返回非0
+    python benchmarks/bench_import_time.py --repeat 20 --wall-budget 150
+"""
+import argparse
+import compileall
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# 短命令不应导入的模块
+HEAVY_MODULES = ('requests', 'urllib3', 'bs4', 'lxml', 'selectolax', 'aiohttp', 'asyncio',
+                 'crawlers.base_crawler', 'crawlers.html_backend', 'utils.rate_limiter')
+
+# (名称, 脚本及参数)；在临时目录中运行，数据库为 data/papers.db
+COMMANDS = [
+    ('query_db stats', ['query_db.py', '--db', 'data/papers.db', 'stats']),
+    ('query_db list', ['query_db.py', '--db', 'data/papers.db', 'list', '--limit', '5']),
+    ('query_db jobs', ['query_db.py', '--db', 'data/papers.db', 'jobs']),
+    ('paper_tools status-show', ['paper_tools.py', 'status-show']),
+    ('paper_tools export-links', ['paper_tools.py', 'export-links']),
+    ('update_iacr_data --help', ['update_iacr_data.py', '--help']),
+]
+
+
+def parse_importtime(stderr: str) -> dict:
+    """解析 -X importtime 输出，返回 {模块名: (累计耗时us, 嵌套层级)}，层级0为顶层导入"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        modules[name.strip()] = (int(cumulative), level)
+    return modules
+
+
+def startup_modules() -> set:
+    """解释器启动时（site 等）已导入的模块，不计入命令的导入耗时"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'pass'],
+                            capture_output=True, text=True)
+    return set(parse_importtime(result.stderr))
+
+
+def command_imports(argv, cwd: str, baseline: set):
+    """运行一次命令，返回 (命令导入耗时ms, 导入的模块集合)"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', *argv],
+                            capture_output=True, text=True, cwd=cwd)
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(argv)} 运行失败:\n{result.stderr[-2000:]}")
+    modules = parse_importtime(result.stderr)
+    # 只累加顶层导入（其累计耗时已包含子模块），跳过启动阶段的模块
+    total = sum(cumulative for name, (cumulative, level) in modules.items()
+                if level == 0 and name not in baseline)
+    return total / 1000, set(modules)
+
+
+def wall_time(argv, cwd: str, repeat: int) -> float:
+    """命令墙钟时间的中位数（毫秒）"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, *argv], capture_output=True, cwd=cwd, check=True)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def prepare_workdir(path: str):
+    """在临时目录中建立一个带论文和作业日志的数据库"""
+    from utils.database import DatabaseManager
+    from utils.models import Paper
+    
+    os.makedirs(os.path.join(path, 'data'))
+    with DatabaseManager(os.path.join(path, 'data', 'papers.db')) as db:
+        db.upsert_papers(Paper(f"Paper {i}", 'CRYPTO', 2025, authors='A. Author',
+                               url=f"https://eprint.iacr.org/2025/{i}",
+                               pdf_url=f"https://eprint.iacr.org/2025/{i}.pdf")
+                         for i in range(2000))
+        db.register_crawl_jobs([('CRYPTO', 2025)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='命令行启动时间基准测试')
+    parser.add_argument('--repeat', type=int, default=10, help='每条命令的运行次数')
+    parser.add_argument('--import-budget', type=float, default=40.0,
+                        help='命令自身导入耗时的预算（毫秒）')
+    parser.add_argument('--wall-budget', type=float, default=100.0,
+                        help='命令墙钟时间的预算（毫秒）')
+    parser.add_argument('--check', action='store_true', help='超出预算或导入了重型模块时返回非0')
+    args = parser.parse_args()
+    
+    # 跳过 .git 等隐藏目录
+    compileall.compile_dir(ROOT, quiet=1, rx=re.compile(r'[/\\]\.'))
+    baseline = startup_modules()
+    interpreter = wall_time(['-c', 'pass'], ROOT, args.repeat)
+    print(f"解释器启动: {interpreter:.0f} ms（已计入各命令的墙钟时间）\n")
+    print(f"{'命令':<28} {'导入(ms)':>9} {'墙钟(ms)':>9}  重型模块")
+    print('-' * 72)
+    
+    failures = []
+    with tempfile.TemporaryDirectory() as workdir:
+        prepare_workdir(workdir)
+        for name, argv in COMMANDS:
+            argv = [os.path.join(ROOT, argv[0])] + argv[1:]
+            # 第一次运行的导入耗时受磁盘缓存影响，取多次中的最小值
+            runs = [command_imports(argv, workdir, baseline) for _ in range(3)]
+            import_ms = min(ms for ms, _ in runs)
+            heavy = sorted(set(HEAVY_MODULES) & runs[0][1])
+            wall_ms = wall_time(argv, workdir, args.repeat)
+            print(f"{name:<28} {import_ms:>9.1f} {wall_ms:>9.0f}  {', '.join(heavy) or '-'}")
+            if import_ms > args.import_budget:
+                failures.append(f"{name}: 导入耗时 {import_ms:.1f} ms 超出预算 {args.import_budget:.0f} ms")
+            if wall_ms > args.wall_budget:
+                failures.append(f"{name}: 墙钟时间 {wall_ms:.0f} ms 超出预算 {args.wall_budget:.0f} ms")
+            if heavy:
+                failures.append(f"{name}: 导入了 {', '.join(heavy)}")
+    
+    print()
+    for failure in failures:
+        print(f"✗ {failure}")
+    if not failures:
+        print("✓ 所有命令都在预算内")
+    if args.check and failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,221 @@
+"""
+HTML解析后端基准测试
+
+对 benchmarks/fixtures 中保存的各会议页面，分别用每个已安装的后端
+（selectolax / lxml / bs4）运行 SecurityCrawler 的解析器，报告解析耗时和
+峰值内存，并检查各后端的解析结果是否完全一致。
+
+峰值内存在独立子进程中测量（解析库在C层分配的内存 tracemalloc 看不到），
+取解析前后进程峰值RSS之差。
+
+用法:
+    python benchmarks/bench_parsers.py
+    python benchmarks/bench_parsers.py --backend lxml --repeat 20
+    python benchmarks/bench_parsers.py --refresh     # 从官网重新保存页面
+    python benchmarks/bench_parsers.py --scale 10    # 条目数放大10倍，观察解析耗时是否线性增长
+    python benchmarks/bench_parsers.py --verify      # 回归检查：与保存的期望结果比较
+    python benchmarks/bench_parsers.py --update-expected
+
+每个样本旁的 <样本名>.expected.json 保存解析结果的期望值，修改解析器后
+用 --verify 确认输出不变；有意改变输出时用 --update-expected 重新生成。
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.make_fixtures import FIXTURES, FIXTURES_DIR  # noqa: E402
+from crawlers.html_backend import available_backends, parse_document  # noqa: E402
+from crawlers.security_crawler import SecurityCrawler  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def load_fixture(filename: str, scale: int = 1) -> str:
+    """读取样本；scale>1 时用同样的结构生成条目数放大后的页面"""
+    if scale > 1:
+        conference, year, generate, count = FIXTURES[filename]
+        return generate(random.Random(f"{conference}-{year}"), count * scale)
+    with open(os.path.join(FIXTURES_DIR, filename), 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def expected_path(filename: str) -> str:
+    return os.path.join(FIXTURES_DIR, os.path.splitext(filename)[0] + '.expected.json')
+
+
+def paper_record(paper) -> dict:
+    """期望结果中的论文记录（省略空字段）"""
+    return {key: value for key, value in paper.to_json().items() if value is not None}
+
+
+def parse_fixture(backend: str, filename: str, scale: int = 1):
+    """用指定后端解析样本，返回论文列表"""
+    conference, year = FIXTURES[filename][:2]
+    crawler = SecurityCrawler({'html_backend': backend})
+    try:
+        return crawler.parse(conference, year, load_fixture(filename, scale))
+    finally:
+        crawler.close()
+
+
+def peak_rss_kb() -> int:
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 以字节为单位，Linux 以KB为单位
+    return usage // 1024 if sys.platform == 'darwin' else usage
+
+
+def measure_memory(backend: str, filename: str, scale: int = 1) -> int:
+    """在子进程中测量一次解析的峰值内存增量（KB），无法测量时返回-1"""
+    if resource is None:
+        return -1
+    result = subprocess.run(
+        [sys.executable, __file__, '--memory-worker', backend, filename, '--scale', str(scale)],
+        capture_output=True, text=True, cwd=ROOT
+    )
+    if result.returncode != 0:
+        return -1
+    return int(result.stdout.strip())
+
+
+def memory_worker(backend: str, filename: str, scale: int):
+    """子进程入口：预热导入后解析一次，输出峰值RSS增量"""
+    parse_document('<p></p>', backend)
+    html = load_fixture(filename, scale)
+    baseline = peak_rss_kb()
+    conference, year = FIXTURES[filename][:2]
+    crawler = SecurityCrawler({'html_backend': backend})
+    crawler.parse(conference, year, html)
+    print(max(0, peak_rss_kb() - baseline))
+
+
+def time_parse(backend: str, filename: str, repeat: int, scale: int = 1) -> float:
+    """解析耗时的中位数（毫秒）"""
+    conference, year = FIXTURES[filename][:2]
+    html = load_fixture(filename, scale)
+    crawler = SecurityCrawler({'html_backend': backend})
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        crawler.parse(conference, year, html)
+        timings.append((time.perf_counter() - started) * 1000)
+    crawler.close()
+    return statistics.median(timings)
+
+
+def verify(backends) -> bool:
+    """用每个后端解析样本并与期望结果比较，返回是否全部一致"""
+    ok = True
+    for filename in FIXTURES:
+        with open(expected_path(filename), 'r', encoding='utf-8') as f:
+            expected = json.load(f)
+        for backend in backends:
+            actual = [paper_record(p) for p in parse_fixture(backend, filename)]
+            if actual == expected:
+                print(f"✓ {filename} [{backend}]: {len(actual)} 篇论文与期望一致")
+                continue
+            ok = False
+            diff = next((i for i, (a, e) in enumerate(zip(actual, expected)) if a != e),
+                        min(len(actual), len(expected)))
+            print(f"✗ {filename} [{backend}]: 得到 {len(actual)} 篇, 期望 {len(expected)} 篇, "
+                  f"第 {diff} 条起不同")
+    return ok
+
+
+def update_expected(backend: str):
+    """用指定后端重新生成期望结果"""
+    for filename in FIXTURES:
+        papers = [paper_record(p) for p in parse_fixture(backend, filename)]
+        with open(expected_path(filename), 'w', encoding='utf-8') as f:
+            # 每行一篇论文，便于查看差异
+            f.write('[\n' + ',\n'.join(json.dumps(p, ensure_ascii=False) for p in papers) + '\n]\n')
+        print(f"✓ {expected_path(filename)}: {len(papers)} 篇论文")
+
+
+def refresh_fixtures():
+    """从官网重新下载各会议页面，覆盖样本"""
+    crawler = SecurityCrawler({})
+    for filename, (conference, year, _, _) in FIXTURES.items():
+        url = crawler.build_url(conference, year)
+        content = crawler._fetch_url(url)
+        if not content:
+            print(f"✗ {conference} {year}: 无法获取 {url}")
+            continue
+        with open(os.path.join(FIXTURES_DIR, filename), 'w', encoding='utf-8') as f:
+            f.write(content)
+        print(f"✓ {conference} {year}: 已保存 {filename}")
+    crawler.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='HTML解析后端基准测试')
+    parser.add_argument('--backend', action='append', help='只测试指定后端，可重复')
+    parser.add_argument('--repeat', type=int, default=10, help='每个样本重复解析次数')
+    parser.add_argument('--scale', type=int, default=1, help='把样本条目数放大的倍数')
+    parser.add_argument('--refresh', action='store_true', help='从官网重新保存页面样本')
+    parser.add_argument('--verify', action='store_true', help='与期望结果比较（回归检查）')
+    parser.add_argument('--update-expected', action='store_true', help='重新生成期望结果')
+    parser.add_argument('--memory-worker', nargs=2, metavar=('BACKEND', 'FIXTURE'),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.memory_worker:
+        memory_worker(*args.memory_worker, args.scale)
+        return
+    if args.refresh:
+        refresh_fixtures()
+        return
+    
+    backends = args.backend or available_backends()
+    if args.update_expected:
+        update_expected(backends[0])
+        return
+    if args.verify:
+        sys.exit(0 if verify(backends) else 1)
+    
+    print(f"后端: {', '.join(backends)}  重复: {args.repeat}  放大: {args.scale}x\n")
+    print(f"{'样本':<26} {'后端':<11} {'论文':>6} {'耗时(ms)':>10} {'峰值内存(KB)':>13} {'相对bs4':>8}")
+    print('-' * 80)
+    
+    # 先测内存：Linux 上子进程会继承父进程的峰值RSS，必须在父进程解析任何页面之前测量
+    memory = {(backend, filename): measure_memory(backend, filename, args.scale)
+              for filename in FIXTURES for backend in backends}
+    
+    mismatches = []
+    for filename in FIXTURES:
+        results = {backend: [p.to_json() for p in parse_fixture(backend, filename, args.scale)]
+                   for backend in backends}
+        timings = {backend: time_parse(backend, filename, args.repeat, args.scale)
+                   for backend in backends}
+        reference = timings.get('bs4')
+        for backend in backends:
+            peak = memory[backend, filename]
+            speedup = f"{reference / timings[backend]:.1f}x" if reference else '-'
+            print(f"{filename:<26} {backend:<11} {len(results[backend]):>6} "
+                  f"{timings[backend]:>10.1f} {peak if peak >= 0 else '-':>13} {speedup:>8}")
+        
+        expected = results[backends[0]]
+        for backend in backends[1:]:
+            if results[backend] != expected:
+                mismatches.append((filename, backends[0], backend))
+        print()
+    
+    if mismatches:
+        for filename, first, other in mismatches:
+            print(f"✗ {filename}: {other} 的解析结果与 {first} 不同")
+        sys.exit(1)
+    print("✓ 所有后端的解析结果一致")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""
+下载状态扫描基准测试（paper_tools.py status-update）
+
+在临时目录中建立一个论文数据库和对应的PDF目录树（稀疏文件，不占磁盘），
+比较逐篇 glob 的旧扫描方式、单次 os.scandir 的全量扫描和按目录 mtime 的
+增量扫描（无变化 / 一个目录有新文件）的耗时，并检查各方式得到的下载状态一致。
+
+用法:
+    python benchmarks/bench_status_scan.py
+    python benchmarks/bench_status_scan.py --papers 50000 --dirs 40 --downloaded 0.8
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from paper_tools import DownloadManager, conference_dir  # noqa: E402
+from utils.database import DatabaseManager  # noqa: E402
+from utils.models import Paper  # noqa: E402
+
+
+def prepare(workdir: str, papers: int, dirs: int, downloaded: float, seed: int = 0) -> tuple:
+    """建立数据库和PDF目录树，返回 (数据库路径, PDF目录)"""
+    db_path = os.path.join(workdir, 'papers.db')
+    pdf_dir = os.path.join(workdir, 'pdfs')
+    with DatabaseManager(db_path) as db:
+        db.upsert_papers(Paper(f"Paper {i}", f"CONF{i % dirs}", 2025,
+                               pdf_url=f"https://example.org/{i}.pdf")
+                         for i in range(papers))
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("SELECT id, title, conference, year FROM papers").fetchall()
+    conn.close()
+    
+    rng = random.Random(seed)
+    for paper_id, title, conference, year in rows:
+        if rng.random() >= downloaded:
+            continue
+        path = Path(pdf_dir) / conference_dir(conference, year) / f"{paper_id}_{title}.pdf"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'wb') as f:
+            f.truncate(64 * 1024)
+    return db_path, pdf_dir
+
+
+def legacy_scan(db_path: str, pdf_dir: str):
+    """旧实现：每篇论文 glob 一次所在目录，逐行 UPDATE"""
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute("SELECT id, title, conference, year FROM papers "
+                   "WHERE pdf_url IS NOT NULL AND pdf_url != ''")
+    papers = cursor.fetchall()
+    cursor.execute("BEGIN")
+    for paper_id, title, conference, year in papers:
+        path = Path(pdf_dir) / conference_dir(conference, year)
+        downloaded = False
+        if path.exists():
+            for file in path.glob(f"{paper_id}_*.pdf"):
+                if file.is_file() and file.stat().st_size > 1024:
+                    downloaded = True
+                    break
+        cursor.execute("UPDATE papers SET download_status = ? WHERE id = ?",
+                       ('downloaded' if downloaded else 'pending', paper_id))
+    conn.commit()
+    conn.close()
+
+
+def statuses(db_path: str) -> dict:
+    """{论文ID: 下载状态}"""
+    conn = sqlite3.connect(db_path)
+    result = dict(conn.execute("SELECT id, download_status FROM papers"))
+    conn.close()
+    return result
+
+
+def reset(db_path: str):
+    """把所有论文改回 pending，清空扫描记录"""
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.execute("UPDATE papers SET download_status = 'pending', pdf_path = NULL, pdf_size = NULL")
+        conn.execute("DELETE FROM pdf_dir_scans")
+    conn.close()
+
+
+def timed(func, *args, **kwargs) -> float:
+    """运行一次，返回耗时（毫秒），丢弃输出"""
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        func(*args, **kwargs)
+    return (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='下载状态扫描基准测试')
+    parser.add_argument('--papers', type=int, default=20000, help='论文数')
+    parser.add_argument('--dirs', type=int, default=20, help='会议目录数')
+    parser.add_argument('--downloaded', type=float, default=0.9, help='已下载论文的比例')
+    parser.add_argument('--skip-legacy', action='store_true', help='不运行旧实现（论文多时很慢）')
+    args = parser.parse_args()
+    
+    print(f"论文: {args.papers}  目录: {args.dirs}  已下载: {args.downloaded:.0%}\n")
+    print(f"{'扫描方式':<28} {'耗时(ms)':>10}")
+    print('-' * 40)
+    
+    with tempfile.TemporaryDirectory() as workdir:
+        db_path, pdf_dir = prepare(workdir, args.papers, args.dirs, args.downloaded)
+        manager = DownloadManager(db_path=db_path, pdf_dir=pdf_dir)
+        
+        expected = None
+        if not args.skip_legacy:
+            print(f"{'逐篇 glob（旧）':<28} {timed(legacy_scan, db_path, pdf_dir):>10.0f}")
+            expected = statuses(db_path)
+            reset(db_path)
+        
+        print(f"{'scandir 全量（首次）':<28} {timed(manager.update_download_status):>10.0f}")
+        print(f"{'scandir 全量（无变化）':<28} {timed(manager.update_download_status):>10.0f}")
+        result = statuses(db_path)
+        # 全量扫描同样记录了各目录的 mtime
+        print(f"{'增量（无变化）':<28} {timed(manager.update_download_status, incremental=True):>10.0f}")
+        
+        # 一个目录中新增一个文件
+        conn = sqlite3.connect(db_path)
+        paper = conn.execute("SELECT id, title, conference, year FROM papers "
+                             "WHERE download_status = 'pending' LIMIT 1").fetchone()
+        conn.close()
+        if paper is not None:
+            path = Path(pdf_dir) / conference_dir(paper[2], paper[3]) / f"{paper[0]}_{paper[1]}.pdf"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, 'wb') as f:
+                f.truncate(64 * 1024)
+            print(f"{'增量（一个目录有新文件）':<28} "
+                  f"{timed(manager.update_download_status, incremental=True):>10.0f}")
+            found = statuses(db_path)[paper[0]] == 'downloaded'
+            print(f"\n新文件已被发现: {'是' if found else '否'}")
+        
+        if expected is not None:
+            mismatched = sum(1 for paper_id, status in expected.items() if result[paper_id] != status)
+            print(f"与旧实现的结果一致: {'是' if not mismatched else f'否（{mismatched} 篇不同）'}")
+
+
+if __name__ == '__main__':
+    main()
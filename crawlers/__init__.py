@@ -1,7 +1,25 @@
 """
 爬虫包初始化文件
+
+包内的类在第一次访问时才导入（PEP 562），导入 crawlers.registry 等轻量模块
+不会连带导入 requests 和HTML解析库。
 """
-from .base_crawler import BaseCrawler
-from .iacr_crawler import IACRCrawler
+import importlib
+
+_EXPORTS = {
+    'BaseCrawler': 'crawlers.base_crawler',
+    'CrawlError': 'crawlers.base_crawler',
+    'IACRCrawler': 'crawlers.iacr_crawler',
+    'SecurityCrawler': 'crawlers.security_crawler',
+}
+
+__all__ = sorted(_EXPORTS)
+
 
-__all__ = ['BaseCrawler', 'IACRCrawler']
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,230 @@
+"""
+异步爬取引擎 - 并发抓取所有 (会议, 年份) 目标
+
+抓取使用 aiohttp（已安装时），否则退回到在线程池中调用爬虫自身的
+BaseCrawler.fetch；解析复用各爬虫的 parse 方法。每个目标完成后立即回调，
+调用方可以边爬边写数据库。爬虫配置了响应缓存（crawlers.http_cache）时，
+两种方式都会使用缓存和条件请求。
+"""
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from crawlers.base_crawler import BaseCrawler, CrawlTarget
+from crawlers.http_cache import ResponseCache
+from utils.models import Paper
+from utils.rate_limiter import RateLimiter, CircuitOpenError, RETRY_STATUSES, parse_retry_after
+
+try:
+    import aiohttp
+except ImportError:  # 可选依赖
+    aiohttp = None
+
+logger = logging.getLogger(__name__)
+
+# 目标完成回调: (会议名称, 年份, 论文列表或None表示抓取失败)
+ResultCallback = Callable[[str, int, Optional[List[Paper]]], None]
+
+
+class AsyncCrawlEngine:
+    """有界并发的异步爬取引擎"""
+    
+    def __init__(self, max_concurrency: int = 8, per_host: int = 2, timeout: int = 30,
+                 retry_times: int = 3, retry_delay: float = 2,
+                 user_agent: str = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+                 rate_limiter: Optional[RateLimiter] = None):
+        """
+        初始化引擎
+        
+        Args:
+            max_concurrency: 全局最大并发请求数
+            per_host: 每个主机的最大并发请求数
+            timeout: 单次请求超时（秒）
+            retry_times: 重试次数
+            retry_delay: 重试基础延迟（秒）
+            user_agent: User-Agent
+            rate_limiter: 按主机限速器，应与爬虫共用同一实例
+        """
+        self.max_concurrency = max_concurrency
+        self.per_host = per_host
+        self.timeout = timeout
+        self.retry_times = retry_times
+        self.retry_delay = retry_delay
+        self.user_agent = user_agent
+        self.rate_limiter = rate_limiter or RateLimiter(backoff_base=retry_delay)
+        self._global_limit: Optional[asyncio.Semaphore] = None
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+    
+    def crawl_all(self, targets: List[CrawlTarget], on_result: ResultCallback) -> Dict[str, int]:
+        """
+        同步入口：并发爬取全部目标
+        
+        Args:
+            targets: 爬取目标列表
+            on_result: 每个目标完成时在事件循环线程中调用
+        
+        Returns:
+            统计 {'succeeded': 成功目标数, 'failed': 失败目标数, 'papers': 论文总数}
+        """
+        return asyncio.run(self.run(targets, on_result))
+    
+    async def run(self, targets: List[CrawlTarget], on_result: ResultCallback) -> Dict[str, int]:
+        """并发爬取全部目标，按完成顺序回调"""
+        self._global_limit = asyncio.Semaphore(self.max_concurrency)
+        self._host_limits = {}
+        stats = {'succeeded': 0, 'failed': 0, 'papers': 0}
+        started = time.monotonic()
+        
+        # 解析是CPU密集的，放到线程池中避免阻塞其他目标的网络I/O
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            if aiohttp is not None:
+                connector = aiohttp.TCPConnector(limit=self.max_concurrency,
+                                                 limit_per_host=self.per_host)
+                async with aiohttp.ClientSession(
+                        connector=connector,
+                        headers={'User-Agent': self.user_agent},
+                        timeout=aiohttp.ClientTimeout(total=self.timeout)) as session:
+                    await self._run_targets(targets, on_result, stats, executor, session)
+            else:
+                logger.info("未安装aiohttp，使用线程池执行请求")
+                await self._run_targets(targets, on_result, stats, executor, None)
+        
+        logger.info(f"异步爬取完成: {stats['succeeded']} 个目标成功, {stats['failed']} 个失败, "
+                    f"共 {stats['papers']} 篇论文, 用时 {time.monotonic() - started:.1f}s")
+        return stats
+    
+    async def _run_targets(self, targets, on_result, stats, executor, session):
+        """调度全部目标并在完成时回调"""
+        tasks = [asyncio.ensure_future(self._crawl_target(target, executor, session))
+                 for target in targets]
+        for future in asyncio.as_completed(tasks):
+            conference, year, papers = await future
+            if papers is None:
+                stats['failed'] += 1
+            else:
+                stats['succeeded'] += 1
+                stats['papers'] += len(papers)
+            on_result(conference, year, papers)
+    
+    async def _crawl_target(self, target: CrawlTarget, executor, session) -> Tuple[str, int, Optional[List[Paper]]]:
+        """抓取并解析单个目标"""
+        crawler, conference, year = target
+        if not crawler.supports(conference):
+            logger.error(f"不支持的会议: {conference}")
+            return conference, year, None
+        
+        url = crawler.build_url(conference, year)
+        logger.info(f"爬取 {conference} {year} 从 {url}")
+        
+        ttl = crawler.cache_ttl(conference)
+        if session is not None:
+            content = await self._fetch_cached(session, url, crawler.cache, ttl)
+        else:
+            content = await self._fetch_in_thread(crawler, url, ttl, executor)
+        if not content:
+            logger.warning(f"无法获取 {conference} {year} 的页面内容")
+            return conference, year, None
+        
+        loop = asyncio.get_running_loop()
+        try:
+            papers = await loop.run_in_executor(executor, crawler.parse, conference, year, content)
+        except Exception as e:
+            logger.error(f"解析 {conference} {year} 时出错: {e}")
+            return conference, year, None
+        
+        logger.info(f"从 {conference} {year} 获取 {len(papers)} 篇论文")
+        return conference, year, papers
+    
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        """获取主机对应的并发限制"""
+        host = urlsplit(url).netloc.lower()
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.per_host)
+        return self._host_limits[host]
+    
+    async def _fetch_cached(self, session, url: str, cache: Optional[ResponseCache],
+                            ttl: Optional[float]) -> Optional[str]:
+        """带响应缓存的请求：有效期内不访问网络，过期后发送条件请求"""
+        if cache is None:
+            result = await self._fetch(session, url)
+            return result[2] if result else None
+        
+        entry = cache.lookup(url)
+        if entry is not None and (cache.offline or cache.is_fresh(entry, ttl)):
+            logger.debug(f"使用缓存 {url}")
+            return self._decode(cache.read_body(entry), entry.encoding)
+        if cache.offline:
+            logger.error(f"离线模式下缓存未命中: {url}")
+            return None
+        
+        result = await self._fetch(session, url, cache.conditional_headers(entry))
+        if result is None:
+            return None
+        status, headers, body, encoding = result
+        if status == 304 and entry is not None:
+            logger.debug(f"内容未变化 (304) {url}")
+            cache.touch(entry)
+            return self._decode(cache.read_body(entry), entry.encoding)
+        
+        cache.store(url, headers, body, encoding)
+        return self._decode(body, encoding)
+    
+    @staticmethod
+    def _decode(body: bytes, encoding: Optional[str]) -> str:
+        return body.decode(encoding or 'utf-8', errors='replace')
+    
+    async def _fetch(self, session, url: str, headers: Optional[Dict[str, str]] = None):
+        """
+        用aiohttp发送请求，支持重试
+        
+        Returns:
+            (状态码, 响应头, 响应体, 编码)，失败返回None
+        """
+        for attempt in range(self.retry_times):
+            try:
+                await self.rate_limiter.acquire_async(url)
+            except CircuitOpenError as e:
+                logger.error(f"请求被拒绝: {e}")
+                return None
+            
+            retry_after = None
+            try:
+                async with self._host_limit(url), self._global_limit:
+                    logger.debug(f"请求 {url} (尝试 {attempt + 1}/{self.retry_times})")
+                    async with session.get(url, headers=headers) as response:
+                        if response.status in RETRY_STATUSES:
+                            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                            raise aiohttp.ClientResponseError(
+                                response.request_info, response.history,
+                                status=response.status, message=response.reason or '')
+                        if response.status >= 400:
+                            self.rate_limiter.record_success(url)
+                            logger.error(f"请求失败: {response.status} {response.reason} {url}")
+                            return None
+                        body = await response.read()
+                        self.rate_limiter.record_success(url)
+                        return response.status, dict(response.headers), body, response.get_encoding()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                self.rate_limiter.record_failure(url)
+                logger.warning(f"请求失败 ({attempt + 1}/{self.retry_times}): {e}")
+            
+            if attempt < self.retry_times - 1:
+                delay = self.rate_limiter.backoff_delay(attempt, retry_after)
+                if retry_after is not None:
+                    self.rate_limiter.defer(url, delay)
+                else:
+                    # 等待期间不占用并发名额
+                    await asyncio.sleep(delay)
+        
+        logger.error(f"请求最终失败: {url}")
+        return None
+    
+    async def _fetch_in_thread(self, crawler: BaseCrawler, url: str, ttl: Optional[float],
+                               executor) -> Optional[str]:
+        """在线程池中调用爬虫的同步请求（含重试和缓存）"""
+        loop = asyncio.get_running_loop()
+        async with self._host_limit(url), self._global_limit:
+            return await loop.run_in_executor(executor, crawler._fetch_url, url, ttl)
@@ -4,13 +4,20 @@
 import requests
 import logging
 import time
-from typing import Optional, Dict, Any
-from bs4 import BeautifulSoup
+from typing import Optional, Dict, Any, Iterator, List, Tuple
 from abc import ABC, abstractmethod
+from crawlers.html_backend import Node, parse_document
+from crawlers.http_cache import ResponseCache, CacheEntry
+from utils.models import Paper
+from utils.rate_limiter import RateLimiter, CircuitOpenError, RETRY_STATUSES, parse_retry_after
 
 logger = logging.getLogger(__name__)
 
 
+class CrawlError(Exception):
+    """目标不受支持或页面无法获取"""
+
+
 class BaseCrawler(ABC):
     """基础爬虫抽象类"""
     
@@ -19,13 +26,39 @@ class BaseCrawler(ABC):
         初始化爬虫
         
         Args:
-            config: 配置字典
+            config: 配置字典，缓存相关的键:
+                cache_dir: 响应缓存目录，设置后启用缓存
+                cache_ttl: 缓存默认有效期（秒），0表示每次都用条件请求重新验证
+                cache_ttl_by_conference: {会议名称: 有效期}，覆盖默认有效期
+                offline: 离线回放，只使用缓存不访问网络
+                rate_limiter: 共享的 RateLimiter 实例，未设置时按 rate_limit 创建
+                rate_limit: 每个站点的默认速率（请求/秒）
+                html_backend: HTML解析后端 selectolax/lxml/bs4，默认自动选择
         """
         self.config = config
         self.session = self._create_session()
         self.timeout = config.get('timeout', 30)
         self.retry_times = config.get('retry_times', 3)
         self.retry_delay = config.get('retry_delay', 2)
+        self.rate_limiter = config.get('rate_limiter') or RateLimiter(
+            default_rate=config.get('rate_limit', 2.0), backoff_base=self.retry_delay)
+        self.cache = self._create_cache()
+        self.html_backend = config.get('html_backend')
+        self.cache_ttl_by_conference = config.get('cache_ttl_by_conference', {})
+    
+    def _create_cache(self) -> Optional[ResponseCache]:
+        """按配置创建响应缓存，未配置时返回None"""
+        offline = self.config.get('offline', False)
+        cache_dir = self.config.get('cache_dir')
+        if not cache_dir and not offline:
+            return None
+        return ResponseCache(cache_dir or 'data/http_cache',
+                             default_ttl=self.config.get('cache_ttl', 0),
+                             offline=offline)
+    
+    def cache_ttl(self, conference: str) -> Optional[float]:
+        """会议对应的缓存有效期，None表示使用默认值"""
+        return self.cache_ttl_by_conference.get(conference)
     
     def _create_session(self) -> requests.Session:
         """创建HTTP会话"""
@@ -36,19 +69,63 @@ class BaseCrawler(ABC):
         })
         return session
     
-    def fetch(self, url: str, method: str = 'GET', **kwargs) -> Optional[requests.Response]:
+    def fetch(self, url: str, method: str = 'GET', ttl: Optional[float] = None,
+              **kwargs) -> Optional[requests.Response]:
         """
         发送HTTP请求，支持重试
         
+        启用缓存时，GET请求在有效期内直接返回缓存；过期后发送条件请求，
+        服务器返回304时沿用缓存内容。
+        
         Args:
             url: 目标URL
             method: HTTP方法
+            ttl: 缓存有效期（秒），None表示使用默认值
             **kwargs: 其他请求参数
             
         Returns:
             响应对象，失败返回None
         """
+        if self.cache is None or method.upper() != 'GET':
+            return self._request(url, method, **kwargs)
+        
+        entry = self.cache.lookup(url)
+        if entry is not None and (self.cache.offline or self.cache.is_fresh(entry, ttl)):
+            logger.debug(f"使用缓存 {url}")
+            return self._cached_response(entry)
+        if self.cache.offline:
+            logger.error(f"离线模式下缓存未命中: {url}")
+            return None
+        
+        headers = dict(kwargs.pop('headers', None) or {})
+        headers.update(self.cache.conditional_headers(entry))
+        response = self._request(url, method, headers=headers, **kwargs)
+        if response is None:
+            return None
+        
+        if response.status_code == 304 and entry is not None:
+            logger.debug(f"内容未变化 (304) {url}")
+            self.cache.touch(entry)
+            return self._cached_response(entry)
+        
+        self.cache.store(url, response.headers, response.content, response.encoding)
+        return response
+    
+    def _request(self, url: str, method: str = 'GET', **kwargs) -> Optional[requests.Response]:
+        """
+        经过按主机限速发送HTTP请求
+        
+        网络错误和 429/5xx 按带抖动的指数退避重试；服务器给出 Retry-After 时
+        推迟该主机的所有请求。其余 4xx 不重试。
+        """
         for attempt in range(self.retry_times):
+            try:
+                self.rate_limiter.acquire(url)
+            except CircuitOpenError as e:
+                logger.error(f"请求被拒绝: {e}")
+                return None
+            
+            retry_after = None
             try:
                 logger.debug(f"请求 {url} (尝试 {attempt + 1}/{self.retry_times})")
                 
@@ -57,59 +134,215 @@ class BaseCrawler(ABC):
                 else:
                     response = self.session.post(url, timeout=self.timeout, **kwargs)
                 
+                if response.status_code in RETRY_STATUSES:
+                    retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                    raise requests.exceptions.HTTPError(
+                        f"{response.status_code} {response.reason}", response=response)
+                
+                self.rate_limiter.record_success(url)
                 response.raise_for_status()
                 return response
                 
+            except requests.exceptions.HTTPError as e:
+                if e.response is None or e.response.status_code not in RETRY_STATUSES:
+                    logger.error(f"请求失败: {e}")
+                    return None
+                self.rate_limiter.record_failure(url)
+                logger.warning(f"请求失败 ({attempt + 1}/{self.retry_times}): {e}")
             except requests.exceptions.RequestException as e:
+                self.rate_limiter.record_failure(url)
                 logger.warning(f"请求失败 ({attempt + 1}/{self.retry_times}): {e}")
-                
-                if attempt < self.retry_times - 1:
-                    time.sleep(self.retry_delay * (attempt + 1))
+            
+            if attempt < self.retry_times - 1:
+                delay = self.rate_limiter.backoff_delay(attempt, retry_after)
+                if retry_after is not None:
+                    # 服务器要求等待：整个主机暂停，下一轮 acquire 时等待
+                    self.rate_limiter.defer(url, delay)
                 else:
-                    logger.error(f"请求最终失败: {url}")
-                    return None
+                    time.sleep(delay)
+        
+        logger.error(f"请求最终失败: {url}")
+        return None
+    
+    def _cached_response(self, entry: CacheEntry) -> requests.Response:
+        """把缓存条目还原为 requests.Response"""
+        response = requests.Response()
+        response.status_code = 200
+        response.url = entry.url
+        response._content = self.cache.read_body(entry)
+        response.encoding = entry.encoding
+        if entry.content_type:
+            response.headers['Content-Type'] = entry.content_type
+        return response
     
-    def parse_html(self, html: str) -> Optional[BeautifulSoup]:
+    def parse_html(self, html: str) -> Optional[Node]:
         """
-        解析HTML
+        用配置的后端解析HTML
         
         Args:
             html: HTML字符串
             
         Returns:
-            BeautifulSoup对象
+            文档根节点（crawlers.html_backend.Node）
         """
         try:
-            return BeautifulSoup(html, 'lxml')
+            return parse_document(html, self.html_backend)
         except Exception as e:
             logger.error(f"解析HTML失败: {e}")
             return None
     
-    def _fetch_url(self, url: str) -> Optional[str]:
+    def _fetch_url(self, url: str, ttl: Optional[float] = None) -> Optional[str]:
         """
         获取URL内容并返回文本
         
         Args:
             url: 目标URL
+            ttl: 缓存有效期（秒），None表示使用默认值
             
         Returns:
             HTML文本，失败返回None
         """
-        response = self.fetch(url)
+        response = self.fetch(url, ttl=ttl)
         if response:
             return response.text
         return None
     
-    @abstractmethod
-    def crawl(self, *args, **kwargs) -> Any:
+    # 会议名称 -> URL模板，由子类定义
+    CONFERENCE_URLS: Dict[str, str] = {}
+    
+    # 列表页链接到单篇论文详情页、可以用 parse_detail 补全字段的会议，由子类定义
+    DETAIL_PAGE_CONFERENCES: Tuple[str, ...] = ()
+    
+    def supports(self, conference: str) -> bool:
+        """是否支持该会议"""
+        return conference in self.CONFERENCE_URLS
+    
+    def supports_detail(self, conference: str) -> bool:
+        """是否能解析该会议的论文详情页"""
+        return conference in self.DETAIL_PAGE_CONFERENCES
+    
+    def parse_detail(self, conference: str, url: str, content: str) -> Dict[str, str]:
         """
-        爬取方法，由子类实现
+        解析单篇论文的详情页，由支持详情页的子类实现
         
+        Args:
+            conference: 会议名称
+            url: 详情页URL（用于补全相对链接）
+            content: 页面内容
+            
         Returns:
-            爬取结果
+            找到的字段 {'abstract', 'pdf_url', 'doi'}，未找到的字段不出现
+        """
+        return {}
+    
+    @abstractmethod
+    def build_url(self, conference: str, year: int) -> str:
+        """
+        生成会议论文列表页的URL，由子类实现
+        
+        Args:
+            conference: 会议名称
+            year: 年份
+        """
+        pass
+    
+    @abstractmethod
+    def iter_parse(self, conference: str, year: int, content: str) -> Iterator[Paper]:
+        """
+        解析论文列表页内容，逐篇生成论文，由子类实现
+        
+        Args:
+            conference: 会议名称
+            year: 年份
+            content: 页面内容
         """
         pass
     
+    def parse(self, conference: str, year: int, content: str) -> List[Paper]:
+        """
+        解析论文列表页内容
+        
+        同步爬取和异步爬取引擎（crawlers.async_engine）共用此方法。
+        
+        Args:
+            conference: 会议名称
+            year: 年份
+            content: 页面内容
+            
+        Returns:
+            论文列表
+        """
+        return list(self.iter_parse(conference, year, content))
+    
+    def fetch_page(self, conference: str, year: int) -> str:
+        """
+        获取会议论文列表页的内容
+        
+        Args:
+            conference: 会议名称
+            year: 年份
+            
+        Returns:
+            页面内容
+            
+        Raises:
+            CrawlError: 会议不受支持或页面无法获取
+        """
+        if not self.supports(conference):
+            raise CrawlError(f"不支持的会议: {conference}")
+        
+        url = self.build_url(conference, year)
+        logger.info(f"爬取 {conference} {year} 从 {url}")
+        
+        content = self._fetch_url(url, ttl=self.cache_ttl(conference))
+        if not content:
+            raise CrawlError(f"无法获取 {conference} {year} 的页面内容")
+        return content
+    
+    def iter_papers(self, conference: str, year: int) -> Iterator[Paper]:
+        """
+        爬取指定会议的论文，边解析边生成
+        
+        调用方不必等整页解析完成，也不必在内存中保留整届会议的论文列表。
+        解析中途出错时异常向调用方传播，此前已生成的论文仍然有效。
+        
+        Args:
+            conference: 会议名称
+            year: 年份
+            
+        Raises:
+            CrawlError: 会议不受支持或页面无法获取
+        """
+        content = self.fetch_page(conference, year)
+        yield from self.iter_parse(conference, year, content)
+    
+    def crawl(self, conference: str, year: int) -> List[Paper]:
+        """
+        爬取指定会议的论文
+        
+        Args:
+            conference: 会议名称
+            year: 年份
+            
+        Returns:
+            论文列表
+        """
+        try:
+            papers = list(self.iter_papers(conference, year))
+        except CrawlError as e:
+            logger.warning(str(e))
+            return []
+        except Exception as e:
+            logger.error(f"解析 {conference} {year} 时出错: {e}")
+            return []
+        
+        logger.info(f"从 {conference} {year} 获取 {len(papers)} 篇论文")
+        return papers
+    
     def close(self):
         """关闭会话"""
         self.session.close()
+
+
+# (爬虫, 会议名称, 年份)
+CrawlTarget = Tuple[BaseCrawler, str, int]
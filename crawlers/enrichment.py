@@ -0,0 +1,141 @@
+"""
+详情页补全 - 访问单篇论文的详情页，补全列表页上没有的摘要、PDF链接和DOI
+
+USENIX Security、NDSS、CCS 的列表页只有标题和作者，入库时摘要为空，NDSS
+的PDF链接也为空。PaperEnricher 从数据库中选出缺少这些字段的论文，用线程池
+以有界并发访问详情页（经过爬虫共用的限速器和响应缓存），由各爬虫的
+parse_detail 解析，只填写仍然缺失的字段。
+
+每个详情页的结果记录在 enrichment_log 表中：中断后重新运行时跳过已访问的
+页面，请求失败的页面最多重试几次；重试时详情页多半已在响应缓存中，不必重新下载。
+"""
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from crawlers.base_crawler import BaseCrawler
+from utils.database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+# 详情页的缓存有效期（秒）：论文页面发布后很少变化，有效期内重试直接读取缓存
+DETAIL_CACHE_TTL = 30 * 86400
+
+
+class PaperEnricher:
+    """
+    论文详情页补全
+    
+    用法:
+        enricher = PaperEnricher(db, [security_crawler], concurrency=8)
+        enricher.run()
+    """
+    
+    def __init__(self, db: DatabaseManager, crawlers: Sequence[BaseCrawler], concurrency: int = 8,
+                 batch_size: int = 50, ttl: float = DETAIL_CACHE_TTL, max_attempts: int = 3):
+        """
+        初始化
+        
+        Args:
+            db: 数据库管理器，结果在调用 run() 的线程中写入
+            crawlers: 负责抓取和解析详情页的爬虫，按会议选择支持详情页的爬虫
+            concurrency: 同时访问的详情页数
+            batch_size: 累计多少个结果提交一次
+            ttl: 详情页的缓存有效期（秒）
+            max_attempts: 请求失败的页面最多尝试次数
+        """
+        self.db = db
+        self.crawlers = list(crawlers)
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.ttl = ttl
+        self.max_attempts = max_attempts
+    
+    def conferences(self) -> List[str]:
+        """能补全的会议"""
+        return [conf for crawler in self.crawlers for conf in crawler.DETAIL_PAGE_CONFERENCES]
+    
+    def _crawler_for(self, conference: str) -> Optional[BaseCrawler]:
+        return next((crawler for crawler in self.crawlers if crawler.supports_detail(conference)), None)
+    
+    def run(self, conferences: Optional[List[str]] = None, limit: Optional[int] = None,
+            retry: bool = False) -> Dict[str, int]:
+        """
+        补全缺少字段的论文
+        
+        Args:
+            conferences: 只处理这些会议，默认全部能补全的会议
+            limit: 最多访问的详情页数
+            retry: 忽略补全日志，重新访问所有仍缺少字段的论文
+        
+        Returns:
+            统计 {'enriched': 找到字段的页面数, 'empty': 没有找到字段的页面数,
+                  'failed': 请求失败的页面数, 'updated': 实际更新的论文数}
+        """
+        supported = self.conferences()
+        conferences = [conf for conf in (conferences or supported) if conf in supported]
+        candidates = self.db.get_enrichment_candidates(conferences, retry=retry,
+                                                       max_attempts=self.max_attempts, limit=limit)
+        stats = {'enriched': 0, 'empty': 0, 'failed': 0, 'updated': 0}
+        if not candidates:
+            logger.info("没有需要补全的论文")
+            return stats
+        
+        logger.info(f"补全 {len(candidates)} 篇论文的详情页 (并发 {self.concurrency})")
+        started = time.monotonic()
+        batch: List[Tuple] = []
+        pending = set()
+        executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='enrich')
+        try:
+            for paper_id, conference, url in candidates:
+                # 最多保留 2 倍并发数的任务在途，结果逐批写入
+                if len(pending) >= self.concurrency * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    self._collect(done, batch, stats)
+                crawler = self._crawler_for(conference)
+                pending.add(executor.submit(self._enrich_one, crawler, paper_id, conference, url))
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                self._collect(done, batch, stats)
+        finally:
+            # 中断时丢弃尚未开始的任务，已完成的结果仍然写入，下次运行从这里继续
+            executor.shutdown(wait=True, cancel_futures=True)
+            self._collect([future for future in pending if future.done() and not future.cancelled()],
+                          batch, stats)
+            self._flush(batch, stats)
+        
+        logger.info(f"详情页补全完成: 找到字段 {stats['enriched']}, 无字段 {stats['empty']}, "
+                    f"失败 {stats['failed']}, 更新 {stats['updated']} 篇, "
+                    f"用时 {time.monotonic() - started:.1f}s")
+        return stats
+    
+    def _enrich_one(self, crawler: BaseCrawler, paper_id: int, conference: str, url: str) -> Tuple:
+        """抓取并解析一个详情页（在工作线程中运行）"""
+        content = crawler._fetch_url(url, ttl=self.ttl)
+        if not content:
+            return paper_id, url, 'failed', {}, '无法获取详情页'
+        try:
+            fields = crawler.parse_detail(conference, url, content)
+        except Exception as e:
+            logger.error(f"解析详情页 {url} 时出错: {e}")
+            return paper_id, url, 'failed', {}, str(e)
+        return paper_id, url, 'enriched' if fields else 'empty', fields, None
+    
+    def _collect(self, futures, batch: List[Tuple], stats: Dict[str, int]):
+        """收集已完成任务的结果，达到批量时提交"""
+        for future in futures:
+            result = future.result()
+            stats[result[2]] += 1
+            batch.append(result)
+        if len(batch) >= self.batch_size:
+            self._flush(batch, stats)
+    
+    def _flush(self, batch: List[Tuple], stats: Dict[str, int]):
+        """提交一批结果"""
+        if not batch:
+            return
+        stats['updated'] += self.db.apply_enrichment(batch)
+        done = stats['enriched'] + stats['empty'] + stats['failed']
+        logger.info(f"  已处理 {done} 个详情页, 更新 {stats['updated']} 篇")
+        batch.clear()
@@ -0,0 +1,435 @@
+"""
+HTML解析后端 - selectolax / lxml / BeautifulSoup 的统一接口
+
+各会议解析器只通过 Node 接口访问文档，因此可以在不同后端之间切换。
+Node 的查找和取文本语义以 BeautifulSoup 为准（find_all 不含自身、
+text() 等价于 get_text(strip=True)、忽略注释和 script/style/template 内容），
+三个后端对同一页面给出相同的解析结果。唯一的例外是省略结束标签的
+不规范标记（如连续的 <p>、<li>）：selectolax 和 lxml 按浏览器的方式
+隐式闭合，bs4 使用的 html.parser 不做这种修正。
+
+默认按 selectolax > lxml > bs4 的顺序选择已安装的后端。
+"""
+import logging
+from typing import Iterator, List, Optional, Pattern, Sequence, Union
+
+logger = logging.getLogger(__name__)
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:  # 可选依赖
+    LexborHTMLParser = None
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:  # 可选依赖
+    lxml = None
+    etree = None
+
+try:
+    from bs4 import BeautifulSoup
+except ImportError:  # 可选依赖
+    BeautifulSoup = None
+
+# 按优先级排列的后端名称
+BACKENDS = ('selectolax', 'lxml', 'bs4')
+
+# get_text 不计入的元素内容（与 BeautifulSoup 一致）
+_SKIP_TEXT = ('script', 'style', 'template')
+
+Tags = Union[str, Sequence[str], None]
+
+
+def _tag_tuple(tags: Tags) -> Optional[tuple]:
+    if tags is None:
+        return None
+    return (tags,) if isinstance(tags, str) else tuple(tags)
+
+
+def _class_matches(classes: List[str], pattern: Pattern) -> bool:
+    """与 BeautifulSoup 的 class_ 正则匹配相同：逐个类名匹配，再匹配整个属性值"""
+    if not classes:
+        return False
+    return any(pattern.search(c) for c in classes) or bool(pattern.search(' '.join(classes)))
+
+
+class Node:
+    """
+    后端无关的元素节点
+    
+    子类只需实现基本的导航方法，查找逻辑在此统一实现。
+    """
+    
+    __slots__ = ('_el',)
+    
+    def __init__(self, el):
+        self._el = el
+    
+    @property
+    def tag(self) -> str:
+        raise NotImplementedError
+    
+    def get(self, name: str, default: str = '') -> str:
+        """属性值"""
+        raise NotImplementedError
+    
+    def classes(self) -> List[str]:
+        """class 属性拆分后的类名列表"""
+        return self.get('class').split()
+    
+    def has_class(self, pattern: Pattern) -> bool:
+        """类名是否匹配正则（与 find_all 的 class_ 参数语义相同）"""
+        return _class_matches(self.classes(), pattern)
+    
+    def text(self, strip: bool = True) -> str:
+        """
+        去除每段文本首尾空白后拼接，等价于 BeautifulSoup 的 get_text(strip=True)；
+        strip=False 时保留原始空白（等价于 get_text()），适合含行内标签的正文
+        """
+        raise NotImplementedError
+    
+    @property
+    def string(self) -> Optional[str]:
+        """唯一子节点的文本（BeautifulSoup 的 .string 语义），否则为None"""
+        raise NotImplementedError
+    
+    @property
+    def parent(self) -> Optional['Node']:
+        raise NotImplementedError
+    
+    def next_sibling(self) -> Optional['Node']:
+        """下一个兄弟元素（跳过文本和注释）"""
+        raise NotImplementedError
+    
+    def _descendants(self, tags: Optional[tuple]) -> Iterator['Node']:
+        """按文档顺序遍历后代元素（不含自身）"""
+        raise NotImplementedError
+    
+    def _following(self) -> Iterator['Node']:
+        """按文档顺序遍历自身之后的全部元素（含后代）"""
+        raise NotImplementedError
+    
+    def find_all(self, tags: Tags = None, class_: Optional[Pattern] = None) -> Iterator['Node']:
+        """
+        按文档顺序查找后代元素
+        
+        Args:
+            tags: 标签名或标签名列表，None表示任意标签
+            class_: 类名正则
+        """
+        return self._find_all(_tag_tuple(tags), class_)
+    
+    def _find_all(self, tags: Optional[tuple], class_: Optional[Pattern]) -> Iterator['Node']:
+        """find_all 的实现，子类可以在原始节点上过滤以减少包装开销"""
+        nodes = self._descendants(tags)
+        if class_ is None:
+            return nodes
+        return (node for node in nodes if _class_matches(node.classes(), class_))
+    
+    def find(self, tags: Tags = None, class_: Optional[Pattern] = None) -> Optional['Node']:
+        """第一个匹配的后代元素"""
+        return next(self.find_all(tags, class_), None)
+    
+    def find_next(self, tags: Tags, string: Optional[str] = None) -> Optional['Node']:
+        """
+        文档顺序中自身之后第一个匹配的元素（与 BeautifulSoup.find_next 相同，含后代）
+        
+        Args:
+            tags: 标签名或标签名列表
+            string: 要求元素的 .string 等于该值
+        """
+        tags = _tag_tuple(tags)
+        for node in self._following():
+            if node.tag in tags and (string is None or node.string == string):
+                return node
+        return None
+    
+    def __eq__(self, other):
+        return isinstance(other, Node) and self._key() == other._key()
+    
+    def __hash__(self):
+        return hash(self._key())
+    
+    def _key(self):
+        return id(self._el)
+
+
+# ==================== BeautifulSoup ====================
+
+class SoupNode(Node):
+    """BeautifulSoup 节点，作为其他后端的语义参照"""
+    
+    __slots__ = ()
+    
+    @property
+    def tag(self) -> str:
+        return self._el.name
+    
+    def get(self, name: str, default: str = '') -> str:
+        value = self._el.get(name, default)
+        return ' '.join(value) if isinstance(value, list) else value
+    
+    def classes(self) -> List[str]:
+        return self._el.get('class') or []
+    
+    def text(self, strip: bool = True) -> str:
+        return self._el.get_text(strip=strip)
+    
+    @property
+    def string(self) -> Optional[str]:
+        value = self._el.string
+        return None if value is None else str(value)
+    
+    @property
+    def parent(self) -> Optional[Node]:
+        parent = self._el.parent
+        return SoupNode(parent) if parent is not None else None
+    
+    def next_sibling(self) -> Optional[Node]:
+        sibling = self._el.find_next_sibling()
+        return SoupNode(sibling) if sibling is not None else None
+    
+    def find_all(self, tags: Tags = None, class_: Optional[Pattern] = None) -> Iterator[Node]:
+        kwargs = {'class_': class_} if class_ is not None else {}
+        return (SoupNode(el) for el in self._el.find_all(_tag_list(tags), **kwargs))
+    
+    def find_next(self, tags: Tags, string: Optional[str] = None) -> Optional[Node]:
+        el = self._el.find_next(_tag_list(tags), string=string)
+        return SoupNode(el) if el is not None else None
+
+
+def _tag_list(tags: Tags):
+    tags = _tag_tuple(tags)
+    return list(tags) if tags is not None else None
+
+
+# ==================== lxml ====================
+
+if etree is not None:
+    _LXML_TEXT = etree.XPath(
+        'descendant::text()[not(ancestor::script or ancestor::style or ancestor::template)]')
+
+
+class LxmlNode(Node):
+    """lxml.html 节点"""
+    
+    __slots__ = ()
+    
+    @property
+    def tag(self) -> str:
+        return self._el.tag
+    
+    def get(self, name: str, default: str = '') -> str:
+        return self._el.get(name, default)
+    
+    def text(self, strip: bool = True) -> str:
+        if not strip:
+            return ''.join(_LXML_TEXT(self._el))
+        return ''.join([s.strip() for s in _LXML_TEXT(self._el)])
+    
+    @property
+    def string(self) -> Optional[str]:
+        el = self._el
+        while True:
+            children = len(el)
+            if children == 0:
+                return el.text
+            if children > 1 or el.text or el[0].tail:
+                return None
+            el = el[0]
+            if not isinstance(el.tag, str):
+                # 注释节点
+                return el.text
+    
+    @property
+    def parent(self) -> Optional[Node]:
+        parent = self._el.getparent()
+        return LxmlNode(parent) if parent is not None else None
+    
+    def next_sibling(self) -> Optional[Node]:
+        for sibling in self._el.itersiblings():
+            if isinstance(sibling.tag, str):
+                return LxmlNode(sibling)
+        return None
+    
+    def _descendants(self, tags: Optional[tuple]) -> Iterator[Node]:
+        iterator = self._el.iterdescendants(*tags) if tags else self._el.iterdescendants()
+        return (LxmlNode(el) for el in iterator if isinstance(el.tag, str))
+    
+    def _find_all(self, tags: Optional[tuple], class_: Optional[Pattern]) -> Iterator[Node]:
+        if class_ is None:
+            return self._descendants(tags)
+        iterator = self._el.iterdescendants(*tags) if tags else self._el.iterdescendants()
+        return (LxmlNode(el) for el in iterator
+                if isinstance(el.tag, str) and _class_matches(el.get('class', '').split(), class_))
+    
+    def _following(self) -> Iterator[Node]:
+        yield from self._descendants(None)
+        el = self._el
+        while el is not None:
+            for sibling in el.itersiblings():
+                if isinstance(sibling.tag, str):
+                    yield LxmlNode(sibling)
+                    yield from LxmlNode(sibling)._descendants(None)
+            el = el.getparent()
+
+
+# ==================== selectolax ====================
+
+class LexborNode(Node):
+    """selectolax (lexbor) 节点"""
+    
+    __slots__ = ()
+    
+    @property
+    def tag(self) -> str:
+        return self._el.tag
+    
+    def get(self, name: str, default: str = '') -> str:
+        value = self._el.attributes.get(name, default)
+        return default if value is None else value
+    
+    def text(self, strip: bool = True) -> str:
+        el = self._el
+        if el.css_first('script, style, template') is None:
+            return el.text(deep=True, separator='', strip=strip)
+        parts = []
+        self._collect_text(el, parts, strip)
+        return ''.join(parts)
+    
+    @classmethod
+    def _collect_text(cls, el, parts: List[str], strip: bool = True):
+        for child in el.iter(include_text=True):
+            if child.is_text_node:
+                parts.append(child.text_content.strip() if strip else child.text_content)
+            elif child.is_element_node and child.tag not in _SKIP_TEXT:
+                cls._collect_text(child, parts, strip)
+    
+    @property
+    def string(self) -> Optional[str]:
+        el = self._el
+        while True:
+            children = list(el.iter(include_text=True))
+            if len(children) != 1:
+                return None
+            el = children[0]
+            if el.is_text_node:
+                return el.text_content
+            if el.is_comment_node:
+                return el.comment_content
+    
+    @property
+    def parent(self) -> Optional[Node]:
+        parent = self._el.parent
+        if parent is None or parent.is_document_node:
+            return None
+        return LexborNode(parent)
+    
+    def next_sibling(self) -> Optional[Node]:
+        sibling = self._el.next
+        while sibling is not None and not sibling.is_element_node:
+            sibling = sibling.next
+        return LexborNode(sibling) if sibling is not None else None
+    
+    def _descendants(self, tags: Optional[tuple]) -> Iterator[Node]:
+        el = self._el
+        if tags:
+            # css() 的结果包含节点自身
+            return (LexborNode(node) for node in el.css(', '.join(tags))
+                    if node.mem_id != el.mem_id)
+        return (LexborNode(node) for node in el.traverse() if node.mem_id != el.mem_id)
+    
+    def _find_all(self, tags: Optional[tuple], class_: Optional[Pattern]) -> Iterator[Node]:
+        if class_ is None:
+            return self._descendants(tags)
+        # 只取带 class 属性的元素，在原始节点上匹配后再包装
+        el = self._el
+        selector = ', '.join(f'{tag}[class]' for tag in tags) if tags else '[class]'
+        return (LexborNode(node) for node in el.css(selector)
+                if node.mem_id != el.mem_id
+                and _class_matches((node.attributes.get('class') or '').split(), class_))
+    
+    def find(self, tags: Tags = None, class_: Optional[Pattern] = None) -> Optional[Node]:
+        tags = _tag_tuple(tags)
+        if class_ is not None or not tags:
+            return super().find(tags, class_)
+        el = self._el
+        node = el.css_first(', '.join(tags))
+        if node is not None and node.mem_id == el.mem_id:
+            # css_first 可能匹配到节点自身
+            return next(self._descendants(tags), None)
+        return LexborNode(node) if node is not None else None
+    
+    def _following(self) -> Iterator[Node]:
+        yield from self._descendants(None)
+        el = self._el
+        while el is not None and not el.is_document_node:
+            sibling = el.next
+            while sibling is not None:
+                if sibling.is_element_node:
+                    yield LexborNode(sibling)
+                    yield from LexborNode(sibling)._descendants(None)
+                sibling = sibling.next
+            el = el.parent
+    
+    def _key(self):
+        return self._el.mem_id
+
+
+# ==================== 后端选择 ====================
+
+def available_backends() -> List[str]:
+    """已安装的后端，按优先级排列"""
+    installed = {
+        'selectolax': LexborHTMLParser is not None,
+        'lxml': etree is not None,
+        'bs4': BeautifulSoup is not None,
+    }
+    return [name for name in BACKENDS if installed[name]]
+
+
+def resolve_backend(name: Optional[str] = None) -> str:
+    """
+    确定要使用的后端
+    
+    Args:
+        name: 后端名称，None或'auto'表示自动选择
+    
+    Raises:
+        ValueError: 后端未知或未安装
+    """
+    available = available_backends()
+    if not available:
+        raise ValueError("未安装任何HTML解析库（selectolax / lxml / beautifulsoup4）")
+    if name in (None, 'auto'):
+        return available[0]
+    if name not in BACKENDS:
+        raise ValueError(f"未知的HTML解析后端: {name}，可选 {', '.join(BACKENDS)}")
+    if name not in available:
+        raise ValueError(f"HTML解析后端 {name} 未安装")
+    return name
+
+
+def parse_document(html: str, backend: Optional[str] = None) -> Node:
+    """
+    解析HTML文档
+    
+    Args:
+        html: HTML文本
+        backend: 后端名称，None表示自动选择
+    
+    Returns:
+        文档根节点
+    """
+    backend = resolve_backend(backend)
+    if backend == 'selectolax':
+        root = LexborHTMLParser(html).root
+        return LexborNode(root)
+    if backend == 'lxml':
+        try:
+            return LxmlNode(lxml.html.document_fromstring(html))
+        except etree.ParserError:
+            # 空文档
+            return LxmlNode(lxml.html.document_fromstring('<html></html>'))
+    return SoupNode(BeautifulSoup(html, 'html.parser'))
@@ -0,0 +1,154 @@
+"""
+HTTP响应磁盘缓存 - 支持ETag/Last-Modified条件请求和离线回放
+"""
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Optional, Dict, Any, Iterable
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+logger = logging.getLogger(__name__)
+
+# 规范化URL时丢弃的查询参数（常见的防缓存时间戳）
+DEFAULT_IGNORED_PARAMS = ('v', '_', 'nocache')
+
+
+def normalize_url(url: str, ignored_params: Iterable[str] = DEFAULT_IGNORED_PARAMS) -> str:
+    """
+    规范化URL作为缓存键：小写协议和主机、去掉默认端口和片段、
+    丢弃防缓存参数并对其余查询参数排序
+    """
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and not ((scheme == 'http' and parts.port == 80) or (scheme == 'https' and parts.port == 443)):
+        host = f"{host}:{parts.port}"
+    ignored = set(ignored_params)
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in ignored)
+    return urlunsplit((scheme, host, parts.path or '/', urlencode(query), ''))
+
+
+class CacheEntry:
+    """缓存条目的元数据"""
+    
+    __slots__ = ('url', 'etag', 'last_modified', 'encoding', 'content_type', 'fetched_at', 'path')
+    
+    def __init__(self, url: str, path: str, etag: Optional[str] = None,
+                 last_modified: Optional[str] = None, encoding: Optional[str] = None,
+                 content_type: Optional[str] = None, fetched_at: float = 0.0):
+        self.url = url
+        self.path = path
+        self.etag = etag
+        self.last_modified = last_modified
+        self.encoding = encoding
+        self.content_type = content_type
+        self.fetched_at = fetched_at
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__ if name != 'path'}
+
+
+class ResponseCache:
+    """
+    按规范化URL存储的HTTP响应缓存
+    
+    每个URL对应 <cache_dir>/<sha[:2]>/<sha>.json（元数据）和 .body（响应体）。
+    在TTL内直接使用缓存；过期后带 If-None-Match / If-Modified-Since 重新验证，
+    服务器返回304时沿用缓存内容。离线模式下只读缓存，不发任何请求。
+    """
+    
+    def __init__(self, cache_dir: str = 'data/http_cache', default_ttl: float = 0,
+                 offline: bool = False, ignored_params: Iterable[str] = DEFAULT_IGNORED_PARAMS):
+        """
+        初始化缓存
+        
+        Args:
+            cache_dir: 缓存目录
+            default_ttl: 默认有效期（秒），0表示每次都重新验证
+            offline: 离线回放模式
+            ignored_params: 规范化URL时丢弃的查询参数
+        """
+        self.cache_dir = cache_dir
+        self.default_ttl = default_ttl
+        self.offline = offline
+        self.ignored_params = tuple(ignored_params)
+        os.makedirs(cache_dir, exist_ok=True)
+    
+    def _base_path(self, url: str) -> str:
+        digest = hashlib.sha256(normalize_url(url, self.ignored_params).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], digest)
+    
+    def lookup(self, url: str) -> Optional[CacheEntry]:
+        """查找缓存条目，不存在或损坏时返回None"""
+        base = self._base_path(url)
+        try:
+            with open(base + '.json', 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not os.path.exists(base + '.body'):
+            return None
+        return CacheEntry(path=base, **meta)
+    
+    def is_fresh(self, entry: CacheEntry, ttl: Optional[float] = None) -> bool:
+        """条目是否在有效期内"""
+        ttl = self.default_ttl if ttl is None else ttl
+        return time.time() - entry.fetched_at < ttl
+    
+    @staticmethod
+    def conditional_headers(entry: Optional[CacheEntry]) -> Dict[str, str]:
+        """生成条件请求头"""
+        headers = {}
+        if entry is None:
+            return headers
+        if entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        return headers
+    
+    def read_body(self, entry: CacheEntry) -> bytes:
+        """读取缓存的响应体"""
+        with open(entry.path + '.body', 'rb') as f:
+            return f.read()
+    
+    def store(self, url: str, headers: Dict[str, str], body: bytes,
+              encoding: Optional[str] = None) -> CacheEntry:
+        """
+        写入缓存（先写临时文件再原子替换）
+        
+        Args:
+            url: 请求URL
+            headers: 响应头
+            body: 响应体
+            encoding: 文本编码
+        """
+        base = self._base_path(url)
+        os.makedirs(os.path.dirname(base), exist_ok=True)
+        lowered = {k.lower(): v for k, v in headers.items()}
+        entry = CacheEntry(
+            url=url,
+            path=base,
+            etag=lowered.get('etag'),
+            last_modified=lowered.get('last-modified'),
+            encoding=encoding,
+            content_type=lowered.get('content-type'),
+            fetched_at=time.time(),
+        )
+        self._atomic_write(base + '.body', body)
+        self._atomic_write(base + '.json', json.dumps(entry.to_dict()).encode('utf-8'))
+        return entry
+    
+    def touch(self, entry: CacheEntry):
+        """304响应后刷新条目的验证时间"""
+        entry.fetched_at = time.time()
+        self._atomic_write(entry.path + '.json', json.dumps(entry.to_dict()).encode('utf-8'))
+    
+    @staticmethod
+    def _atomic_write(path: str, data: bytes):
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
@@ -6,8 +6,9 @@ import logging
 import re
 import json
 import time
-from typing import List, Dict, Any, Optional
+from typing import Dict, Any, Iterator, Optional
 from crawlers.base_crawler import BaseCrawler
+from utils.models import Paper
 
 logger = logging.getLogger(__name__)
 
@@ -28,43 +29,33 @@ class IACRCrawler(BaseCrawler):
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
     
-    def crawl(self, conference: str, year: int) -> List[Dict[str, Any]]:
+    def build_url(self, conference: str, year: int) -> str:
+        """生成currentProgram.php的URL"""
+        url = self.CONFERENCE_URLS[conference].format(year=year)
+        if self.cache is not None:
+            # 启用响应缓存时由条件请求保证新鲜度，不再附加时间戳
+            return url
+        # 添加时间戳参数避免中间代理缓存
+        return f"{url}?v={int(time.time() * 1000)}"
+    
+    def iter_parse(self, conference: str, year: int, content: str) -> Iterator[Paper]:
         """
-        从IACR官网currentProgram.php获取论文
+        解析currentProgram.php返回的JSON，逐篇生成论文
         
         Args:
             conference: 会议名称 (CRYPTO, ASIACRYPT, EUROCRYPT)
             year: 年份
-            
-        Returns:
-            论文列表
+            content: JSON文本
         """
-        if conference not in self.CONFERENCE_URLS:
-            logger.error(f"不支持的会议: {conference}")
-            return []
-        
-        # 添加时间戳参数避免缓存
-        url = f"{self.CONFERENCE_URLS[conference].format(year=year)}?v={int(time.time() * 1000)}"
-        logger.info(f"爬取 {conference} {year} 从 currentProgram.php API")
-        
-        response = self.fetch(url)
-        if not response:
-            logger.warning(f"无法访问 {url}")
-            return []
-        
-        # 解析JSON响应
         try:
-            data = json.loads(response.text)
+            data = json.loads(content)
         except json.JSONDecodeError as e:
             logger.error(f"JSON解析失败: {e}")
-            return []
-        
-        papers = self._parse_program_data(data, conference, year)
-        logger.info(f"从 {conference} {year} 获取 {len(papers)} 篇论文")
+            return
         
-        return papers
+        yield from self._parse_program_data(data, conference, year)
     
-    def _parse_program_data(self, data: Dict, conference: str, year: int) -> List[Dict[str, Any]]:
+    def _parse_program_data(self, data: Dict, conference: str, year: int) -> Iterator[Paper]:
         """
         解析currentProgram.php返回的JSON数据
         
@@ -96,8 +87,6 @@ class IACRCrawler(BaseCrawler):
           ]
         }
         """
-        papers = []
-        
         # 遍历所有天的日程
         for day in data.get('days', []):
             for timeslot in day.get('timeslots', []):
@@ -112,66 +101,65 @@ class IACRCrawler(BaseCrawler):
                     for talk in session.get('talks', []):
                         paper = self._extract_paper_from_talk(talk, conference, year)
                         if paper:
-                            papers.append(paper)
-        
-        return papers
+                            yield paper
     
-    def _extract_paper_from_talk(self, talk: Dict, conference: str, year: int) -> Optional[Dict[str, Any]]:
+    def _extract_paper_from_talk(self, talk: Dict, conference: str, year: int) -> Optional[Paper]:
         """从talk数据中提取论文信息"""
         # 检查是否是论文talk（有paperId）
         if not talk.get('paperId'):
             return None
         
+        title = talk.get('title', '').strip()
+        if not title:
+            return None
+        
         # 提取作者
         authors = talk.get('authors', [])
-        if isinstance(authors, list):
-            authors_str = '; '.join(authors)
-        else:
-            authors_str = str(authors)
+        if not isinstance(authors, list):
+            authors = str(authors)
         
-        paper = {
-            'conference': conference,
-            'year': year,
-            'title': talk.get('title', '').strip(),
-            'authors': authors_str,
-            'abstract': talk.get('abstract', '').strip(),
-            'paper_id': talk.get('paperId'),
-        }
+        paper = Paper(
+            title,
+            conference,
+            year,
+            authors=authors,
+            abstract=talk.get('abstract', '').strip(),
+        )
         
         # 提取URL
         if talk.get('paperUrl'):
-            paper['url'] = talk['paperUrl']
+            paper.url = talk['paperUrl']
             # 从DOI URL提取DOI
-            if 'doi.org' in paper['url']:
-                paper['doi'] = paper['url'].split('doi.org/')[-1]
+            if 'doi.org' in paper.url:
+                paper.doi = paper.url.split('doi.org/')[-1]
         
         # eprint URL
         if talk.get('eprint'):
-            paper['eprint_url'] = talk['eprint']
+            paper.eprint_url = talk['eprint']
         
         # PDF URL - 通常在DOI URL或eprint
-        if paper.get('url') and 'doi.org' in paper['url']:
+        if paper.url and 'doi.org' in paper.url:
             # DOI URL通常可以获取PDF
-            paper['pdf_url'] = paper['url']
-        elif paper.get('eprint_url'):
+            paper.pdf_url = paper.url
+        elif paper.eprint_url:
             # eprint URL也可以下载PDF
-            paper['pdf_url'] = paper['eprint_url'] + '.pdf'
+            paper.pdf_url = paper.eprint_url + '.pdf'
         
         # 其他链接
-        if talk.get('slidesUrl'):
-            paper['slides_url'] = talk['slidesUrl']
-        if talk.get('videoUrl'):
-            paper['video_url'] = talk['videoUrl']
+        paper.slides_url = talk.get('slidesUrl') or None
+        paper.video_url = talk.get('videoUrl') or None
         
         # 关键词
-        if talk.get('keywords'):
-            paper['keywords'] = talk['keywords']
+        keywords = talk.get('keywords')
+        if keywords:
+            paper.keywords = '; '.join(keywords) if isinstance(keywords, list) else keywords
         
         # 仿属
-        if talk.get('affiliations'):
-            paper['affiliations'] = '; '.join(talk['affiliations']) if isinstance(talk['affiliations'], list) else talk['affiliations']
+        affiliations = talk.get('affiliations')
+        if affiliations:
+            paper.affiliations = '; '.join(affiliations) if isinstance(affiliations, list) else affiliations
         
-        return paper if paper['title'] else None
+        return paper
 
 
 def test_iacr_crawler():
@@ -188,13 +176,13 @@ def test_iacr_crawler():
     if papers:
         print("\n前3篇论文:")
         for paper in papers[:3]:
-            print(f"\n标题: {paper['title']}")
+            print(f"\n标题: {paper.title}")
             print(f"作者: {paper.get('authors', 'N/A')}")
             print(f"PDF: {paper.get('pdf_url', 'N/A')}")
         
         # 保存到JSON
         with open('test_iacr_papers.json', 'w', encoding='utf-8') as f:
-            json.dump(papers[:10], f, ensure_ascii=False, indent=2)
+            json.dump([paper.to_json() for paper in papers[:10]], f, ensure_ascii=False, indent=2)
         print("\n已保存前10篇到 test_iacr_papers.json")
 
 
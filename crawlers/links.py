@@ -0,0 +1,36 @@
+"""
+PDF链接规则 - 由会议注册表（crawlers.registry）按需导入
+
+每个规则的签名为 (paper, conference) -> Optional[str]，paper 为论文字典，
+conference 为会议的注册信息；无法生成链接时返回None。
+"""
+from typing import Any, Mapping, Optional
+
+
+def iacr_pdf_link(paper: Mapping[str, Any], conference) -> Optional[str]:
+    """从IACR eprint URL提取PDF链接"""
+    url = paper.get('url') or ''
+    if 'eprint.iacr.org' not in url:
+        return None
+    parts = url.rstrip('/').split('/')
+    if len(parts) < 2:
+        return None
+    year, paper_id = parts[-2], parts[-1]
+    return f"https://eprint.iacr.org/{year}/{paper_id}.pdf"
+
+
+def usenix_pdf_link(paper: Mapping[str, Any], conference) -> Optional[str]:
+    """按标题构建USENIX Security的PDF链接"""
+    if not conference.matches(paper.get('url')):
+        return None
+    slug = (paper.get('title') or '').lower()
+    slug = ''.join(c if c.isalnum() or c == ' ' else '' for c in slug)
+    slug = '-'.join(slug.split())[:50]
+    year = str(paper.get('year') or 2025)[-2:]
+    return f"https://www.usenix.org/system/files/usenixsecurity{year}/usenixsecurity{year}-{slug}.pdf"
+
+
+def site_page_link(paper: Mapping[str, Any], conference) -> Optional[str]:
+    """没有稳定PDF地址的会议使用会议网站上的论文页面"""
+    url = paper.get('url')
+    return url if conference.matches(url) else None
@@ -0,0 +1,362 @@
+"""
+流式入库流水线 - 爬取、规范化、去重、批量写入
+
+四个阶段各自运行在独立线程中，阶段之间用有界队列连接：爬取线程通过
+BaseCrawler.iter_papers 边解析边把论文放入队列，下游阶段逐篇处理，写入阶段
+按批提交。队列满时上游阻塞，在途论文最多约为 3 × queue_size 篇，与单个页面
+的论文数无关；多个目标的网络请求与数据库写入同时进行。
+
+每个目标的论文之后跟一个结束标记。写入阶段收到结束标记时提交该目标剩余
+的批次，目标完整爬取成功时再统计（prune 时删除）网站上已不存在的论文。
+
+指定 worker 时使用数据库中的爬取作业日志（crawl_jobs）：爬取线程逐个领取
+目标，写入阶段在目标的论文全部提交后记录结果、页面哈希和耗时。中断后用同一
+worker 重新运行即可从未完成的目标继续；多个进程用不同的 worker 共用一个
+数据库时各自领取不同的目标。
+
+作业日志同时保存每个目标上次成功入库时的页面哈希：页面内容未变化时跳过
+解析和写入，整个目标只需读取一次页面。行级别由 meta_hash 保证只有元数据
+确有变化的论文才会UPDATE（DatabaseManager.upsert_papers）。
+"""
+import hashlib
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple
+
+from crawlers.base_crawler import CrawlError, CrawlTarget
+from utils.database import DatabaseManager
+from utils.models import Paper
+
+logger = logging.getLogger(__name__)
+
+# 队列项: (类型, 会议名称, 年份, 内容)
+_PAPER = 'paper'    # 内容为 Paper，规范化后不合格的记录为None
+_END = 'end'        # 目标结束；内容为 (是否完整成功, 页面哈希, 错误信息, 是否因页面未变化跳过)，
+                    # 去重阶段起附加 paper_key 集合
+
+# 阶段之间的停止标记
+_STOP = object()
+
+
+class _Aborted(Exception):
+    """其他阶段出错，流水线中止"""
+
+
+class IngestPipeline:
+    """
+    爬取 → 规范化 → 去重 → 批量写入 的流式入库流水线
+    
+    用法:
+        pipeline = IngestPipeline(db, prune=True)
+        pipeline.run(targets)
+        print(pipeline.total_papers, pipeline.summary)
+    """
+    
+    def __init__(self, db: DatabaseManager, full: bool = False, prune: bool = False,
+                 concurrency: int = 8, queue_size: int = 1000, batch_size: int = 500,
+                 worker: Optional[str] = None, max_attempts: int = 3, lease: float = 3600,
+                 skip_unchanged: bool = True):
+        """
+        初始化流水线
+        
+        Args:
+            db: 数据库管理器，写入阶段在调用 run() 的线程中使用它
+            full: 全量模式，只插入新论文（调用方已清除旧数据）
+            prune: 增量模式下删除网站上已不存在的论文
+            concurrency: 同时爬取的目标数
+            queue_size: 每个阶段间队列的容量
+            batch_size: 每个事务写入的论文数
+            worker: 工作进程名称，设置后从作业日志领取目标并记录结果（目标需已登记）
+            max_attempts: 失败目标的最多尝试次数（作业日志）
+            lease: 其他进程领取的目标超过多少秒未完成时视为已放弃（作业日志）
+            skip_unchanged: 页面哈希与上次成功入库时相同时跳过解析（作业日志，增量模式）
+        """
+        self.db = db
+        self.full = full
+        self.prune = prune
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.worker = worker
+        self.max_attempts = max_attempts
+        self.lease = lease
+        self.skip_unchanged = skip_unchanged
+        self.total_papers = 0
+        # 增量模式下每个目标的统计 {"会议 年份": {'added', 'changed', 'unchanged', 'removed', 'failed'}}
+        self.summary: Dict[str, Dict[str, int]] = {}
+        self._abort = threading.Event()
+        self._unchanged: Dict[Tuple[str, int], Tuple[str, int]] = {}
+    
+    def run(self, targets: List[CrawlTarget]) -> Dict[str, int]:
+        """
+        爬取全部目标并写入数据库
+        
+        Args:
+            targets: 爬取目标列表
+        
+        Returns:
+            统计 {'succeeded': 成功目标数, 'failed': 失败目标数, 'papers': 写入的论文数,
+                  'skipped': 页面未变化而跳过的目标数（计入成功）}
+        """
+        self._abort.clear()
+        self._unchanged = {}
+        if self.worker is not None and self.skip_unchanged and not self.full:
+            self._unchanged = self.db.get_unchanged_candidates()
+        crawled = queue.Queue(maxsize=self.queue_size)
+        normalized = queue.Queue(maxsize=self.queue_size)
+        unique = queue.Queue(maxsize=self.queue_size)
+        started = time.monotonic()
+        
+        stages = [
+            threading.Thread(target=self._run_stage, args=(self._crawl_stage, targets, crawled),
+                             name='ingest-crawl', daemon=True),
+            threading.Thread(target=self._run_stage, args=(self._normalize_stage, crawled, normalized),
+                             name='ingest-normalize', daemon=True),
+            threading.Thread(target=self._run_stage, args=(self._dedupe_stage, normalized, unique),
+                             name='ingest-dedupe', daemon=True),
+        ]
+        for stage in stages:
+            stage.start()
+        
+        # 写入阶段在调用线程中运行，沿用调用方的数据库连接
+        try:
+            stats = self._write_stage(unique)
+        except _Aborted:
+            raise RuntimeError("入库流水线中止，详见上面的错误日志") from None
+        except BaseException:
+            self._abort.set()
+            raise
+        finally:
+            for stage in stages:
+                stage.join()
+        
+        logger.info(f"流式入库完成: {stats['succeeded']} 个目标成功 (页面未变化 {stats['skipped']} 个), "
+                    f"{stats['failed']} 个失败, 共 {stats['papers']} 篇论文, "
+                    f"用时 {time.monotonic() - started:.1f}s")
+        return stats
+    
+    def _run_stage(self, stage, *args):
+        """阶段线程入口：出错时中止整个流水线"""
+        try:
+            stage(*args)
+        except _Aborted:
+            pass
+        except Exception:
+            logger.exception(f"入库流水线 {threading.current_thread().name} 阶段出错")
+            self._abort.set()
+    
+    def _put(self, q: queue.Queue, item):
+        """放入队列，队列满时阻塞；流水线中止时抛出 _Aborted"""
+        while True:
+            if self._abort.is_set():
+                raise _Aborted()
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+    
+    def _get(self, q: queue.Queue):
+        """从队列取出一项，队列空时阻塞；流水线中止时抛出 _Aborted"""
+        while True:
+            if self._abort.is_set():
+                raise _Aborted()
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+    
+    def _crawl_stage(self, targets: List[CrawlTarget], out: queue.Queue):
+        """爬取阶段：多个线程并发爬取，各自领取下一个目标，逐篇放入队列"""
+        crawlers = {(conference, year): crawler for crawler, conference, year in targets}
+        remaining = iter(targets)
+        claimed: Set[Tuple[str, int]] = set()
+        lock = threading.Lock()
+        
+        def next_target() -> Optional[CrawlTarget]:
+            with lock:
+                if self.worker is None:
+                    return next(remaining, None)
+                # 本次运行领取过的目标不再领取（同一进程的线程共用 worker 名称，失败的目标留给下次运行）
+                job = self.db.claim_crawl_job(self.worker, crawlers.keys() - claimed,
+                                              self.max_attempts, self.lease)
+                if job is None:
+                    return None
+                claimed.add(job)
+                return crawlers[job], *job
+        
+        def work():
+            try:
+                target = next_target()
+                while target is not None:
+                    self._crawl_target(target, out)
+                    target = next_target()
+            finally:
+                if self.worker is not None:
+                    self.db.close_thread_connection()
+        
+        workers = max(1, min(self.concurrency, len(targets)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ingest-crawl') as executor:
+            futures = [executor.submit(work) for _ in range(workers)]
+            for future in futures:
+                future.result()
+        self._put(out, _STOP)
+    
+    def _crawl_target(self, target: CrawlTarget, out: queue.Queue):
+        """爬取单个目标，最后放入结束标记"""
+        crawler, conference, year = target
+        ok = False
+        content_hash = error = None
+        count = 0
+        try:
+            content = crawler.fetch_page(conference, year)
+            content_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()
+            previous = self._unchanged.get((conference, year))
+            if previous and previous[0] == content_hash:
+                logger.info(f"{conference} {year} 页面未变化，跳过解析 ({previous[1]} 篇)")
+                self._put(out, (_END, conference, year, (True, content_hash, None, True)))
+                return
+            for paper in crawler.iter_parse(conference, year, content):
+                self._put(out, (_PAPER, conference, year, paper))
+                count += 1
+            ok = True
+            logger.info(f"从 {conference} {year} 获取 {count} 篇论文")
+        except CrawlError as e:
+            error = str(e)
+            logger.warning(error)
+        except _Aborted:
+            raise
+        except Exception as e:
+            error = f"解析出错: {e}"
+            logger.error(f"解析 {conference} {year} 时出错 (已获取 {count} 篇): {e}")
+        self._put(out, (_END, conference, year, (ok, content_hash, error, False)))
+    
+    def _normalize_stage(self, inp: queue.Queue, out: queue.Queue):
+        """规范化阶段：统一为 Paper，过滤缺少标题或会议的记录，生成自然键"""
+        while True:
+            item = self._get(inp)
+            if item is _STOP:
+                self._put(out, _STOP)
+                return
+            kind, conference, year, paper = item
+            if kind == _PAPER:
+                paper = Paper.coerce(paper)
+                if paper.title and paper.conference:
+                    paper.paper_key = paper.natural_key()
+                else:
+                    paper = None
+                item = (kind, conference, year, paper)
+            self._put(out, item)
+    
+    def _dedupe_stage(self, inp: queue.Queue, out: queue.Queue):
+        """去重阶段：同一目标内按自然键只保留第一条，结束标记附带该目标的全部键"""
+        seen: Dict[Tuple[str, int], Set[str]] = {}
+        while True:
+            item = self._get(inp)
+            if item is _STOP:
+                self._put(out, _STOP)
+                return
+            kind, conference, year, payload = item
+            keys = seen.setdefault((conference, year), set())
+            if kind == _END:
+                del seen[conference, year]
+                item = (kind, conference, year, (payload, keys))
+            elif payload is not None:
+                if payload.paper_key in keys:
+                    logger.debug(f"跳过重复论文: {payload.paper_key}")
+                    continue
+                keys.add(payload.paper_key)
+            self._put(out, item)
+    
+    def _write_stage(self, inp: queue.Queue) -> Dict[str, int]:
+        """写入阶段：按目标累积批次，达到批量或目标结束时提交"""
+        stats = {'succeeded': 0, 'failed': 0, 'papers': 0, 'skipped': 0}
+        counts: Dict[Tuple[str, int], Dict[str, int]] = {}
+        batches: Dict[Tuple[str, int], List[Paper]] = {}
+        
+        while True:
+            item = self._get(inp)
+            if item is _STOP:
+                return stats
+            kind, conference, year, payload = item
+            target = (conference, year)
+            target_counts = counts.setdefault(target, self._empty_counts())
+            
+            if kind == _PAPER:
+                if payload is None:
+                    target_counts['failed'] += 1
+                    continue
+                batch = batches.setdefault(target, [])
+                batch.append(payload)
+                if len(batch) >= self.batch_size:
+                    self._flush(batches.pop(target), target_counts)
+                continue
+            
+            (ok, content_hash, error, skipped), keys = payload
+            del counts[target]
+            if skipped:
+                paper_count = self._unchanged[target][1]
+                self.summary[f"{conference} {year}"] = dict(self._empty_counts(), unchanged=paper_count)
+                self.db.finish_crawl_job(conference, year, self.worker, True, content_hash)
+                stats['succeeded'] += 1
+                stats['skipped'] += 1
+                continue
+            
+            self._flush(batches.pop(target, []), target_counts)
+            self._finish_target(conference, year, ok, keys, target_counts)
+            if self.worker is not None:
+                if ok and not keys:
+                    error = '未找到论文'
+                # 只记录成功入库的页面哈希，失败的目标下次必须重新解析
+                succeeded = ok and bool(keys)
+                self.db.finish_crawl_job(conference, year, self.worker, succeeded,
+                                         content_hash if succeeded else None, len(keys), error)
+            stats['succeeded' if ok and keys else 'failed'] += 1
+            stats['papers'] += len(keys)
+    
+    def _empty_counts(self) -> Dict[str, int]:
+        if self.full:
+            return {'inserted': 0, 'duplicates': 0, 'failed': 0}
+        return {'added': 0, 'changed': 0, 'unchanged': 0, 'removed': 0, 'failed': 0}
+    
+    def _flush(self, batch: List[Paper], target_counts: Dict[str, int]):
+        """提交一批论文并累加统计"""
+        if not batch:
+            return
+        if self.full:
+            result = self.db.insert_papers(batch, batch_size=len(batch))
+        else:
+            result = self.db.upsert_papers(batch, batch_size=len(batch))
+        for key, value in result.items():
+            target_counts[key] += value
+        self.total_papers += len(batch)
+    
+    def _finish_target(self, conference: str, year: int, ok: bool, keys: Set[str],
+                       target_counts: Dict[str, int]):
+        """目标结束：输出统计，完整爬取成功时检查网站上已移除的论文"""
+        if not keys:
+            logger.warning(f"  ✗ {conference} {year} 未找到论文")
+            return
+        
+        if self.full:
+            logger.info(f"  {conference} {year}: 新增 {target_counts['inserted']}, "
+                        f"已存在 {target_counts['duplicates']}, 失败 {target_counts['failed']}")
+        else:
+            # 爬取中断时不做移除判断，避免把未解析到的论文误判为已删除
+            if ok:
+                stale = self.db.stale_paper_keys(conference, year, keys)
+                target_counts['removed'] = len(stale)
+                if self.prune and stale:
+                    self.db.delete_papers_by_keys(stale)
+            self.summary[f"{conference} {year}"] = target_counts
+            logger.info(f"  {conference} {year}: 新增 {target_counts['added']}, "
+                        f"更新 {target_counts['changed']}, 未变 {target_counts['unchanged']}, "
+                        f"网站已移除 {target_counts['removed']}")
+        
+        if ok:
+            logger.info(f"  ✓ {conference} {year} 完成")
+        else:
+            logger.warning(f"  ✗ {conference} {year} 爬取中断，已写入 {len(keys)} 篇")
@@ -0,0 +1,138 @@
+"""
+会议注册表 - 每个会议的爬虫、URL特征和PDF链接规则
+
+注册信息只包含字符串形式的入口（"模块:属性"），导入本模块不会导入任何
+爬虫、requests 或HTML解析库；第一次用到某个会议的爬虫或链接规则时才导入
+对应模块。只查询数据库的命令因此不必承担爬虫依赖的导入开销。
+
+新增会议时在 CONFERENCES 中注册一项，爬虫类实现 build_url/iter_parse 即可。
+"""
+import importlib
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+# 已解析的入口 -> 对象
+_loaded: Dict[str, Any] = {}
+
+
+def load_entry_point(entry_point: str) -> Any:
+    """
+    按 "模块:属性" 导入对象，结果会被缓存
+    
+    Args:
+        entry_point: 如 "crawlers.iacr_crawler:IACRCrawler"
+    """
+    obj = _loaded.get(entry_point)
+    if obj is None:
+        module_name, _, attr = entry_point.partition(':')
+        obj = getattr(importlib.import_module(module_name), attr)
+        _loaded[entry_point] = obj
+    return obj
+
+
+class Conference:
+    """一个会议的注册信息"""
+    
+    __slots__ = ('name', 'group', 'crawler', 'url_patterns', 'pdf_link')
+    
+    def __init__(self, name: str, group: str, crawler: str, url_patterns: Tuple[str, ...],
+                 pdf_link: Optional[str] = None):
+        """
+        Args:
+            name: 会议名称，与数据库中的 conference 一致
+            group: 分组名称，用于汇总输出
+            crawler: 爬虫类的入口
+            url_patterns: 会议网站的域名特征，论文URL包含其中之一即属于该会议网站
+            pdf_link: PDF链接规则的入口，函数签名 (paper, conference) -> Optional[str]
+        """
+        self.name = name
+        self.group = group
+        self.crawler = crawler
+        self.url_patterns = url_patterns
+        self.pdf_link = pdf_link
+    
+    def matches(self, url: Optional[str]) -> bool:
+        """URL是否属于会议网站"""
+        return bool(url) and any(pattern in url for pattern in self.url_patterns)
+    
+    def crawler_class(self) -> type:
+        """导入并返回爬虫类"""
+        return load_entry_point(self.crawler)
+    
+    def link_rule(self) -> Optional[Callable[[Mapping[str, Any], 'Conference'], Optional[str]]]:
+        """导入并返回PDF链接规则，未注册时返回None"""
+        return load_entry_point(self.pdf_link) if self.pdf_link else None
+    
+    def __repr__(self):
+        return f"Conference({self.name!r}, crawler={self.crawler!r})"
+
+
+IACR_GROUP = 'IACR会议'
+SECURITY_GROUP = '四大安全会议'
+
+_IACR = 'crawlers.iacr_crawler:IACRCrawler'
+_SECURITY = 'crawlers.security_crawler:SecurityCrawler'
+
+# 会议名称 -> 注册信息
+CONFERENCES: Dict[str, Conference] = {}
+
+
+def register(conference: Conference) -> Conference:
+    """注册会议，同名会议被覆盖"""
+    CONFERENCES[conference.name] = conference
+    return conference
+
+
+for _conference in (
+    Conference('CRYPTO', IACR_GROUP, _IACR, ('iacr.org',), 'crawlers.links:iacr_pdf_link'),
+    Conference('EUROCRYPT', IACR_GROUP, _IACR, ('iacr.org',), 'crawlers.links:iacr_pdf_link'),
+    Conference('ASIACRYPT', IACR_GROUP, _IACR, ('iacr.org',), 'crawlers.links:iacr_pdf_link'),
+    Conference('USENIX Security', SECURITY_GROUP, _SECURITY, ('usenix.org',),
+               'crawlers.links:usenix_pdf_link'),
+    Conference('NDSS', SECURITY_GROUP, _SECURITY, ('ndss-symposium.org',),
+               'crawlers.links:site_page_link'),
+    Conference('IEEE S&P', SECURITY_GROUP, _SECURITY, ('ieee-security.org',),
+               'crawlers.links:site_page_link'),
+    Conference('CCS', SECURITY_GROUP, _SECURITY, ('sigsac.org', 'acm.org')),
+):
+    register(_conference)
+
+
+def get(name: str) -> Optional[Conference]:
+    """按名称查找会议"""
+    return CONFERENCES.get(name)
+
+
+def names(group: Optional[str] = None) -> List[str]:
+    """已注册的会议名称，可按分组过滤"""
+    return [name for name, conf in CONFERENCES.items() if group is None or conf.group == group]
+
+
+def create_crawlers(conferences: Iterable[str], config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    为会议创建爬虫，使用同一爬虫类的会议共用一个实例
+    
+    Args:
+        conferences: 会议名称
+        config: 爬虫配置
+    
+    Returns:
+        {会议名称: 爬虫实例}
+    
+    Raises:
+        KeyError: 会议未注册
+    """
+    instances: Dict[str, Any] = {}
+    crawlers = {}
+    for name in conferences:
+        entry_point = CONFERENCES[name].crawler
+        if entry_point not in instances:
+            instances[entry_point] = load_entry_point(entry_point)(config)
+        crawlers[name] = instances[entry_point]
+    return crawlers
+
+
+def generate_pdf_link(paper: Mapping[str, Any]) -> Optional[str]:
+    """按会议注册的规则为论文生成PDF链接，没有规则时返回None"""
+    conference = CONFERENCES.get(paper.get('conference') or '')
+    rule = conference.link_rule() if conference else None
+    return rule(paper, conference) if rule else None
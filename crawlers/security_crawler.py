@@ -4,12 +4,70 @@
 """
 import logging
 import re
-from typing import List, Dict, Any, Optional
-from bs4 import BeautifulSoup
+from collections import deque
+from typing import Dict, Any, Iterator, List, Optional
+from urllib.parse import urljoin, urlsplit
 from crawlers.base_crawler import BaseCrawler
+from crawlers.html_backend import Node
+from utils.models import Paper
 
 logger = logging.getLogger(__name__)
 
+# CCS论文条目和作者元素的类名
+_CCS_ITEM_CLASS = re.compile(r'paper|publication', re.I)
+_CCS_AUTHOR_CLASS = re.compile(r'author', re.I)
+_HEADING_TAGS = ('h1', 'h2', 'h3', 'h4')
+
+# 详情页中的元素
+_DOI_PATTERN = re.compile(r'\b(10\.\d{4,9}/[^\s"<>?#]+)')
+_USENIX_ABSTRACT_CLASS = re.compile(r'field-name-field-paper-description')
+_USENIX_PDF_CLASS = re.compile(r'field-name-field-final-paper-pdf')
+_NDSS_PAPER_CLASS = re.compile(r'paper-data')
+_ACM_ABSTRACT_CLASS = re.compile(r'abstractSection')
+
+
+def _meta_tags(doc: Node) -> Dict[str, List[str]]:
+    """页面中的 <meta name/property=... content=...>，名称小写 -> 全部取值"""
+    metas: Dict[str, List[str]] = {}
+    for meta in doc.find_all('meta'):
+        name = (meta.get('name') or meta.get('property')).lower()
+        content = meta.get('content').strip()
+        if name and content:
+            metas.setdefault(name, []).append(content)
+    return metas
+
+
+def _find_doi(*candidates: Optional[str]) -> str:
+    """从候选字符串（meta取值、URL）中提取第一个DOI"""
+    for candidate in candidates:
+        match = _DOI_PATTERN.search(candidate or '')
+        if match:
+            return match.group(1).rstrip('.,;')
+    return ''
+
+
+def _paragraphs(node: Node) -> str:
+    """
+    节点中各段落的文本，段落之间空一行
+    
+    只取不再包含段落的 <p>（容忍 html.parser 不闭合的嵌套段落），没有段落时取整个节点的文本。
+    """
+    texts = [p.text(strip=False) for p in node.find_all('p') if p.find('p') is None] or [node.text(strip=False)]
+    paragraphs = [' '.join(text.split()) for text in texts]
+    return '\n\n'.join(text for text in paragraphs if text)
+
+
+def _pdf_link(node: Optional[Node]) -> str:
+    """节点中的PDF链接，优先文本为 Paper 的链接"""
+    if node is None:
+        return ''
+    links = [a for a in node.find_all('a')
+             if urlsplit(a.get('href')).path.lower().endswith('.pdf')]
+    for link in links:
+        if 'paper' in link.text().lower():
+            return link.get('href')
+    return links[0].get('href') if links else ''
+
 
 class SecurityCrawler(BaseCrawler):
     """四大安全会议爬虫"""
@@ -22,6 +80,9 @@ class SecurityCrawler(BaseCrawler):
         'CCS': 'https://www.sigsac.org/ccs/CCS{year}/accepted-papers.html'
     }
     
+    # 列表页链接到单篇论文详情页的会议（IEEE S&P 的列表页没有单篇论文的链接）
+    DETAIL_PAGE_CONFERENCES = ('USENIX Security', 'NDSS', 'CCS')
+    
     # 特殊年份的URL映射（某些年份URL格式不同）
     SPECIAL_URLS = {
         ('USENIX Security', 2025): 'https://www.usenix.org/conference/usenixsecurity25/technical-sessions',
@@ -32,149 +93,150 @@ class SecurityCrawler(BaseCrawler):
         """初始化爬虫"""
         super().__init__(config)
     
-    def crawl(self, conference: str, year: int) -> List[Dict[str, Any]]:
+    def build_url(self, conference: str, year: int) -> str:
+        """生成会议论文列表页的URL"""
+        # 首先检查是否有特殊URL
+        url_key = (conference, year)
+        if url_key in self.SPECIAL_URLS:
+            return self.SPECIAL_URLS[url_key]
+        
+        url_template = self.CONFERENCE_URLS[conference]
+        # 对于不同年份的会议，URL格式可能不同
+        if year < 2025:
+            # 2025之前的会议可能使用简短的年份格式
+            return url_template.format(year=str(year)[-2:])
+        return url_template.format(year=year)
+    
+    def iter_parse(self, conference: str, year: int, content: str) -> Iterator[Paper]:
         """
-        爬取指定会议的论文
+        根据不同会议使用不同的解析方法，逐篇生成论文
         
         Args:
             conference: 会议名称 (USENIX Security, NDSS, IEEE S&P, CCS)
             year: 年份
-            
-        Returns:
-            论文列表
+            content: HTML文本
         """
-        if conference not in self.CONFERENCE_URLS:
-            logger.error(f"不支持的会议: {conference}")
-            return []
-        
-        # 首先检查是否有特殊URL
-        url_key = (conference, year)
-        if url_key in self.SPECIAL_URLS:
-            url = self.SPECIAL_URLS[url_key]
-        else:
-            url_template = self.CONFERENCE_URLS[conference]
-            # 对于不同年份的会议，URL格式可能不同
-            if year < 2025:
-                # 2025之前的会议可能使用简短的年份格式
-                url = url_template.format(year=str(year)[-2:])
-            else:
-                url = url_template.format(year=year)
-        
-        logger.info(f"爬取 {conference} {year} 从 {url}")
-        
-        try:
-            html_content = self._fetch_url(url)
-            if not html_content:
-                logger.warning(f"无法获取 {conference} {year} 的页面内容")
-                return []
-            
-            # 根据不同会议使用不同的解析方法
-            if conference == 'USENIX Security':
-                papers = self._parse_usenix_security(html_content, year)
-            elif conference == 'NDSS':
-                papers = self._parse_ndss(html_content, year)
-            elif conference == 'IEEE S&P':
-                papers = self._parse_ieee_sp(html_content, year)
-            elif conference == 'CCS':
-                papers = self._parse_ccs(html_content, year)
-            else:
-                papers = []
-            
-            logger.info(f"从 {conference} {year} 获取 {len(papers)} 篇论文")
-            return papers
-            
-        except Exception as e:
-            logger.error(f"爬取 {conference} {year} 时出错: {e}")
-            return []
+        if conference == 'USENIX Security':
+            return self._parse_usenix_security(content, year)
+        elif conference == 'NDSS':
+            return self._parse_ndss(content, year)
+        elif conference == 'IEEE S&P':
+            return self._parse_ieee_sp(content, year)
+        elif conference == 'CCS':
+            return self._parse_ccs(content, year)
+        return iter(())
     
-    def _parse_usenix_security(self, html: str, year: int) -> List[Dict[str, Any]]:
+    def _parse_usenix_security(self, html: str, year: int) -> Iterator[Paper]:
         """解析USENIX Security页面"""
-        soup = BeautifulSoup(html, 'html.parser')
-        papers = []
+        doc = self.parse_html(html)
+        if doc is None:
+            return
         
         # USENIX的论文通常在<h2>标签中，链接在<a>标签中
-        for heading in soup.find_all('h2'):
+        for heading in doc.find_all('h2'):
             link = heading.find('a')
             if not link:
                 continue
             
-            title = link.get_text(strip=True)
+            title = link.text()
             paper_url = link.get('href', '')
             if paper_url and not paper_url.startswith('http'):
                 paper_url = 'https://www.usenix.org' + paper_url
             
             # 查找作者信息（通常在标题下方）
-            next_elem = heading.find_next_sibling()
+            next_elem = heading.next_sibling()
             authors = ''
             if next_elem:
-                authors_text = next_elem.get_text(strip=True)
+                authors_text = next_elem.text()
                 # 清理作者信息，移除"Short Presentation"等标记
                 authors = re.sub(r'Short Presentation.*$', '', authors_text, flags=re.IGNORECASE)
                 authors = re.sub(r'Distinguished Paper.*$', '', authors, flags=re.IGNORECASE)
                 authors = authors.strip()
             
-            paper = {
-                'title': title,
-                'authors': authors,
-                'conference': 'USENIX Security',
-                'year': year,
-                'url': paper_url,
-                'abstract': '',  # USENIX页面通常不包含摘要
-                'doi': '',
-                'pdf_url': paper_url  # 论文URL通常就是PDF链接
-            }
-            papers.append(paper)
-        
-        return papers
+            paper = Paper(
+                title,
+                'USENIX Security',
+                year,
+                authors=authors,
+                url=paper_url,
+                abstract='',  # USENIX页面通常不包含摘要
+                doi='',
+                pdf_url=paper_url  # 论文URL通常就是PDF链接
+            )
+            yield paper
     
-    def _parse_ndss(self, html: str, year: int) -> List[Dict[str, Any]]:
-        """解析NDSS页面"""
-        soup = BeautifulSoup(html, 'html.parser')
-        papers = []
+    def _parse_ndss(self, html: str, year: int) -> Iterator[Paper]:
+        """
+        解析NDSS页面
         
-        # NDSS的论文在<h3>标签中
-        for heading in soup.find_all('h3'):
-            title_text = heading.get_text(strip=True)
-            
-            # 查找论文链接
-            paper_link = heading.find_next('a', string='More Details')
-            paper_url = ''
-            if paper_link:
-                paper_url = paper_link.get('href', '')
+        每个<h3>标题配对其后第一个<p>（作者）和第一个文本为"More Details"的链接。
+        按文档顺序单次遍历 h3/p/a：遇到标题时登记为待配对，遇到段落或链接时
+        分配给所有仍在等待的标题。结果与对每个标题向后查找相同，但总代价为 O(n)。
+        前面的条目都配对完成后按顺序立即生成，不等整页遍历结束。
+        """
+        doc = self.parse_html(html)
+        if doc is None:
+            return
+        
+        pending = deque()  # 尚未生成的条目 [标题, 作者, 链接]，None表示未配对
+        waiting_authors = []
+        waiting_link = []
+        for node in doc.find_all(('h3', 'p', 'a')):
+            tag = node.tag
+            if tag == 'h3':
+                # NDSS的论文在<h3>标签中
+                entry = [node.text(), None, None]
+                pending.append(entry)
+                waiting_authors.append(entry)
+                waiting_link.append(entry)
+            elif tag == 'p':
+                # 作者信息在标题下方的段落中
+                if waiting_authors:
+                    authors = node.text()
+                    for entry in waiting_authors:
+                        entry[1] = authors
+                    waiting_authors = []
+            elif waiting_link and node.string == 'More Details':
+                paper_url = node.get('href', '')
                 if paper_url and not paper_url.startswith('http'):
                     paper_url = 'https://www.ndss-symposium.org' + paper_url
+                for entry in waiting_link:
+                    entry[2] = paper_url
+                waiting_link = []
             
-            # 查找作者信息（通常在标题下方的段落中）
-            next_p = heading.find_next('p')
-            authors = ''
-            if next_p:
-                authors = next_p.get_text(strip=True)
-            
-            paper = {
-                'title': title_text,
-                'authors': authors,
-                'conference': 'NDSS',
-                'year': year,
-                'url': paper_url,
-                'abstract': '',
-                'doi': '',
-                'pdf_url': ''
-            }
-            papers.append(paper)
+            while pending and pending[0][1] is not None and pending[0][2] is not None:
+                yield self._ndss_paper(pending.popleft(), year)
         
-        return papers
+        # 页面末尾仍未配对的字段留空
+        for entry in pending:
+            yield self._ndss_paper(entry, year)
     
-    def _parse_ieee_sp(self, html: str, year: int) -> List[Dict[str, Any]]:
+    @staticmethod
+    def _ndss_paper(entry, year: int) -> Paper:
+        title_text, authors, paper_url = entry
+        return Paper(
+            title_text,
+            'NDSS',
+            year,
+            authors=authors or '',
+            url=paper_url or '',
+            abstract='',
+            doi='',
+            pdf_url=''
+        )
+    
+    def _parse_ieee_sp(self, html: str, year: int) -> Iterator[Paper]:
         """解析IEEE S&P页面"""
-        soup = BeautifulSoup(html, 'html.parser')
-        papers = []
+        doc = self.parse_html(html)
+        if doc is None:
+            return
         
         # IEEE S&P的论文标题在<b>标签中（不是<strong>）
-        # 标题和作者信息都在同一个div中
-        bold_tags = soup.find_all('b')
+        # 标题和作者信息都在同一个div中；同一父元素只取一次文本
+        parent_texts = {}
         
-        for b in bold_tags:
-            title = b.get_text(strip=True)
+        for b in doc.find_all('b'):
+            title = b.text()
             
             # 跳过太短的文本（可能是标题或导航）
             if len(title) < 10:
@@ -182,66 +244,152 @@ class SecurityCrawler(BaseCrawler):
             
             # 获取作者信息（在同一个父元素中）
             parent = b.parent
-            parent_text = parent.get_text(strip=True)
+            parent_text = parent_texts.get(parent)
+            if parent_text is None:
+                parent_text = parent_texts[parent] = parent.text()
             # 从父元素文本中移除标题，剩下的就是作者
             authors = parent_text.replace(title, '', 1).strip()
             
-            paper = {
-                'title': title,
-                'authors': authors,
-                'conference': 'IEEE S&P',
-                'year': year,
-                'url': f'https://www.ieee-security.org/TC/SP{year}/',
-                'abstract': '',
-                'doi': '',
-                'pdf_url': ''
-            }
-            papers.append(paper)
-        
-        return papers
+            paper = Paper(
+                title,
+                'IEEE S&P',
+                year,
+                authors=authors,
+                url=f'https://www.ieee-security.org/TC/SP{year}/',
+                abstract='',
+                doi='',
+                pdf_url=''
+            )
+            yield paper
     
-    def _parse_ccs(self, html: str, year: int) -> List[Dict[str, Any]]:
+    def _parse_ccs(self, html: str, year: int) -> Iterator[Paper]:
         """解析CCS页面"""
-        soup = BeautifulSoup(html, 'html.parser')
-        papers = []
+        doc = self.parse_html(html)
+        if doc is None:
+            return
         
         # CCS的论文格式类似NDSS
-        for item in soup.find_all(['div', 'li'], class_=re.compile(r'paper|publication', re.I)):
-            title_elem = item.find(['h1', 'h2', 'h3', 'h4'])
+        for item in doc.find_all(['div', 'li'], class_=_CCS_ITEM_CLASS):
+            # 单次遍历条目的后代，同时找出第一个标题、作者元素和链接
+            title_elem = author_elem = link = None
+            for node in item.find_all():
+                tag = node.tag
+                if title_elem is None and tag in _HEADING_TAGS:
+                    title_elem = node
+                if link is None and tag == 'a':
+                    link = node
+                if author_elem is None and node.has_class(_CCS_AUTHOR_CLASS):
+                    author_elem = node
+                if title_elem and link and author_elem:
+                    break
             if not title_elem:
                 continue
             
-            title = title_elem.get_text(strip=True)
+            title = title_elem.text()
             
             # 查找作者
             authors = ''
-            author_elem = item.find(class_=re.compile(r'author', re.I))
             if not author_elem:
                 # 尝试在下一个段落中找作者
                 next_p = title_elem.find_next(['p', 'span'])
                 if next_p:
-                    authors = next_p.get_text(strip=True)
+                    authors = next_p.text()
             else:
-                authors = author_elem.get_text(strip=True)
+                authors = author_elem.text()
             
-            # 查找链接
-            link = item.find('a')
+            # 链接
             paper_url = ''
             if link:
                 paper_url = link.get('href', '')
                 if paper_url and not paper_url.startswith('http'):
                     paper_url = 'https://www.sigsac.org' + paper_url
             
-            paper = {
-                'title': title,
-                'authors': authors,
-                'conference': 'CCS',
-                'year': year,
-                'url': paper_url,
-                'abstract': '',
-                'doi': '',
-                'pdf_url': ''
-            }
-            papers.append(paper)
+            paper = Paper(
+                title,
+                'CCS',
+                year,
+                authors=authors,
+                url=paper_url,
+                abstract='',
+                doi='',
+                pdf_url=''
+            )
+            yield paper
+    
+    def parse_detail(self, conference: str, url: str, content: str) -> Dict[str, str]:
+        """
+        解析论文详情页，提取摘要、PDF链接和DOI
+        
+        先读取 Highwire/Dublin Core 元数据（citation_abstract、citation_pdf_url、
+        citation_doi、dc.identifier），缺少的字段再按各会议的页面结构查找。
+        
+        Args:
+            conference: 会议名称
+            url: 详情页URL
+            content: HTML文本
+            
+        Returns:
+            找到的字段 {'abstract', 'pdf_url', 'doi'}，未找到的字段不出现
+        """
+        doc = self.parse_html(content)
+        if doc is None:
+            return {}
         
-        return papers
+        metas = _meta_tags(doc)
+        abstract = next(iter(metas.get('citation_abstract', []) + metas.get('dc.description', [])), '')
+        details = {
+            'abstract': ' '.join(abstract.split()),
+            'pdf_url': next(iter(metas.get('citation_pdf_url', [])), ''),
+            'doi': _find_doi(*metas.get('citation_doi', []), *metas.get('dc.identifier', []), url),
+        }
+        
+        if conference == 'USENIX Security':
+            self._usenix_detail(doc, details)
+        elif conference == 'NDSS':
+            self._ndss_detail(doc, details)
+        elif conference == 'CCS':
+            self._ccs_detail(doc, details)
+        
+        if details['pdf_url']:
+            details['pdf_url'] = urljoin(url, details['pdf_url'])
+        return {name: value for name, value in details.items() if value}
+    
+    @staticmethod
+    def _usenix_detail(doc: Node, details: Dict[str, str]):
+        """USENIX presentation 页面：摘要和论文PDF在各自的 Drupal 字段中"""
+        if not details['abstract']:
+            description = doc.find('div', class_=_USENIX_ABSTRACT_CLASS)
+            if description is not None:
+                details['abstract'] = _paragraphs(description)
+        if not details['pdf_url']:
+            details['pdf_url'] = _pdf_link(doc.find('div', class_=_USENIX_PDF_CLASS))
+    
+    @staticmethod
+    def _ndss_detail(doc: Node, details: Dict[str, str]):
+        """NDSS 论文页面：paper-data 中第一段是作者，其后是摘要；PDF为 Paper 按钮"""
+        paper_data = doc.find('div', class_=_NDSS_PAPER_CLASS)
+        if paper_data is None:
+            return
+        if not details['abstract']:
+            paragraphs = _paragraphs(paper_data).split('\n\n')
+            details['abstract'] = '\n\n'.join(paragraphs[1:])
+        if not details['pdf_url']:
+            details['pdf_url'] = _pdf_link(doc)
+    
+    @staticmethod
+    def _ccs_detail(doc: Node, details: Dict[str, str]):
+        """CCS 论文多链接到 ACM Digital Library，PDF地址可由DOI得出"""
+        if not details['abstract']:
+            section = next((node for node in doc.find_all('section') if node.get('id') == 'abstract'),
+                           None) or doc.find('div', class_=_ACM_ABSTRACT_CLASS)
+            if section is not None:
+                heading = section.find(_HEADING_TAGS)
+                abstract = _paragraphs(section)
+                if heading is not None and abstract.startswith(heading.text()):
+                    abstract = abstract[len(heading.text()):].lstrip()
+                details['abstract'] = abstract
+        if not details['pdf_url']:
+            if details['doi'].startswith('10.1145/'):
+                details['pdf_url'] = f"https://dl.acm.org/doi/pdf/{details['doi']}"
+            else:
+                details['pdf_url'] = _pdf_link(doc)
@@ -2,17 +2,25 @@
 论文工具集 - 导出、下载、管理一体化工具
 """
 import os
-import sqlite3
 import json
-import requests
-import time
 import argparse
+import time
+from contextlib import asynccontextmanager, contextmanager
 from pathlib import Path
-from typing import List, Dict
+from typing import TYPE_CHECKING, Callable, List, Dict, Optional, Tuple
 import logging
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
+from crawlers import registry
+from utils.database import DatabaseManager, connect, iter_rows
+from utils.models import Paper
+
+if TYPE_CHECKING:
+    from utils.rate_limiter import RateLimiter
+    from utils.status_recorder import DownloadStatusRecorder
+
+# requests 和限速器（asyncio）只在下载时导入，导出和状态查询命令不加载它们
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s'
@@ -23,77 +31,104 @@ logger = logging.getLogger(__name__)
 # ==================== PDF链接生成器 ====================
 
 class PDFLinkGenerator:
-    """生成论文PDF下载链接"""
-    
-    @staticmethod
-    def get_iacr_pdf_link(url: str) -> str:
-        """从IACR URL提取PDF链接"""
-        if not url or 'eprint.iacr.org' not in url:
-            return None
-        try:
-            parts = url.rstrip('/').split('/')
-            if len(parts) >= 2:
-                year, paper_id = parts[-2], parts[-1]
-                return f"https://eprint.iacr.org/{year}/{paper_id}.pdf"
-        except:
-            pass
-        return None
-    
-    @staticmethod
-    def get_usenix_pdf_link(url: str, title: str) -> str:
-        """构建USENIX PDF链接"""
-        if not url or 'usenix.org' not in url:
-            return None
-        try:
-            slug = title.lower()
-            slug = ''.join(c if c.isalnum() or c == ' ' else '' for c in slug)
-            slug = '-'.join(slug.split())[:50]
-            return f"https://www.usenix.org/system/files/usenixsecurity25/usenixsecurity25-{slug}.pdf"
-        except:
-            pass
-        return None
-    
-    @staticmethod
-    def get_ndss_pdf_link(url: str) -> str:
-        """NDSS使用详情页链接"""
-        if url and 'ndss-symposium.org' in url:
-            return url
-        return None
-    
-    @staticmethod
-    def get_ieee_sp_pdf_link(url: str) -> str:
-        """IEEE S&P使用会议主页"""
-        if url and 'ieee-security.org' in url:
-            return url
-        return None
+    """生成论文PDF下载链接（各会议的规则注册在 crawlers.registry 中，按需导入）"""
     
     @staticmethod
     def generate_pdf_link(paper: Dict) -> str:
         """为论文生成PDF链接"""
-        url = paper.get('url', '')
-        conference = paper.get('conference', '')
-        title = paper.get('title', '')
-        
-        if 'CRYPTO' in conference or 'EUROCRYPT' in conference or 'ASIACRYPT' in conference:
-            return PDFLinkGenerator.get_iacr_pdf_link(url)
-        elif 'USENIX' in conference:
-            return PDFLinkGenerator.get_usenix_pdf_link(url, title)
-        elif 'NDSS' in conference:
-            return PDFLinkGenerator.get_ndss_pdf_link(url)
-        elif 'S&P' in conference or 'S & P' in conference:
-            return PDFLinkGenerator.get_ieee_sp_pdf_link(url)
-        
-        return None
+        return registry.generate_pdf_link(paper)
 
 
 # ==================== PDF下载器 ====================
 
+# PDF文件头
+PDF_MAGIC = b'%PDF-'
+
+# 默认每次读取和写入的块大小
+DEFAULT_CHUNK_SIZE = 256 * 1024
+
+
+def parse_content_range(value: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+    """
+    解析 Content-Range 响应头
+    
+    Args:
+        value: 如 "bytes 100-999/1000" 或 "bytes */1000"
+        
+    Returns:
+        (起始字节, 文件总长度)，无法解析的部分为None
+    """
+    if not value or not value.startswith('bytes '):
+        return None, None
+    span, _, total = value[len('bytes '):].partition('/')
+    start = span.split('-', 1)[0]
+    return (int(start) if start.isdigit() else None,
+            int(total) if total.isdigit() else None)
+
+
+def conference_dir(conference: str, year) -> str:
+    """论文PDF所在的目录名 <会议>_<年份>"""
+    return f"{conference.replace(' ', '_').replace('/', '_')}_{year}"
+
+
+def is_complete_pdf(path: Path) -> bool:
+    """文件以 %PDF- 开头、末尾附近有 %%EOF 标记（排除中断后残缺的文件）"""
+    try:
+        with open(path, 'rb') as f:
+            if f.read(len(PDF_MAGIC)) != PDF_MAGIC:
+                return False
+            f.seek(max(0, os.fstat(f.fileno()).st_size - 2048))
+            return b'%%EOF' in f.read()
+    except OSError:
+        return False
+
+
 class PDFDownloader:
-    """PDF批量下载器"""
+    """
+    PDF批量下载器
+    
+    每个文件先写入同目录下的 <文件名>.part，校验文件头和长度后移入内容存储
+    （<输出目录>/objects/，见 utils.blob_store），再在 <会议>_<年份>/<id>_<标题>.pdf
+    建立指向它的硬链接，最终路径上因此不会出现半个文件。连接中断时 .part 保留
+    已收到的部分，在本次调用中或下次运行时用 Range 请求从断点续传。
+    
+    论文记录的内容哈希（pdf_sha256）或同一 pdf_url 的内容已在存储中时只建立
+    链接，不再下载；不同论文下载到相同内容时只保存一份。
     
-    def __init__(self, db_path='data/papers.db', output_dir='data/pdfs'):
+    批量下载只选取尚未下载（download_status 为 pending 或 failed）的论文，每篇
+    论文的结果（状态、路径、字节数、哈希、耗时或错误信息）随下载进度写入数据库。
+    失败的论文按 download_log 中的失败历史退避重试，反复失败的论文被搁置
+    （见 utils.retry_scheduler）。
+    """
+    
+    def __init__(self, db_path='data/papers.db', output_dir='data/pdfs',
+                 rate_limiter: 'RateLimiter' = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 max_resumes: int = 3, retry_options: Dict[str, float] = None):
+        """
+        Args:
+            db_path: 数据库路径
+            output_dir: PDF保存目录
+            rate_limiter: 共享的限速器，默认按站点的默认速率创建
+            chunk_size: 每次读取和写入的字节数
+            max_resumes: 一次下载中连接中断后立即续传的最多次数（每次都须有新进展）
+            retry_options: RetryScheduler 的退避参数，如 {'base_delay': 600}
+        """
+        import requests
+        from utils.blob_store import BlobStore
+        from utils.rate_limiter import RateLimiter
+        
         self.db_path = db_path
         self.output_dir = output_dir
+        self.chunk_size = chunk_size
+        self.max_resumes = max_resumes
+        self.retry_options = retry_options or {}
+        self.store = BlobStore(Path(output_dir) / 'objects')
+        # 本次批量下载中 pdf_url -> 已存入的内容哈希（之前下载的由查询带出，见 url_sha256）
+        self.known_hashes: Dict[str, str] = {}
+        # 批量下载期间的下载状态写入队列
+        self.recorder: Optional['DownloadStatusRecorder'] = None
+        # 按站点限速，代替逐篇提交前的固定 sleep
+        self.rate_limiter = rate_limiter or RateLimiter()
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
@@ -107,110 +142,656 @@ class PDFDownloader:
             filename = filename.replace(char, '_')
         return filename[:200]
     
-    def download_pdf(self, paper: Dict, timeout: int = 30) -> bool:
-        """下载单个PDF"""
+    def download_pdf(self, paper: Dict, timeout: int = 30, reserved: bool = False) -> bool:
+        """
+        下载单个PDF，中断时从 .part 续传
+        
+        Args:
+            paper: 论文字典（id, title, conference, year, pdf_url）
+            timeout: 请求超时（秒）
+            reserved: 第一个请求已由调度器向限速器预约，不再 acquire
+        """
+        import requests
+        from utils.rate_limiter import CircuitOpenError
+        
         if not paper['pdf_url']:
             return False
         
-        conference = paper['conference'].replace(' ', '_').replace('/', '_')
-        year = paper['year']
+        filepath, part = self._prepare(paper)
+        if part is None:
+            return True
+        
+        url = paper['pdf_url']
+        started = time.monotonic()
+        for attempt in range(self.max_resumes + 1):
+            try:
+                if attempt or not reserved:
+                    self.rate_limiter.acquire(url)
+            except CircuitOpenError as e:
+                self._skip(paper, e)
+                return False
+            
+            received = part.stat().st_size if part.exists() else 0
+            try:
+                error, resumable = self._transfer(url, part, timeout)
+            except requests.exceptions.RequestException as e:
+                # 连接中断或超时：.part 保留已收到的部分
+                self.rate_limiter.record_failure(url)
+                error, resumable = str(e), True
+            except OSError as e:
+                error, resumable = str(e), False
+            
+            outcome = self._settle(paper, filepath, part, received, attempt, error, resumable,
+                                   started)
+            if outcome is not None:
+                return outcome
+        return False
+    
+    def _settle(self, paper: Dict, filepath: Path, part: Path, received: int, attempt: int,
+                error: Optional[str], resumable: bool, started: float) -> Optional[bool]:
+        """
+        处理一次传输的结果：完成时把 .part 移入存储，完成或放弃时记录结果
+        
+        Returns:
+            True 下载完成，False 放弃（保留 .part 留到下次运行），None 立即续传
+        """
+        duration = time.monotonic() - started
+        if error is None:
+            digest, added = self.store.add(part)
+            self.store.link(digest, filepath)
+            self.known_hashes[paper['pdf_url']] = digest
+            self._record(paper, filepath, digest, duration)
+            note = '' if added else ' (与已有内容相同，只保存一份)'
+            logger.info(f"✓ 下载成功: {paper['title'][:50]}...{note}")
+            return True
+        # 只有本次有新进展时才立即续传，否则留到下次运行
+        size = part.stat().st_size if part.exists() else 0
+        if not resumable or size <= received or attempt == self.max_resumes:
+            logger.error(f"✗ 下载失败 [{paper['id']}]: {error[:100]}")
+            self._record_failure(paper, error, duration)
+            return False
+        logger.warning(f"  续传 [{paper['id']}]: 已收到 {size} 字节 ({error[:80]})")
+        return None
+    
+    def _prepare(self, paper: Dict) -> Tuple[Path, Optional[Path]]:
+        """
+        计算论文的保存路径，内容已在存储中时直接建立链接
+        
+        Returns:
+            (最终路径, .part 路径)；不需要下载时 .part 路径为None
+        """
         title = self.sanitize_filename(paper['title'])
         
-        conf_dir = Path(self.output_dir) / f"{conference}_{year}"
+        conf_dir = Path(self.output_dir) / conference_dir(paper['conference'], paper['year'])
         conf_dir.mkdir(parents=True, exist_ok=True)
         
         filename = f"{paper['id']}_{title}.pdf"
         filepath = conf_dir / filename
+        part = filepath.with_name(filename + '.part')
+        
+        digest = (paper.get('pdf_sha256') or paper.get('url_sha256')
+                  or self.known_hashes.get(paper['pdf_url']))
+        if digest and self.store.has(digest):
+            if (self.store.link(digest, filepath) or digest != paper.get('pdf_sha256')
+                    or paper.get('download_status') != 'downloaded'):
+                self._record(paper, filepath, digest)
+                logger.info(f"✓ 使用已有内容: {paper['title'][:50]}...")
+            return filepath, None
         
         if filepath.exists():
-            return True
+            if is_complete_pdf(filepath):
+                # 内容存储之前下载的文件：移入存储并换成链接
+                digest, _ = self.store.add(filepath)
+                self.store.link(digest, filepath)
+                self.known_hashes[paper['pdf_url']] = digest
+                self._record(paper, filepath, digest)
+                return filepath, None
+            if filepath.stat().st_nlink > 1:
+                # 与存储中的对象共用的文件已损坏，不能在其上续传
+                filepath.unlink()
+            else:
+                # 早期版本直接写入最终路径，中断后留下残缺文件：当作 .part 续传
+                os.replace(filepath, part)
+        return filepath, part
+    
+    def _record(self, paper: Dict, filepath: Path, digest: str, duration: float = None):
+        """记录已下载的论文（批量下载时写入数据库）"""
+        if self.recorder is not None:
+            self.recorder.record(paper['id'], 'downloaded', str(filepath), pdf_sha256=digest,
+                                 pdf_size=filepath.stat().st_size, duration=duration)
+    
+    def _record_failure(self, paper: Dict, error: str, duration: float = None,
+                        kind: str = None):
+        """记录下载失败的论文，按失败类型退避后重试"""
+        from utils.retry_scheduler import classify_error
+        
+        if self.recorder is not None:
+            self.recorder.record(paper['id'], 'failed', error_msg=error[:500], duration=duration,
+                                 error_kind=kind or classify_error(error))
+    
+    def _skip(self, paper: Dict, error: Exception):
+        """站点熔断，本次不下载该论文（不计入失败次数）"""
+        from utils.retry_scheduler import SKIPPED
+        
+        logger.error(f"✗ 跳过 [{paper['id']}]: {error}")
+        self._record_failure(paper, str(error), kind=SKIPPED)
+    
+    @contextmanager
+    def _recording(self):
+        """批量下载期间通过写入队列记录下载结果"""
+        from utils.status_recorder import DownloadStatusRecorder
+        
+        with DatabaseManager(self.db_path) as db, DownloadStatusRecorder(db) as recorder:
+            self.known_hashes = {}
+            self.recorder = recorder
+            try:
+                yield db
+            finally:
+                self.recorder = None
+    
+    @staticmethod
+    def _request_headers(offset: int) -> Dict[str, str]:
+        """续传请求头；禁止压缩传输编码，Range 和 Content-Length 都按文件字节计算"""
+        headers = {'Accept-Encoding': 'identity'}
+        if offset:
+            headers['Range'] = f"bytes={offset}-"
+        return headers
+    
+    def _begin(self, url: str, part: Path, offset: int, status: int,
+               headers) -> Tuple[Optional[str], Optional[int], Optional[Tuple[Optional[str], bool]]]:
+        """
+        按响应状态决定如何写入 .part（同步和异步引擎共用）
         
-        try:
-            response = self.session.get(paper['pdf_url'], timeout=timeout, stream=True)
-            response.raise_for_status()
+        Args:
+            url: 请求的URL
+            part: .part 路径
+            offset: 请求的起始字节
+            status: 响应状态码
+            headers: 响应头
             
-            with open(filepath, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
+        Returns:
+            (写入模式, 文件总长度, 结果)；结果不为None时不读取响应体，直接作为本次
+            传输的 (错误信息, 是否可以续传)
+        """
+        from utils.rate_limiter import RETRY_STATUSES, parse_retry_after
+        
+        if status in RETRY_STATUSES:
+            # 站点限流或故障：记入熔断计数，按 Retry-After 暂停该站点
+            self.rate_limiter.record_failure(url)
+            retry_after = parse_retry_after(headers.get('Retry-After'))
+            if retry_after is not None:
+                self.rate_limiter.defer(url, self.rate_limiter.backoff_delay(0, retry_after))
+            return None, None, (f"HTTP {status}", False)
+        
+        if status == 416 and offset:
+            # 请求范围超出文件末尾：.part 已完整，或服务器上的文件已变短
+            _, total = parse_content_range(headers.get('Content-Range'))
+            if total != offset:
+                part.unlink()
+                return None, None, (f"续传范围无效 (本地 {offset} 字节, 服务器 {total})", True)
+            return None, None, self._validate(part, total)
+        
+        if status >= 400:
+            return None, None, (f"HTTP {status}", False)
+        self.rate_limiter.record_success(url)
+        
+        if status == 206:
+            start, total = parse_content_range(headers.get('Content-Range'))
+            if start != offset:
+                part.unlink()
+                return None, None, (f"续传位置不符 (请求 {offset}, 返回 {start})", True)
+            return 'ab', total, None
+        # 服务器不支持 Range 时返回整个文件，从头写入
+        length = headers.get('Content-Length')
+        return 'wb', int(length) if length and length.isdigit() else None, None
+    
+    @staticmethod
+    def _reject_first_chunk(f, part: Path, mode: str, chunk: bytes, headers) -> Optional[str]:
+        """从头写入时第一块不是PDF文件头（错误页面等）则删除 .part，返回错误信息"""
+        if mode != 'wb' or f.tell() or chunk.startswith(PDF_MAGIC[:len(chunk)]):
+            return None
+        f.close()
+        part.unlink()
+        return f"不是PDF文件 ({headers.get('Content-Type')})"
+    
+    def _transfer(self, url: str, part: Path, timeout: int) -> Tuple[Optional[str], bool]:
+        """
+        从 .part 的当前长度开始请求剩余部分并追加写入
+        
+        Returns:
+            (错误信息, 是否可以续传)，.part 已完整且是PDF时错误信息为None
             
-            logger.info(f"✓ 下载成功: {paper['title'][:50]}...")
-            return True
+        Raises:
+            requests.RequestException: 请求失败或传输中断
+        """
+        offset = part.stat().st_size if part.exists() else 0
+        with self.session.get(url, timeout=timeout, stream=True,
+                              headers=self._request_headers(offset)) as response:
+            mode, total, result = self._begin(url, part, offset, response.status_code,
+                                              response.headers)
+            if result is not None:
+                return result
             
-        except Exception as e:
-            logger.error(f"✗ 下载失败 [{paper['id']}]: {str(e)[:100]}")
-            return False
+            with open(part, mode) as f:
+                for chunk in response.iter_content(chunk_size=self.chunk_size):
+                    # 返回的是错误页面等非PDF内容，不必下载完
+                    error = self._reject_first_chunk(f, part, mode, chunk, response.headers)
+                    if error:
+                        return error, False
+                    f.write(chunk)
+        
+        return self._validate(part, total)
+    
+    @staticmethod
+    def _validate(part: Path, total: Optional[int]) -> Tuple[Optional[str], bool]:
+        """检查 .part 的长度和文件头，返回 (错误信息, 是否可以续传)"""
+        size = part.stat().st_size
+        if total is not None and size < total:
+            return f"传输不完整 ({size}/{total} 字节)", True
+        if total is not None and size > total:
+            part.unlink()
+            return f"文件长度超出 Content-Length ({size}/{total} 字节)", False
+        with open(part, 'rb') as f:
+            if f.read(len(PDF_MAGIC)) != PDF_MAGIC:
+                part.unlink()
+                return "不是PDF文件", False
+        return None, False
     
     def get_papers_to_download(self, conference: str = None, year: int = None, 
-                                limit: int = None) -> List[Dict]:
-        """获取需要下载的论文列表"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
+                                limit: int = None, recheck: bool = False,
+                                retry_parked: bool = False,
+                                db: Optional[DatabaseManager] = None,
+                                limit_failed: bool = True) -> List[Dict]:
+        """
+        获取需要下载的论文列表
         
-        query = """
-            SELECT id, title, conference, year, pdf_url
-            FROM papers
-            WHERE pdf_url IS NOT NULL AND pdf_url != ''
+        只选取 download_status 为 pending 或 failed 的论文（走 download_status 索引），
+        已下载大部分论文时耗时与剩余论文数成正比；pending 排在 failed 之前。
+        url_sha256 为该链接之前下载到的内容哈希（pdf_blobs），内容已在存储中时
+        不必再下载。
+        
+        Args:
+            conference: 会议名称
+            year: 年份
+            limit: 最多返回的论文数
+            recheck: 同时选取已下载的论文，文件丢失时重新链接或下载
+            retry_parked: 同时选取被搁置的论文
+            db: 已打开的数据库管理器；为None时临时打开一个（旧数据库会先升级表结构）
+            limit_failed: limit 是否同样限制 failed 的论文，见 DatabaseManager.get_download_candidates
+        """
+        if db is None:
+            with DatabaseManager(self.db_path) as db:
+                return db.get_download_candidates(conference, year, limit, recheck, retry_parked,
+                                                  limit_failed)
+        return db.get_download_candidates(conference, year, limit, recheck, retry_parked,
+                                          limit_failed)
+    
+    def download_batch(self, conference: str = None, year: int = None, 
+                       limit: int = None, max_workers: int = 5, max_per_host: int = 2,
+                       host_limits: Dict[str, int] = None, recheck: bool = False,
+                       retry_parked: bool = False, retry_now: bool = False):
         """
-        params = []
+        批量下载PDF
         
-        if conference:
-            query += " AND conference = ?"
-            params.append(conference)
+        论文按主机排队（见 utils.host_scheduler）：每个主机的并发数和请求间隔分别
+        受 max_per_host/host_limits 和 rate_limiter 限制，线程只领取已就绪主机的
+        任务，一个主机被限速时其余主机的下载照常进行。失败过的论文到了退避时间
+        才会再试，从未失败的论文排在前面。
         
-        if year:
-            query += " AND year = ?"
-            params.append(year)
+        Args:
+            conference: 会议名称
+            year: 年份
+            limit: 最多下载的论文数
+            max_workers: 下载线程数
+            max_per_host: 未单独配置的主机同时进行的最多下载数
+            host_limits: {主机名后缀: 并发上限}
+            recheck: 同时检查已下载的论文
+            retry_parked: 被搁置的论文重新排队（失败次数从零开始）
+            retry_now: 失败的论文不等退避时间，立即重试
+        """
+        stats = {'total': 0, 'success': 0, 'failed': 0, 'local': 0, 'deferred': 0, 'parked': 0}
         
-        query += " ORDER BY conference, year DESC, title"
+        # 打开 DatabaseManager 时升级旧数据库的表结构，之后才能查询 pdf_blobs 等新表
+        with self._recording() as db:
+            # 失败过的论文全部取出，按退避时间筛选后再按 limit 截取
+            papers = self.get_papers_to_download(conference, year, limit, recheck, retry_parked, db,
+                                                 limit_failed=retry_now)
+            if not papers:
+                logger.warning("没有需要下载的论文")
+                return
+            logger.info(f"找到 {len(papers)} 篇论文需要下载")
+            
+            # 内容已在存储中的论文只建立链接，不占用下载名额和站点的请求配额
+            pending = []
+            for paper in papers:
+                if self._prepare(paper)[1] is None:
+                    stats['local'] += 1
+                else:
+                    pending.append(paper)
+            if not retry_now:
+                pending = self._due(db, pending, stats)
+            if limit:
+                pending = pending[:max(0, limit - stats['local'])]
+            stats['total'] = stats['local'] + len(pending)
+            success, failed = self._download_all(pending, max_workers, max_per_host, host_limits)
         
-        if limit:
-            query += f" LIMIT {limit}"
+        stats['success'] = stats['local'] + success
+        stats['failed'] = failed
+        self._log_stats(stats)
+        return stats
+    
+    def _size_pool(self, hosts: int, max_connections: int):
+        """
+        按主机数和线程数调整 session 的连接池
         
-        cursor.execute(query, params)
-        papers = [dict(row) for row in cursor.fetchall()]
-        conn.close()
+        urllib3 默认每个主机只保留10个连接，线程更多时多出的连接用完即被丢弃
+        （"Connection pool is full"），之后的请求要重新建立连接。
+        """
+        from requests.adapters import HTTPAdapter
         
-        return papers
+        adapter = HTTPAdapter(pool_connections=max(hosts, 1), pool_maxsize=max_connections)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
     
-    def download_batch(self, conference: str = None, year: int = None, 
-                       limit: int = None, max_workers: int = 5, delay: float = 0.5):
-        """批量下载PDF"""
-        papers = self.get_papers_to_download(conference, year, limit)
+    def _due(self, db: DatabaseManager, papers: List[Dict], stats: Dict[str, int]) -> List[Dict]:
+        """
+        按 download_log 中的失败历史筛选已到重试时间的论文，按优先级排列
         
-        if not papers:
-            logger.warning("没有找到需要下载的论文")
-            return
+        反复失败的论文记为 parked；未到时间的论文计入 stats['deferred']。
+        """
+        from utils.retry_scheduler import RetryScheduler
         
-        logger.info(f"找到 {len(papers)} 篇论文需要下载")
+        history = db.get_failure_history(
+            [paper['id'] for paper in papers if paper.get('download_status') == 'failed'])
+        retry = RetryScheduler(**self.retry_options)
+        for paper in papers:
+            reason = retry.add(paper, history.get(paper['id'], []))
+            if reason:
+                logger.warning(f"⏸ 搁置 [{paper['id']}]: {reason[:100]}")
+                self.recorder.record(paper['id'], 'parked', error_msg=reason)
+                stats['parked'] += 1
         
-        stats = {'total': len(papers), 'success': 0, 'failed': 0}
+        due = retry.pop_due()
+        stats['deferred'] = len(retry)
+        if stats['deferred']:
+            wait = max(0.0, retry.next_due() - time.time())
+            logger.info(f"{stats['deferred']} 篇失败的论文尚未到重试时间"
+                        f"（最早 {wait / 3600:.1f} 小时后）")
+        return due
+    
+    def _download_all(self, papers: List[Dict], max_workers: int, max_per_host: int,
+                      host_limits: Optional[Dict[str, int]]) -> Tuple[int, int]:
+        """下载全部论文，返回 (成功数, 失败数)"""
+        from concurrent.futures import ThreadPoolExecutor
+        from utils.host_scheduler import HostScheduler
         
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = {}
-            
-            for paper in papers:
-                time.sleep(delay)
-                future = executor.submit(self.download_pdf, paper)
-                futures[future] = paper
-            
-            for future in as_completed(futures):
+        scheduler = HostScheduler(self.rate_limiter, max_per_host, host_limits)
+        for paper in papers:
+            scheduler.add(paper['pdf_url'], paper)
+        hosts = {self.rate_limiter.host_of(paper['pdf_url']) for paper in papers}
+        self._size_pool(len(hosts), max(max_workers, max_per_host))
+        
+        def worker():
+            success = failed = 0
+            while True:
+                task = scheduler.get()
+                if task is None:
+                    return success, failed
+                if task.error is not None:
+                    self._skip(task.item, task.error)
+                    failed += 1
+                    continue
                 try:
-                    success = future.result()
-                    if success:
-                        stats['success'] += 1
-                    else:
-                        stats['failed'] += 1
-                except Exception:
-                    stats['failed'] += 1
+                    ok = self.download_pdf(task.item, reserved=True)
+                except Exception as e:
+                    logger.error(f"✗ 下载失败 [{task.item['id']}]: {str(e)[:100]}")
+                    self._record_failure(task.item, str(e))
+                    ok = False
+                finally:
+                    scheduler.done(task)
+                if ok:
+                    success += 1
+                else:
+                    failed += 1
         
+        success = failed = 0
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for future in [executor.submit(worker) for _ in range(max_workers)]:
+                worker_success, worker_failed = future.result()
+                success += worker_success
+                failed += worker_failed
+        return success, failed
+    
+    @staticmethod
+    def _log_stats(stats: Dict[str, int]):
+        """输出批量下载统计"""
         logger.info("\n" + "="*60)
-        logger.info(f"下载统计: 总计 {stats['total']}, 成功 {stats['success']}, "
-                   f"失败 {stats['failed']}, 成功率 {stats['success']/stats['total']*100:.1f}%")
+        rate = f", 成功率 {stats['success']/stats['total']*100:.1f}%" if stats['total'] else ''
+        logger.info(f"下载统计: 总计 {stats['total']}, 成功 {stats['success']} "
+                    f"(其中 {stats['local']} 篇使用已有内容), 失败 {stats['failed']}{rate}")
+        if stats['deferred'] or stats['parked']:
+            logger.info(f"等待重试 {stats['deferred']}, 本次搁置 {stats['parked']}")
         logger.info("="*60)
 
 
+# ==================== 异步下载引擎 ====================
+
+class AsyncPDFDownloader(PDFDownloader):
+    """
+    异步PDF下载引擎（download --engine async）
+    
+    一个事件循环中同时进行数千个下载。每篇论文一个协程：先占用所属主机的并发
+    名额，再向限速器预约请求，最后在收发期间占用全局名额；等待限速时不占用
+    全局名额，其他主机的下载照常进行。
+    
+    HTTP客户端默认使用 aiohttp（HTTP/1.1，吞吐量最高）；要求HTTP/2时使用 httpx
+    （需要 h2，与支持的服务器协商HTTP/2，同一主机的请求复用一个连接）。两者都按
+    主机保持长连接池。响应体按块直接写入 .part，续传、校验和重命名规则与
+    PDFDownloader 相同。
+    """
+    
+    # 可用的HTTP客户端，按优先顺序
+    CLIENTS = ('aiohttp', 'httpx')
+    
+    def __init__(self, *args, timeout: int = 30, http2: bool = False, client: str = 'auto',
+                 **kwargs):
+        """
+        Args:
+            timeout: 连接和两次读取之间的超时（秒），不限制整个文件的下载时间
+            http2: 使用 httpx 并启用HTTP/2（需要 h2）
+            client: 'auto'、'aiohttp' 或 'httpx'
+            其余参数同 PDFDownloader
+        """
+        super().__init__(*args, **kwargs)
+        self.timeout = timeout
+        self.http2 = http2
+        self.client = client
+    
+    @staticmethod
+    def available_modules(*names: str) -> List[str]:
+        """已安装的模块，如 available_modules(*CLIENTS) 为可用的HTTP客户端"""
+        import importlib.util
+        return [name for name in names if importlib.util.find_spec(name) is not None]
+    
+    def _download_all(self, papers: List[Dict], max_workers: int, max_per_host: int,
+                      host_limits: Optional[Dict[str, int]]) -> Tuple[int, int]:
+        """在新的事件循环中下载全部论文，max_workers 为同时进行的最多下载数"""
+        import asyncio
+        
+        stats = asyncio.run(self.run(papers, max_workers, max_per_host, host_limits))
+        return stats['success'], stats['failed']
+    
+    async def run(self, papers: List[Dict], max_concurrency: int, max_per_host: int = 2,
+                  host_limits: Dict[str, int] = None) -> Dict[str, int]:
+        """在当前事件循环中下载全部论文，返回统计"""
+        import asyncio
+        from utils.rate_limiter import lookup_host
+        
+        global_limit = asyncio.Semaphore(max_concurrency)
+        host_limits = {host.lower(): n for host, n in (host_limits or {}).items()}
+        semaphores: Dict[str, asyncio.Semaphore] = {}
+        stats = {'total': len(papers), 'success': 0, 'failed': 0}
+        
+        def host_limit(host: str) -> int:
+            return min(lookup_host(host_limits, host, max_per_host), max_concurrency)
+        
+        async with self._open_client(max_concurrency, host_limit) as (stream, errors):
+            async def download(paper):
+                host = self.rate_limiter.host_of(paper['pdf_url'])
+                if host not in semaphores:
+                    semaphores[host] = asyncio.Semaphore(host_limit(host))
+                try:
+                    async with semaphores[host]:
+                        ok = await self.download_pdf_async(stream, errors, paper, global_limit)
+                except Exception as e:
+                    logger.error(f"✗ 下载失败 [{paper['id']}]: {str(e)[:100]}")
+                    self._record_failure(paper, str(e))
+                    ok = False
+                stats['success' if ok else 'failed'] += 1
+            
+            await asyncio.gather(*(download(paper) for paper in papers))
+        return stats
+    
+    def client_name(self) -> str:
+        """
+        实际使用的HTTP客户端
+        
+        'auto' 时使用 aiohttp（同样负载下吞吐量约为 httpx 的两倍，也高于线程池引擎，
+        见 benchmarks/bench_download.py），未安装时才用 httpx；要求HTTP/2时用 httpx。
+        
+        Raises:
+            RuntimeError: 指定的客户端或任何客户端都未安装
+        """
+        clients = self.available_modules(*self.CLIENTS)
+        if self.client != 'auto':
+            name = self.client
+        elif self.http2:
+            name = 'httpx'
+        else:
+            name = clients[0] if clients else 'aiohttp'
+        if name not in clients:
+            raise RuntimeError(f"async 引擎需要安装 {name}")
+        if self.http2 and name != 'httpx':
+            raise RuntimeError("HTTP/2 只有 httpx 客户端支持")
+        if self.http2 and not self.available_modules('h2'):
+            raise RuntimeError("HTTP/2 需要安装 httpx[http2]")
+        return name
+    
+    @asynccontextmanager
+    async def _open_client(self, max_connections: int, host_limit: Callable[[str], int]):
+        """
+        创建HTTP客户端
+        
+        Args:
+            max_connections: 全部主机的最多连接数
+            host_limit: 主机名 -> 该主机的并发上限
+            
+        产出 (stream, errors)：stream(url, headers) 是异步上下文管理器，进入后得到
+        (状态码, 响应头, 响应体分块的异步迭代器)；errors 是表示连接中断或超时的异常类型。
+        """
+        import asyncio
+        
+        name = self.client_name()
+        headers = {'User-Agent': self.session.headers['User-Agent']}
+        
+        if name == 'httpx':
+            import httpx
+            # 每个主机一个客户端：httpcore 为每个请求扫描整个连接池，
+            # 所有主机共用一个大连接池时数千个并发请求的调度开销是平方级的
+            clients: Dict[str, 'httpx.AsyncClient'] = {}
+            
+            def client_for(url):
+                host = self.rate_limiter.host_of(url)
+                if host not in clients:
+                    limit = host_limit(host)
+                    clients[host] = httpx.AsyncClient(
+                        http2=self.http2, headers=headers, timeout=httpx.Timeout(self.timeout),
+                        limits=httpx.Limits(max_connections=limit, max_keepalive_connections=limit),
+                        follow_redirects=True)
+                return clients[host]
+            
+            @asynccontextmanager
+            async def stream(url, request_headers):
+                async with client_for(url).stream('GET', url, headers=request_headers) as response:
+                    yield (response.status_code, response.headers,
+                           response.aiter_raw(self.chunk_size))
+            
+            try:
+                yield stream, (httpx.HTTPError, asyncio.TimeoutError)
+            finally:
+                for client in clients.values():
+                    await client.aclose()
+        else:
+            import aiohttp
+            # 连接数由本类的信号量控制，连接池只负责按主机复用连接
+            connector = aiohttp.TCPConnector(limit=max_connections, limit_per_host=0)
+            timeout = aiohttp.ClientTimeout(total=None, sock_connect=self.timeout,
+                                            sock_read=self.timeout)
+            async with aiohttp.ClientSession(connector=connector, headers=headers,
+                                             timeout=timeout, auto_decompress=False) as session:
+                @asynccontextmanager
+                async def stream(url, request_headers):
+                    async with session.get(url, headers=request_headers) as response:
+                        yield (response.status, response.headers,
+                               response.content.iter_chunked(self.chunk_size))
+                
+                yield stream, (aiohttp.ClientError, asyncio.TimeoutError)
+    
+    async def download_pdf_async(self, stream, errors, paper: Dict, global_limit) -> bool:
+        """下载单个PDF，中断时从 .part 续传（见 PDFDownloader.download_pdf）"""
+        from utils.rate_limiter import CircuitOpenError
+        
+        if not paper['pdf_url']:
+            return False
+        
+        filepath, part = self._prepare(paper)
+        if part is None:
+            return True
+        
+        url = paper['pdf_url']
+        started = time.monotonic()
+        for attempt in range(self.max_resumes + 1):
+            try:
+                await self.rate_limiter.acquire_async(url)
+            except CircuitOpenError as e:
+                self._skip(paper, e)
+                return False
+            
+            received = part.stat().st_size if part.exists() else 0
+            try:
+                async with global_limit:
+                    error, resumable = await self._transfer_async(stream, url, part)
+            except errors as e:
+                # 连接中断或超时：.part 保留已收到的部分
+                self.rate_limiter.record_failure(url)
+                error, resumable = str(e) or type(e).__name__, True
+            except OSError as e:
+                error, resumable = str(e), False
+            
+            outcome = self._settle(paper, filepath, part, received, attempt, error, resumable,
+                                   started)
+            if outcome is not None:
+                return outcome
+        return False
+    
+    async def _transfer_async(self, stream, url: str, part: Path) -> Tuple[Optional[str], bool]:
+        """从 .part 的当前长度开始请求剩余部分并追加写入（见 PDFDownloader._transfer）"""
+        offset = part.stat().st_size if part.exists() else 0
+        async with stream(url, self._request_headers(offset)) as (status, headers, chunks):
+            mode, total, result = self._begin(url, part, offset, status, headers)
+            if result is not None:
+                return result
+            
+            with open(part, mode) as f:
+                async for chunk in chunks:
+                    error = self._reject_first_chunk(f, part, mode, chunk, headers)
+                    if error:
+                        return error, False
+                    f.write(chunk)
+        
+        return self._validate(part, total)
+
+
 # ==================== 下载管理器 ====================
 
 class DownloadManager:
@@ -220,81 +801,192 @@ class DownloadManager:
         self.db_path = db_path
         self.pdf_dir = pdf_dir
     
-    def update_download_status(self):
-        """扫描PDF目录，更新下载状态"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT id, title, conference, year
-            FROM papers
-            WHERE pdf_url IS NOT NULL AND pdf_url != ''
-        """)
+    def update_download_status(self, incremental: bool = False) -> Dict[str, int]:
+        """
+        扫描PDF目录，更新下载状态
         
-        papers = cursor.fetchall()
-        updated = 0
+        每个 <会议>_<年份> 目录用 os.scandir 遍历一次，建立 论文ID -> 文件 的映射，
+        只把状态、路径或大小有变化的论文在一个事务中批量写入。找到文件的论文记为
+        downloaded；记为 downloaded 但文件已不存在的论文改回 pending，failed 保持不变。
         
-        for paper_id, title, conference, year in papers:
-            conf_dir = f"{conference.replace(' ', '_').replace('/', '_')}_{year}"
-            pdf_path = Path(self.pdf_dir) / conf_dir
+        Args:
+            incremental: 只扫描 mtime 与上次扫描时不同的目录。目录的 mtime 只在其中
+                增删或重命名文件时变化，原地改写文件内容不会被发现
             
-            downloaded = False
-            if pdf_path.exists():
-                for file in pdf_path.glob(f"{paper_id}_*.pdf"):
-                    if file.is_file() and file.stat().st_size > 1024:
-                        downloaded = True
-                        break
+        Returns:
+            统计 {'directories', 'skipped', 'files', 'downloaded', 'missing', 'updated'}
+        """
+        stats = dict.fromkeys(('directories', 'skipped', 'files', 'downloaded', 'missing',
+                               'updated'), 0)
+        db = DatabaseManager(self.db_path)
+        scanned = db.get_dir_scans() if incremental else {}
+        updates = []
+        directories = []
+        
+        for conference, year in db.get_conference_years():
+            path = Path(self.pdf_dir) / conference_dir(conference, year)
+            key = os.path.abspath(path)
+            # 先取 mtime 再遍历：遍历期间新增的文件会让下次扫描看到不同的 mtime
+            try:
+                mtime = path.stat().st_mtime_ns
+            except FileNotFoundError:
+                mtime = None
+            if incremental and key in scanned and scanned[key] == mtime:
+                stats['skipped'] += 1
+                continue
+            stats['directories'] += 1
+            directories.append((key, mtime))
             
-            status = 'downloaded' if downloaded else 'pending'
-            cursor.execute("UPDATE papers SET download_status = ? WHERE id = ?", 
-                          (status, paper_id))
-            updated += 1
+            files = self._scan_directory(path) if mtime is not None else {}
+            stats['files'] += sum(len(candidates) for candidates in files.values())
+            for paper_id, status, pdf_path, pdf_size in db.get_download_rows(conference, year):
+                candidates = files.get(paper_id)
+                if candidates:
+                    # 同一ID有多个文件（标题变更后重新下载）时优先保留已记录的路径
+                    found = next((c for c in candidates if c[0] == pdf_path), candidates[0])
+                    stats['downloaded'] += 1
+                    if (status, pdf_path, pdf_size) != ('downloaded', *found):
+                        updates.append((paper_id, 'downloaded', *found))
+                elif status == 'downloaded':
+                    stats['missing'] += 1
+                    updates.append((paper_id, 'pending', None, None))
         
-        conn.commit()
-        conn.close()
+        db.apply_dir_scan(updates, directories)
+        db.close()
+        stats['updated'] = len(updates)
+        
+        print(f"✓ 扫描 {stats['directories']} 个目录（跳过未变化的 {stats['skipped']} 个）, "
+              f"{stats['files']} 个PDF: 已下载 {stats['downloaded']}, 文件丢失 {stats['missing']}, "
+              f"更新 {stats['updated']} 条论文的下载状态")
+        return stats
+    
+    @staticmethod
+    def _scan_directory(path: Path) -> Dict[int, List[Tuple[str, int]]]:
+        """遍历一个会议目录，返回 {论文ID: [(路径, 字节数), ...]}（按文件名排序）"""
+        files: Dict[int, List[Tuple[str, int]]] = {}
+        for entry in sorted(os.scandir(path), key=lambda entry: entry.name):
+            paper_id, _, _ = entry.name.partition('_')
+            if not entry.name.endswith('.pdf') or not paper_id.isdigit() or not entry.is_file():
+                continue
+            size = entry.stat().st_size
+            # 小于1KB的文件视为下载失败留下的错误页面
+            if size > 1024:
+                files.setdefault(int(paper_id), []).append((str(path / entry.name), size))
+        return files
+    
+    def import_to_store(self) -> Dict[str, int]:
+        """
+        把已下载的 <会议>_<年份>/<id>_<标题>.pdf 移入内容存储（objects/），原位置
+        换成指向对象的硬链接；内容相同的文件合并为一个对象。同时为对应的论文
+        记录 pdf_sha256 和 pdf_path。已导入的文件被跳过，可以重复运行。
+        
+        Returns:
+            统计 {'files', 'imported', 'duplicates', 'unchanged', 'invalid', 'saved_bytes'}
+        """
+        from utils.blob_store import BlobStore
+        
+        stats = dict.fromkeys(('files', 'imported', 'duplicates', 'unchanged', 'invalid',
+                               'saved_bytes'), 0)
+        if not Path(self.pdf_dir).is_dir():
+            print(f"PDF目录不存在: {self.pdf_dir}")
+            return stats
+        
+        store = BlobStore(Path(self.pdf_dir) / 'objects')
+        # 按 inode 识别已经是对象链接的文件，不必重新计算哈希
+        inodes = {}
+        for digest, path in store.iter_objects():
+            st = path.stat()
+            inodes[(st.st_dev, st.st_ino)] = digest
+        db = DatabaseManager(self.db_path)
+        known = db.get_pdf_hashes()
+        rows = []
+        
+        for conf_dir in sorted(os.scandir(self.pdf_dir), key=lambda entry: entry.name):
+            if not conf_dir.is_dir() or conf_dir.path == str(store.root):
+                continue
+            for entry in sorted(os.scandir(conf_dir.path), key=lambda entry: entry.name):
+                paper_id, _, _ = entry.name.partition('_')
+                if not entry.name.endswith('.pdf') or not paper_id.isdigit() or not entry.is_file():
+                    continue
+                stats['files'] += 1
+                st = entry.stat()
+                digest = inodes.get((st.st_dev, st.st_ino))
+                if digest:
+                    stats['unchanged'] += 1
+                    if known.get(int(paper_id)) != digest:
+                        rows.append((int(paper_id), entry.path, digest, st.st_size))
+                    continue
+                if not is_complete_pdf(entry.path):
+                    # 中断后残缺的文件留给下载器续传
+                    stats['invalid'] += 1
+                    continue
+                
+                digest, added = store.add(entry.path)
+                store.link(digest, entry.path)
+                if added:
+                    stats['imported'] += 1
+                    target = store.object_path(digest).stat()
+                    inodes[(target.st_dev, target.st_ino)] = digest
+                else:
+                    stats['duplicates'] += 1
+                    stats['saved_bytes'] += st.st_size
+                rows.append((int(paper_id), entry.path, digest, st.st_size))
         
-        print(f"✓ 已更新 {updated} 条论文的下载状态")
+        # 文件名中的ID在数据库中已不存在时只导入文件
+        linked = db.link_pdf_blobs(rows) if rows else 0
+        db.close()
+        
+        objects = sizes = 0
+        for _, path in store.iter_objects():
+            objects += 1
+            sizes += path.stat().st_size
+        print(f"✓ 扫描 {stats['files']} 个PDF: 新导入 {stats['imported']}, "
+              f"合并重复 {stats['duplicates']} (节省 {stats['saved_bytes'] / 1e6:.1f} MB), "
+              f"已导入 {stats['unchanged']}, 残缺 {stats['invalid']}")
+        print(f"  更新 {linked} 条论文记录；存储中共 {objects} 个对象, {sizes / 1e6:.1f} MB")
+        return stats
     
     def show_stats(self):
-        """显示下载统计"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        """显示下载统计（读取统计表，不扫描论文表）"""
+        db = DatabaseManager(self.db_path)
         
-        cursor.execute("""
-            SELECT 
-                COUNT(*) as total,
-                SUM(CASE WHEN pdf_url IS NOT NULL AND pdf_url != '' THEN 1 ELSE 0 END) as has_link,
-                SUM(CASE WHEN download_status = 'downloaded' THEN 1 ELSE 0 END) as downloaded
-            FROM papers
-        """)
-        total, has_link, downloaded = cursor.fetchone()
-        
-        cursor.execute("""
-            SELECT 
-                conference,
-                COUNT(*) as total,
-                SUM(CASE WHEN download_status = 'downloaded' THEN 1 ELSE 0 END) as downloaded,
-                SUM(CASE WHEN pdf_url IS NOT NULL AND pdf_url != '' THEN 1 ELSE 0 END) as has_link
-            FROM papers
-            GROUP BY conference
-            ORDER BY conference
-        """)
-        by_conference = cursor.fetchall()
-        conn.close()
+        by_conference = {}
+        failed = parked = 0
+        for group in db.get_stats_groups():
+            conf = by_conference.setdefault(group['conference'], [0, 0, 0])
+            conf[0] += group['paper_count']
+            conf[2] += group['with_pdf_url']
+            if group['download_status'] == 'downloaded':
+                conf[1] += group['paper_count']
+            elif group['download_status'] == 'failed':
+                failed += group['paper_count']
+            elif group['download_status'] == 'parked':
+                parked += group['paper_count']
+        db.close()
+        
+        total = sum(conf[0] for conf in by_conference.values())
+        downloaded = sum(conf[1] for conf in by_conference.values())
+        has_link = sum(conf[2] for conf in by_conference.values())
         
         print("\n" + "="*60)
         print("PDF 下载统计")
         print("="*60)
         print(f"\n总体统计:")
         print(f"  总论文数: {total}")
-        print(f"  有下载链接: {has_link} ({has_link/total*100:.1f}%)")
+        if total > 0:
+            print(f"  有下载链接: {has_link} ({has_link/total*100:.1f}%)")
         if has_link > 0:
             print(f"  已下载: {downloaded} ({downloaded/has_link*100:.1f}%)")
+        if failed:
+            print(f"  下载失败（退避后重试）: {failed}")
+        if parked:
+            print(f"  反复失败已搁置（download --retry-parked 重新排队）: {parked}")
         print(f"\n按会议统计:")
         print(f"{'会议':<20} {'总数':>6} {'有链接':>8} {'已下载':>8} {'进度':>8}")
         print("-"*60)
         
-        for conf, total, downloaded, has_link in by_conference:
+        for conf in sorted(by_conference):
+            total, downloaded, has_link = by_conference[conf]
             progress = f"{downloaded}/{has_link}" if has_link > 0 else "0/0"
             pct = f"({downloaded/has_link*100:.0f}%)" if has_link > 0 else "(0%)"
             print(f"{conf:<20} {total:>6} {has_link:>8} {downloaded:>8} {progress:>8} {pct}")
@@ -304,6 +996,33 @@ class DownloadManager:
 
 # ==================== JSON导出器 ====================
 
+def write_json_array(f, items, indent: int = 2, level: int = 0) -> int:
+    """
+    以与 json.dump(indent=...) 相同的格式流式写出JSON数组
+    
+    Args:
+        f: 文件对象
+        items: 可迭代的元素
+        indent: 缩进空格数
+        level: 数组所在的嵌套层级
+        
+    Returns:
+        写出的元素数量
+    """
+    inner = ' ' * (indent * (level + 1))
+    count = 0
+    f.write('[')
+    for item in items:
+        text = json.dumps(item, ensure_ascii=False, indent=indent)
+        f.write(',\n' if count else '\n')
+        f.write(inner + text.replace('\n', '\n' + inner))
+        count += 1
+    if count:
+        f.write('\n' + ' ' * (indent * level))
+    f.write(']')
+    return count
+
+
 class JSONExporter:
     """导出数据为JSON格式"""
     
@@ -311,34 +1030,33 @@ class JSONExporter:
         self.db_path = db_path
     
     def export_all(self, output_file='data/papers_all.json'):
-        """导出所有论文到单个JSON"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
+        """导出所有论文到单个JSON（流式写入，内存占用与论文数量无关）"""
+        conn = connect(self.db_path)
         
-        cursor.execute("SELECT * FROM papers ORDER BY conference, year DESC, title")
-        papers = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        
-        data = {
-            'metadata': {
-                'total': len(papers),
-                'exported_at': datetime.now().isoformat(),
-                'conferences': list(set(p['conference'] for p in papers))
-            },
-            'papers': papers
+        total = conn.execute("SELECT COUNT(*) FROM papers").fetchone()[0]
+        conferences = [row[0] for row in conn.execute("SELECT DISTINCT conference FROM papers")]
+        metadata = {
+            'total': total,
+            'exported_at': datetime.now().isoformat(),
+            'conferences': conferences
         }
         
+        cursor = conn.execute("SELECT * FROM papers ORDER BY conference, year DESC, title")
+        
         Path(output_file).parent.mkdir(parents=True, exist_ok=True)
         with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+            metadata_json = json.dumps(metadata, ensure_ascii=False, indent=2).replace('\n', '\n  ')
+            f.write('{\n  "metadata": ' + metadata_json + ',\n  "papers": ')
+            papers = (Paper.from_row(row).to_json() for row in iter_rows(cursor))
+            count = write_json_array(f, papers, indent=2, level=1)
+            f.write('\n}')
+        conn.close()
         
-        print(f"✓ 已导出 {len(papers)} 篇论文到 {output_file}")
+        print(f"✓ 已导出 {count} 篇论文到 {output_file}")
     
     def export_by_conference(self, output_dir='data/json'):
         """按会议分别导出"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+        conn = connect(self.db_path)
         cursor = conn.cursor()
         
         cursor.execute("SELECT DISTINCT conference, year FROM papers ORDER BY conference, year")
@@ -353,40 +1071,38 @@ class JSONExporter:
                 ORDER BY title
             """, (conference, year))
             
-            papers = [dict(row) for row in cursor.fetchall()]
-            
             filename = f"{conference.replace(' ', '_').replace('/', '_')}_{year}.json"
             filepath = Path(output_dir) / filename
             
+            papers = (Paper.from_row(row).to_json() for row in iter_rows(cursor))
             with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(papers, f, ensure_ascii=False, indent=2)
+                count = write_json_array(f, papers, indent=2)
             
-            print(f"✓ {conference} {year}: {len(papers)} 篇 -> {filepath}")
+            print(f"✓ {conference} {year}: {count} 篇 -> {filepath}")
         
         conn.close()
     
     def export_download_links(self, output_file='data/download_links.txt'):
         """导出PDF下载链接列表"""
-        conn = sqlite3.connect(self.db_path)
+        conn = connect(self.db_path)
         cursor = conn.cursor()
         
-        cursor.execute("""
+        where = "WHERE pdf_url IS NOT NULL AND pdf_url != ''"
+        total = cursor.execute(f"SELECT COUNT(*) FROM papers {where}").fetchone()[0]
+        cursor.execute(f"""
             SELECT conference, year, title, pdf_url
             FROM papers
-            WHERE pdf_url IS NOT NULL AND pdf_url != ''
+            {where}
             ORDER BY conference, year DESC, title
         """)
         
-        papers = cursor.fetchall()
-        conn.close()
-        
         with open(output_file, 'w', encoding='utf-8') as f:
             f.write(f"# 论文PDF下载链接列表\n")
             f.write(f"# 生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write(f"# 总计: {len(papers)} 篇论文\n\n")
+            f.write(f"# 总计: {total} 篇论文\n\n")
             
             current_conf = None
-            for conference, year, title, pdf_url in papers:
+            for conference, year, title, pdf_url in cursor:
                 conf_key = f"{conference} {year}"
                 if conf_key != current_conf:
                     f.write(f"\n## {conf_key}\n\n")
@@ -394,7 +1110,8 @@ class JSONExporter:
                 
                 f.write(f"{pdf_url}  # {title[:80]}\n")
         
-        print(f"✓ 已导出 {len(papers)} 个下载链接到 {output_file}")
+        conn.close()
+        print(f"✓ 已导出 {total} 个下载链接到 {output_file}")
 
 
 # ==================== 主程序 ====================
@@ -416,7 +1133,9 @@ def main():
   
   # 管理下载
   python paper_tools.py status-update
+  python paper_tools.py status-update --incremental
   python paper_tools.py status-show
+  python paper_tools.py store-import
         """)
     
     subparsers = parser.add_subparsers(dest='command', help='可用命令')
@@ -426,9 +1145,31 @@ def main():
     download_parser.add_argument('--conference', '-c', help='会议名称')
     download_parser.add_argument('--year', '-y', type=int, help='年份')
     download_parser.add_argument('--limit', '-l', type=int, help='限制数量')
-    download_parser.add_argument('--workers', '-w', type=int, default=5, help='并发数')
-    download_parser.add_argument('--delay', '-d', type=float, default=0.5, help='延迟(秒)')
+    download_parser.add_argument('--engine', choices=['thread', 'async'], default='thread',
+                                 help='thread: 线程池; async: 单线程异步下载，需要 httpx 或 aiohttp')
+    download_parser.add_argument('--workers', '-w', type=int,
+                                 help='下载线程数（默认5）；async引擎为同时进行的最多下载数（默认256）')
+    download_parser.add_argument('--client', choices=['auto', 'aiohttp', 'httpx'], default='auto',
+                                 help='async引擎的HTTP客户端（auto: aiohttp，未安装时用 httpx）')
+    download_parser.add_argument('--http2', action='store_true',
+                                 help='async引擎使用 httpx 并协商HTTP/2（需要 httpx[http2]，吞吐量低于 aiohttp）')
+    download_parser.add_argument('--per-host', type=int, default=2,
+                                 help='每个站点同时进行的最多下载数')
+    download_parser.add_argument('--host-concurrency', action='append', default=[], metavar='HOST=N',
+                                 help='单个站点的并发上限，可重复，如 "usenix.org=4"')
+    download_parser.add_argument('--rate', type=float, default=2.0,
+                                 help='未单独配置的站点的速率(请求/秒)，0表示不限速')
+    download_parser.add_argument('--host-rate', action='append', default=[], metavar='HOST=RATE',
+                                 help='单个站点的速率(请求/秒)，可重复，如 "eprint.iacr.org=0.5"')
     download_parser.add_argument('--output-dir', '-o', default='data/pdfs', help='输出目录')
+    download_parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE // 1024,
+                                 help='每次读取和写入的块大小(KB)')
+    download_parser.add_argument('--recheck', action='store_true',
+                                 help='同时检查已下载的论文，文件丢失时重新链接或下载')
+    download_parser.add_argument('--retry-now', action='store_true',
+                                 help='失败的论文不等退避时间，立即重试')
+    download_parser.add_argument('--retry-parked', action='store_true',
+                                 help='反复失败而被搁置的论文重新排队')
     
     # 导出JSON
     export_json_parser = subparsers.add_parser('export-json', help='导出JSON')
@@ -440,8 +1181,11 @@ def main():
     subparsers.add_parser('export-links', help='导出PDF下载链接列表')
     
     # 状态管理
-    subparsers.add_parser('status-update', help='更新下载状态')
+    status_update_parser = subparsers.add_parser('status-update', help='扫描PDF目录，更新下载状态')
+    status_update_parser.add_argument('--incremental', action='store_true',
+                                      help='只扫描上次扫描后有文件增删的目录')
     subparsers.add_parser('status-show', help='显示下载统计')
+    subparsers.add_parser('store-import', help='把已下载的PDF移入内容存储并合并重复文件')
     
     args = parser.parse_args()
     
@@ -451,13 +1195,37 @@ def main():
     
     # 执行命令
     if args.command == 'download':
-        downloader = PDFDownloader(output_dir=args.output_dir)
+        from utils.rate_limiter import RateLimiter, parse_host_rates
+        
+        rate_limiter = RateLimiter(
+            default_rate=args.rate,
+            default_burst=1,
+            host_rates=parse_host_rates(args.host_rate)
+        )
+        options = dict(output_dir=args.output_dir, rate_limiter=rate_limiter,
+                       chunk_size=args.chunk_size * 1024)
+        if args.engine == 'async':
+            if not AsyncPDFDownloader.available_modules(*AsyncPDFDownloader.CLIENTS):
+                parser.error("--engine async 需要安装 httpx 或 aiohttp")
+            downloader = AsyncPDFDownloader(http2=args.http2, client=args.client, **options)
+            try:
+                downloader.client_name()
+            except RuntimeError as e:
+                parser.error(str(e))
+            workers = args.workers or 256
+        else:
+            downloader = PDFDownloader(**options)
+            workers = args.workers or 5
         downloader.download_batch(
             conference=args.conference,
             year=args.year,
             limit=args.limit,
-            max_workers=args.workers,
-            delay=args.delay
+            max_workers=workers,
+            max_per_host=args.per_host,
+            host_limits=parse_host_rates(args.host_concurrency, int),
+            recheck=args.recheck,
+            retry_parked=args.retry_parked,
+            retry_now=args.retry_now
         )
     
     elif args.command == 'export-json':
@@ -474,7 +1242,11 @@ def main():
     
     elif args.command == 'status-update':
         manager = DownloadManager()
-        manager.update_download_status()
+        manager.update_download_status(incremental=args.incremental)
+    
+    elif args.command == 'store-import':
+        manager = DownloadManager()
+        manager.import_to_store()
         manager.show_stats()
     
     elif args.command == 'status-show':
@@ -1,12 +1,15 @@
 """
 数据库查询工具 - 方便查看和导出论文数据
 """
-import sqlite3
 import argparse
 import csv
 import os
+import sqlite3
+import sys
 from typing import List, Dict, Any
 
+from utils.database import DatabaseManager, connect
+
 
 class DatabaseViewer:
     """数据库查看器"""
@@ -17,121 +20,94 @@ class DatabaseViewer:
         if not os.path.exists(db_path):
             print(f"错误: 数据库文件不存在: {db_path}")
             exit(1)
+        self.db = DatabaseManager(db_path)
     
     def _get_connection(self):
-        """获取数据库连接"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        return conn
+        """获取数据库连接（WAL模式下可与写入进程并发读取）"""
+        return connect(self.db_path)
     
-    def list_papers(self, conference: str = None, year: int = None, limit: int = 10):
-        """列出论文"""
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        
-        query = "SELECT id, title, authors, year, conference, download_status FROM papers"
-        params = []
-        
-        where_clauses = []
-        if conference:
-            where_clauses.append("conference = ?")
-            params.append(conference)
-        if year:
-            where_clauses.append("year = ?")
-            params.append(year)
+    def list_papers(self, conference: str = None, year: int = None, limit: int = 10,
+                    after_title: str = None, after_id: int = None):
+        """按标题顺序列出论文，支持 --after-title/--after-id 翻页"""
+        papers = self.db.iter_papers(
+            conference, year, after_title=after_title, after_id=after_id, limit=limit,
+            columns="id, title, authors, year, conference, download_status")
         
-        if where_clauses:
-            query += " WHERE " + " AND ".join(where_clauses)
-        
-        query += f" ORDER BY year DESC, title LIMIT {limit}"
-        
-        cursor.execute(query, params)
-        papers = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        
-        if not papers:
-            print("没有找到论文")
-            return
-        
-        print(f"\n找到 {len(papers)} 篇论文:")
-        print("-" * 100)
+        count = 0
+        last = None
         for paper in papers:
+            if count == 0:
+                print(f"\n论文列表:")
+                print("-" * 100)
+            count += 1
+            last = paper
             print(f"ID: {paper['id']}")
             print(f"标题: {paper['title'][:80]}...")
-            print(f"作者: {paper['authors'][:80]}...")
+            print(f"作者: {(paper['authors'] or '')[:80]}...")
             print(f"会议: {paper['conference']} {paper['year']}")
             print(f"状态: {paper['download_status']}")
             print("-" * 100)
+        
+        if not count:
+            print("没有找到论文")
+            return
+        
+        print(f"共显示 {count} 篇论文")
+        if count == limit:
+            title = last['title'].replace('"', '\\"')
+            print(f'下一页: --after-title "{title}" --after-id {last["id"]}')
     
     def show_statistics(self):
         """显示统计信息"""
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        
-        # 总数
-        cursor.execute("SELECT COUNT(*) as total FROM papers")
-        total = cursor.fetchone()['total']
-        
-        # 按会议统计
-        cursor.execute("""
-            SELECT conference, year, COUNT(*) as count 
-            FROM papers 
-            GROUP BY conference, year
-            ORDER BY conference, year DESC
-        """)
-        by_conf_year = cursor.fetchall()
-        
-        # 按状态统计
-        cursor.execute("""
-            SELECT download_status, COUNT(*) as count 
-            FROM papers 
-            GROUP BY download_status
-        """)
-        by_status = cursor.fetchall()
-        
-        # 有PDF链接的数量
-        cursor.execute("SELECT COUNT(*) as count FROM papers WHERE pdf_url IS NOT NULL")
-        with_pdf_url = cursor.fetchone()['count']
-        
-        # 已下载的数量
-        cursor.execute("SELECT COUNT(*) as count FROM papers WHERE download_status = 'completed'")
-        downloaded = cursor.fetchone()['count']
-        
-        conn.close()
+        stats = self.db.get_statistics()
         
         print("\n" + "=" * 60)
         print("数据库统计信息")
         print("=" * 60)
-        print(f"总论文数: {total}")
-        print(f"有PDF链接: {with_pdf_url}")
-        print(f"已下载: {downloaded}")
+        print(f"总论文数: {stats['total']}")
+        print(f"有PDF链接: {stats['with_pdf_url']}")
+        print(f"已下载: {stats['by_status'].get('downloaded', 0)}")
         print()
         
         print("按会议和年份:")
-        for row in by_conf_year:
-            print(f"  {row['conference']} {row['year']}: {row['count']}")
+        for conference in sorted(stats['by_conference_year']):
+            years = stats['by_conference_year'][conference]
+            for year in sorted(years, key=lambda y: y or 0, reverse=True):
+                print(f"  {conference} {year}: {years[year]}")
         print()
         
         print("下载状态:")
-        for row in by_status:
-            print(f"  {row['download_status']}: {row['count']}")
+        for status, count in stats['by_status'].items():
+            print(f"  {status}: {count}")
         print("=" * 60)
     
-    def search(self, keyword: str, limit: int = 10):
-        """搜索论文"""
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        
-        query = """
-            SELECT id, title, authors, year, conference, download_status 
-            FROM papers 
-            WHERE title LIKE ? OR authors LIKE ?
-            LIMIT ?
-        """
+    def check_statistics(self, repair: bool = False):
+        """校验统计表与论文表是否一致"""
+        mismatches = self.db.check_statistics(repair=repair)
+        if not mismatches:
+            print("✓ 统计表与论文表一致")
+            return
         
-        cursor.execute(query, (f"%{keyword}%", f"%{keyword}%", limit))
-        papers = [dict(row) for row in cursor.fetchall()]
-        conn.close()
+        print(f"发现 {len(mismatches)} 个不一致的分组 (论文数, 有PDF链接数):")
+        for item in mismatches:
+            print(f"  {item['conference']} {item['year']} {item['download_status']}: "
+                  f"应为 {item['expected']}, 实际 {item['actual']}")
+        if repair:
+            print("✓ 已重建统计表")
+        else:
+            print("使用 --repair 重建统计表")
+    
+    def search(self, keyword: str, limit: int = 10, mode: str = 'terms',
+               conference: str = None, year: int = None):
+        """全文搜索论文（按相关度排序）"""
+        # 终端中用颜色高亮，重定向到文件时用方括号
+        highlight = ('\033[1;33m', '\033[0m') if sys.stdout.isatty() else ('[', ']')
+        try:
+            papers = self.db.search_papers(keyword, mode=mode, conference=conference,
+                                           year=year, limit=limit, highlight=highlight)
+        except sqlite3.OperationalError as e:
+            print(f"搜索语法错误: {e}")
+            return
         
         if not papers:
             print(f"没有找到包含 '{keyword}' 的论文")
@@ -141,45 +117,57 @@ class DatabaseViewer:
         print("-" * 100)
         for paper in papers:
             print(f"ID: {paper['id']}")
-            print(f"标题: {paper['title']}")
-            print(f"作者: {paper['authors'][:80]}...")
+            print(f"标题: {paper['title_highlight']}")
+            print(f"作者: {(paper['authors'] or '')[:80]}...")
             print(f"会议: {paper['conference']} {paper['year']}")
+            if paper['snippet'] and paper['snippet'] != paper['title_highlight']:
+                print(f"片段: {paper['snippet']}")
             print("-" * 100)
     
+    def rebuild_index(self):
+        """重建全文索引"""
+        total = self.db.rebuild_search_index()
+        print(f"✓ 已重建全文索引: {total} 篇论文")
+    
     def export_to_csv(self, output_file: str, conference: str = None, year: int = None):
-        """导出到CSV"""
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        
-        query = "SELECT * FROM papers"
-        params = []
+        """导出到CSV（流式写入，内存占用与论文数量无关）"""
+        papers = self.db.iter_papers(conference, year)
         
-        where_clauses = []
-        if conference:
-            where_clauses.append("conference = ?")
-            params.append(conference)
-        if year:
-            where_clauses.append("year = ?")
-            params.append(year)
-        
-        if where_clauses:
-            query += " WHERE " + " AND ".join(where_clauses)
-        
-        cursor.execute(query, params)
-        papers = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        
-        if not papers:
+        first = next(papers, None)
+        if first is None:
             print("没有找到论文")
             return
         
         # 写入CSV
+        count = 1
         with open(output_file, 'w', newline='', encoding='utf-8-sig') as f:
-            writer = csv.DictWriter(f, fieldnames=papers[0].keys())
+            writer = csv.DictWriter(f, fieldnames=first.keys())
             writer.writeheader()
-            writer.writerows(papers)
+            writer.writerow(first)
+            for paper in papers:
+                writer.writerow(paper)
+                count += 1
         
-        print(f"已导出 {len(papers)} 篇论文到 {output_file}")
+        print(f"已导出 {count} 篇论文到 {output_file}")
+    
+    def show_crawl_jobs(self, state: str = None):
+        """显示爬取作业日志"""
+        jobs = self.db.get_crawl_jobs(state)
+        if not jobs:
+            print("作业日志为空")
+            return
+        
+        print(f"\n{'目标':<24} {'状态':<8} {'尝试':>4} {'工作进程':<12} {'论文':>6} {'耗时(s)':>8}  结束时间")
+        print("-" * 100)
+        for job in jobs:
+            duration = f"{job['duration']:.1f}" if job['duration'] is not None else '-'
+            count = job['paper_count'] if job['paper_count'] is not None else '-'
+            print(f"{job['conference'] + ' ' + str(job['year']):<24} {job['state']:<8} "
+                  f"{job['attempts']:>4} {job['worker'] or '-':<12} {count:>6} {duration:>8}  "
+                  f"{job['finished_at'] or '-'}")
+            if job['error_message']:
+                print(f"    错误: {job['error_message']}")
+        print("-" * 100)
     
     def show_paper_detail(self, paper_id: int):
         """显示论文详情"""
@@ -214,14 +202,33 @@ def main():
     list_parser.add_argument('--conference', help='会议名称')
     list_parser.add_argument('--year', type=int, help='年份')
     list_parser.add_argument('--limit', type=int, default=10, help='显示数量')
+    list_parser.add_argument('--after-title', help='从该标题之后开始（翻页）')
+    list_parser.add_argument('--after-id', type=int, help='从该ID之后开始（翻页）')
     
     # stats命令
     subparsers.add_parser('stats', help='显示统计信息')
     
+    # stats-check命令
+    check_parser = subparsers.add_parser('stats-check', help='校验统计表')
+    check_parser.add_argument('--repair', action='store_true', help='不一致时重建统计表')
+    
     # search命令
     search_parser = subparsers.add_parser('search', help='搜索论文')
     search_parser.add_argument('keyword', help='搜索关键词')
     search_parser.add_argument('--limit', type=int, default=10, help='显示数量')
+    search_parser.add_argument('--conference', help='会议名称')
+    search_parser.add_argument('--year', type=int, help='年份')
+    mode_group = search_parser.add_mutually_exclusive_group()
+    mode_group.add_argument('--phrase', dest='mode', action='store_const', const='phrase',
+                            help='按完整短语匹配')
+    mode_group.add_argument('--prefix', dest='mode', action='store_const', const='prefix',
+                            help='按词前缀匹配，如 "zero know"')
+    mode_group.add_argument('--raw', dest='mode', action='store_const', const='raw',
+                            help='直接使用FTS5查询语法，如 "title:lattice NOT quantum"')
+    search_parser.set_defaults(mode='terms')
+    
+    # rebuild-index命令
+    subparsers.add_parser('rebuild-index', help='重建全文索引')
     
     # export命令
     export_parser = subparsers.add_parser('export', help='导出到CSV')
@@ -229,6 +236,11 @@ def main():
     export_parser.add_argument('--conference', help='会议名称')
     export_parser.add_argument('--year', type=int, help='年份')
     
+    # jobs命令
+    jobs_parser = subparsers.add_parser('jobs', help='显示爬取作业日志')
+    jobs_parser.add_argument('--state', choices=['pending', 'running', 'done', 'failed'],
+                             help='只显示该状态的目标')
+    
     # detail命令
     detail_parser = subparsers.add_parser('detail', help='显示论文详情')
     detail_parser.add_argument('id', type=int, help='论文ID')
@@ -242,13 +254,19 @@ def main():
     viewer = DatabaseViewer(args.db)
     
     if args.command == 'list':
-        viewer.list_papers(args.conference, args.year, args.limit)
+        viewer.list_papers(args.conference, args.year, args.limit, args.after_title, args.after_id)
     elif args.command == 'stats':
         viewer.show_statistics()
+    elif args.command == 'stats-check':
+        viewer.check_statistics(args.repair)
     elif args.command == 'search':
-        viewer.search(args.keyword, args.limit)
+        viewer.search(args.keyword, args.limit, args.mode, args.conference, args.year)
+    elif args.command == 'rebuild-index':
+        viewer.rebuild_index()
     elif args.command == 'export':
         viewer.export_to_csv(args.output, args.conference, args.year)
+    elif args.command == 'jobs':
+        viewer.show_crawl_jobs(args.state)
     elif args.command == 'detail':
         viewer.show_paper_detail(args.id)
 
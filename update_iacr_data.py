@@ -1,12 +1,25 @@
 """
 更新会议数据脚本
 收集IACR会议和四大安全会议的论文数据
+
+默认以增量模式运行：按自然键UPSERT，只更新确有变化的元数据，
+已下载的PDF路径、下载状态和备注都会保留。
+
+stream 引擎把每个 (会议, 年份) 目标的状态记录在爬取作业日志中，多年份回填
+中断后用 --resume 只爬取未完成和失败的目标；多个进程用 --resume 和不同的
+--worker 共用一个数据库时各自领取不同的目标。
 """
-import sqlite3
+import argparse
 import logging
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+from crawlers import registry
 from utils.database import DatabaseManager
-from crawlers.iacr_crawler import IACRCrawler
-from crawlers.security_crawler import SecurityCrawler
+from utils.models import Paper
+
+if TYPE_CHECKING:
+    from utils.rate_limiter import RateLimiter
+
+# 爬虫、HTTP客户端和解析库在 main() 中按需导入，--help 等不做收集的调用不加载它们
 
 logging.basicConfig(
     level=logging.INFO,
@@ -15,139 +28,306 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def main():
-    """主函数"""
-    # 初始化
-    db = DatabaseManager('data/papers.db')
-    iacr_crawler = IACRCrawler({})
-    security_crawler = SecurityCrawler({})
-    
-    # 定义要收集的会议和年份（只收集2025年）
-    # IACR会议
-    iacr_conferences = {
-        'CRYPTO': [2025],
-        # 'ASIACRYPT': [2025],  # 暂未发布
-        'EUROCRYPT': [2025]
-    }
-    
-    # 四大安全会议
-    security_conferences = {
-        'USENIX Security': [2025],
-        'NDSS': [2025],
-        'IEEE S&P': [2025],
-        # 'CCS': [2025]  # CCS 2025 accepted papers页面尚未发布
-    }
-    
-    # 步骤1: 清除旧数据
-    logger.info("=" * 60)
-    logger.info("步骤1: 清除旧数据")
-    logger.info("=" * 60)
-    
-    conn = sqlite3.connect('data/papers.db')
-    cursor = conn.cursor()
+# 定义要收集的会议和年份（只收集2025年）
+# IACR会议
+IACR_CONFERENCES = {
+    'CRYPTO': [2025],
+    # 'ASIACRYPT': [2025],  # 暂未发布
+    'EUROCRYPT': [2025]
+}
+
+# 四大安全会议
+SECURITY_CONFERENCES = {
+    'USENIX Security': [2025],
+    'NDSS': [2025],
+    'IEEE S&P': [2025],
+    # 'CCS': [2025]  # CCS 2025 accepted papers页面尚未发布
+}
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='更新会议论文数据')
+    parser.add_argument('--db', default='data/papers.db', help='数据库路径')
+    parser.add_argument('--full', action='store_true',
+                        help='全量模式：删除目标会议的全部论文后重新收集')
+    parser.add_argument('--yes', '-y', action='store_true', help='全量模式下跳过确认')
+    parser.add_argument('--prune', action='store_true',
+                        help='增量模式下删除网站上已不存在的论文')
+    parser.add_argument('--years', help='覆盖默认年份，如 2005-2025 或 2023,2024')
+    parser.add_argument('--engine', choices=['stream', 'async'], default='stream',
+                        help='stream: 边解析边分批入库，内存占用与页面大小无关（默认）；'
+                             'async: 异步引擎，每个目标解析完成后整体入库')
+    parser.add_argument('--resume', action='store_true',
+                        help='继续上次的收集：跳过已完成的目标，重试失败和未完成的目标（stream引擎）')
+    parser.add_argument('--worker', default='local',
+                        help='工作进程名称，多个进程共用一个数据库时各自指定不同的名称')
+    parser.add_argument('--max-attempts', type=int, default=3, help='--resume 时失败目标的最多尝试次数')
+    parser.add_argument('--lease', type=float, default=3600,
+                        help='其他进程领取的目标超过多少秒未完成时视为已放弃，可重新领取')
+    parser.add_argument('--reparse', action='store_true',
+                        help='即使页面与上次入库时相同也重新解析（修改解析器后使用）')
+    parser.add_argument('--concurrency', type=int, default=8, help='全局最大并发请求数')
+    parser.add_argument('--per-host', type=int, default=2, help='每个站点的最大并发请求数（async引擎）')
+    parser.add_argument('--queue-size', type=int, default=1000,
+                        help='stream引擎各阶段之间队列的容量（篇）')
+    parser.add_argument('--rate', type=float, default=2.0,
+                        help='未单独配置的站点的请求速率(请求/秒)')
+    parser.add_argument('--host-rate', action='append', default=[], metavar='HOST=RATE',
+                        help='单个站点的请求速率，可重复，如 "usenix.org=0.5"')
+    parser.add_argument('--html-backend', choices=['auto', 'selectolax', 'lxml', 'bs4'],
+                        default='auto', help='HTML解析后端，默认自动选择最快的已安装后端')
+    parser.add_argument('--cache-dir', default='data/http_cache', help='HTTP响应缓存目录')
+    parser.add_argument('--no-cache', action='store_true', help='禁用响应缓存')
+    parser.add_argument('--cache-ttl', type=float, default=0,
+                        help='缓存有效期（秒），0表示每次都用条件请求重新验证')
+    parser.add_argument('--cache-ttl-for', action='append', default=[], metavar='CONF=SECONDS',
+                        help='单个会议的缓存有效期，可重复，如 "NDSS=86400"')
+    parser.add_argument('--offline', action='store_true',
+                        help='离线回放：只使用缓存，不访问网络')
+    parser.add_argument('--enrich', action='store_true',
+                        help='收集后访问论文详情页，补全缺少的摘要、PDF链接和DOI')
+    parser.add_argument('--enrich-only', action='store_true', help='只补全详情页，不重新收集列表')
+    parser.add_argument('--enrich-limit', type=int, help='本次最多访问的详情页数')
+    parser.add_argument('--enrich-retry', action='store_true',
+                        help='忽略补全记录，重新访问所有仍缺少字段的论文')
+    return parser.parse_args()
+
+
+def parse_years(spec: str) -> List[int]:
+    """解析年份参数: 2005-2025 或 2023,2024"""
+    years = []
+    for part in spec.split(','):
+        if '-' in part:
+            start, end = part.split('-', 1)
+            years.extend(range(int(start), int(end) + 1))
+        elif part.strip():
+            years.append(int(part))
+    return years
+
+
+def crawler_config(args, rate_limiter: 'RateLimiter') -> Dict:
+    """根据命令行参数生成爬虫配置，所有爬虫共用同一个限速器"""
+    config = {'rate_limiter': rate_limiter, 'html_backend': args.html_backend}
+    if args.no_cache and not args.offline:
+        return config
+    ttl_by_conference = {}
+    for item in args.cache_ttl_for:
+        conf, _, seconds = item.rpartition('=')
+        ttl_by_conference[conf] = float(seconds)
+    config.update({
+        'cache_dir': args.cache_dir,
+        'cache_ttl': args.cache_ttl,
+        'cache_ttl_by_conference': ttl_by_conference,
+        'offline': args.offline,
+    })
+    return config
+
+
+def clear_old_data(db: DatabaseManager, conferences: List[str], confirm: bool) -> bool:
+    """全量模式：删除目标会议的旧数据，返回是否继续"""
+    old_data = [(conf, sum(count for _, count in db.count_by_year(conf))) for conf in conferences]
+    old_data = [(conf, count) for conf, count in old_data if count]
+    total_old = sum(count for _, count in old_data)
     
-    # 统计当前数据
-    all_conferences = list(iacr_conferences.keys()) + list(security_conferences.keys())
-    placeholders = ','.join(['?' for _ in all_conferences])
-    cursor.execute(f"SELECT conference, COUNT(*) FROM papers WHERE conference IN ({placeholders}) GROUP BY conference", 
-                   all_conferences)
-    old_data = cursor.fetchall()
+    if not old_data:
+        logger.info("数据库为空，开始收集数据")
+        return True
     
-    total_old = sum(count for _, count in old_data)
+    logger.info("当前数据库中的论文统计:")
+    for conf, count in old_data:
+        logger.info(f"  {conf}: {count} 篇")
+    logger.info(f"  总计: {total_old} 篇")
     
-    if old_data:
-        logger.info("当前数据库中的论文统计:")
-        for conf, count in old_data:
-            logger.info(f"  {conf}: {count} 篇")
-        logger.info(f"  总计: {total_old} 篇")
-        
+    if confirm:
         response = input(f"\n是否删除这些论文并重新收集? (yes/no): ")
         if response.lower() != 'yes':
             logger.info("用户取消操作")
+            return False
+    
+    deleted = db.delete_papers_by_conference(conferences)
+    logger.info(f"已删除 {deleted} 篇旧论文")
+    return True
+
+
+class ResultWriter:
+    """把每个爬取完成的目标写入数据库（由爬取引擎在目标完成时回调）"""
+    
+    def __init__(self, db: DatabaseManager, full: bool, prune: bool):
+        self.db = db
+        self.full = full
+        self.prune = prune
+        self.total_papers = 0
+        self.summary: Dict[str, Dict[str, int]] = {}
+    
+    def __call__(self, conf: str, year: int, papers: Optional[List[Paper]]):
+        if not papers:
+            # 爬取失败时不做任何写入，避免把整届会议误判为已删除
+            logger.warning(f"  ✗ {conf} {year} 未找到论文")
             return
         
-        cursor.execute(f"DELETE FROM papers WHERE conference IN ({placeholders})", all_conferences)
-        conn.commit()
-        logger.info(f"已删除 {total_old} 篇旧论文")
-    else:
-        logger.info("数据库为空，开始收集数据")
+        try:
+            # 保存到数据库
+            if self.full:
+                result = self.db.insert_papers(papers)
+                logger.info(f"  {conf} {year}: 新增 {result['inserted']}, "
+                            f"已存在 {result['duplicates']}, 失败 {result['failed']}")
+            else:
+                result = self.db.sync_papers(conf, year, papers, prune=self.prune)
+                self.summary[f"{conf} {year}"] = result
+                logger.info(f"  {conf} {year}: 新增 {result['added']}, 更新 {result['changed']}, "
+                            f"未变 {result['unchanged']}, 网站已移除 {result['removed']}")
+            
+            self.total_papers += len(papers)
+            logger.info(f"  ✓ {conf} {year} 完成")
+        
+        except Exception as e:
+            logger.error(f"  ✗ {conf} {year} 失败: {e}")
+
+
+def run_enrichment(args, db: DatabaseManager, crawlers: List) -> Dict[str, int]:
+    """访问详情页补全缺少的字段，可中断，重新运行时从上次的位置继续"""
+    logger.info("\n" + "=" * 60)
+    logger.info("补全摘要、PDF链接和DOI（论文详情页）")
+    logger.info("=" * 60)
+    from crawlers.enrichment import PaperEnricher
     
-    conn.close()
+    enricher = PaperEnricher(db, crawlers, concurrency=args.concurrency)
+    try:
+        return enricher.run(limit=args.enrich_limit, retry=args.enrich_retry)
+    except KeyboardInterrupt:
+        logger.warning("补全已中断，已完成的结果已保存，重新运行即可继续")
+        return {}
+
+
+def print_diff_summary(summary: Dict[str, Dict[str, int]], prune: bool):
+    """输出增量刷新的变更汇总"""
+    logger.info(f"\n{'目标':<24} {'新增':>6} {'更新':>6} {'未变':>6} {'移除':>6}")
+    logger.info("-" * 54)
+    totals = {'added': 0, 'changed': 0, 'unchanged': 0, 'removed': 0}
+    for target, result in summary.items():
+        logger.info(f"{target:<24} {result['added']:>6} {result['changed']:>6} "
+                    f"{result['unchanged']:>6} {result['removed']:>6}")
+        for key in totals:
+            totals[key] += result[key]
+    logger.info("-" * 54)
+    logger.info(f"{'总计':<24} {totals['added']:>6} {totals['changed']:>6} "
+                f"{totals['unchanged']:>6} {totals['removed']:>6}")
+    if totals['removed'] and not prune:
+        logger.info("网站上已移除的论文仍保留在数据库中，使用 --prune 删除")
+
+
+def print_job_summary(db: DatabaseManager, targets: List[Tuple[str, int]]):
+    """输出本次目标在作业日志中的状态"""
+    targets = set(targets)
+    jobs = [job for job in db.get_crawl_jobs() if (job['conference'], job['year']) in targets]
+    states: Dict[str, int] = {}
+    for job in jobs:
+        states[job['state']] = states.get(job['state'], 0) + 1
+    logger.info("作业状态: " + ", ".join(f"{state} {count}" for state, count in sorted(states.items())))
+    for job in jobs:
+        if job['state'] == 'failed':
+            logger.info(f"  失败: {job['conference']} {job['year']} "
+                        f"(第 {job['attempts']} 次): {job['error_message']}")
+    if len(jobs) > states.get('done', 0):
+        logger.info("使用 --resume 继续未完成和失败的目标")
+
+
+def main():
+    """主函数"""
+    args = parse_args()
+    if args.resume and args.engine != 'stream':
+        logger.error("--resume 只支持 stream 引擎")
+        return
+    if args.resume and args.full:
+        logger.error("--resume 不能与 --full 同时使用")
+        return
     
-    # 步骤2: 收集IACR数据
-    logger.info("\n" + "=" * 60)
-    logger.info("步骤2: 收集IACR会议数据")
-    logger.info("=" * 60 + "\n")
+    from utils.rate_limiter import RateLimiter, parse_host_rates
     
-    total_papers = 0
-    
-    for conf, years in iacr_conferences.items():
-        for year in years:
-            logger.info(f"\n收集 {conf} {year}...")
-            try:
-                papers = iacr_crawler.crawl(conf, year)
-                
-                if papers:
-                    logger.info(f"  找到 {len(papers)} 篇论文")
-                    
-                    # 保存到数据库
-                    for paper in papers:
-                        try:
-                            db.insert_paper(paper)
-                        except Exception as e:
-                            logger.warning(f"  保存论文失败: {paper.get('title', 'N/A')[:50]}... - {e}")
-                    
-                    total_papers += len(papers)
-                    logger.info(f"  ✓ {conf} {year} 完成")
-                else:
-                    logger.warning(f"  ✗ {conf} {year} 未找到论文")
-            
-            except Exception as e:
-                logger.error(f"  ✗ {conf} {year} 失败: {e}")
+    # 初始化
+    db = DatabaseManager(args.db)
+    rate_limiter = RateLimiter(default_rate=args.rate, host_rates=parse_host_rates(args.host_rate))
+    config = crawler_config(args, rate_limiter)
     
-    # 步骤3: 收集四大安全会议数据
+    all_conferences = list(IACR_CONFERENCES.keys()) + list(SECURITY_CONFERENCES.keys())
+    
+    if args.enrich_only:
+        # 同一爬虫类的会议共用一个实例，PaperEnricher 只使用能解析详情页的爬虫
+        crawlers = registry.create_crawlers(registry.names(), config)
+        unique_crawlers = list({id(crawler): crawler for crawler in crawlers.values()}.values())
+        run_enrichment(args, db, unique_crawlers)
+        for crawler in unique_crawlers:
+            crawler.close()
+        db.close()
+        return
+    
+    # 步骤1: 全量模式下清除旧数据
+    logger.info("=" * 60)
+    if args.full:
+        logger.info("步骤1: 清除旧数据")
+        logger.info("=" * 60)
+        if not clear_old_data(db, all_conferences, confirm=not args.yes):
+            return
+    else:
+        logger.info("步骤1: 增量刷新（保留PDF路径、下载状态和备注）")
+        logger.info("=" * 60)
+    
+    iacr_conferences = IACR_CONFERENCES
+    security_conferences = SECURITY_CONFERENCES
+    if args.years:
+        years = parse_years(args.years)
+        iacr_conferences = {conf: years for conf in iacr_conferences}
+        security_conferences = {conf: years for conf in security_conferences}
+    
+    crawlers = registry.create_crawlers(all_conferences, config)
+    unique_crawlers = list({id(crawler): crawler for crawler in crawlers.values()}.values())
+    targets = [(crawlers[conf], conf, year)
+               for conf, years in {**iacr_conferences, **security_conferences}.items() for year in years]
+    
+    # 步骤2: 并发收集IACR会议和四大安全会议数据，边爬取边入库
     logger.info("\n" + "=" * 60)
-    logger.info("步骤3: 收集四大安全会议数据")
+    logger.info(f"步骤2: 收集会议数据 ({len(targets)} 个目标, 并发 {args.concurrency})")
     logger.info("=" * 60 + "\n")
     
-    for conf, years in security_conferences.items():
-        for year in years:
-            logger.info(f"\n收集 {conf} {year}...")
-            try:
-                papers = security_crawler.crawl(conf, year)
-                
-                if papers:
-                    logger.info(f"  找到 {len(papers)} 篇论文")
-                    
-                    # 保存到数据库
-                    for paper in papers:
-                        try:
-                            db.insert_paper(paper)
-                        except Exception as e:
-                            logger.warning(f"  保存论文失败: {paper.get('title', 'N/A')[:50]}... - {e}")
-                    
-                    total_papers += len(papers)
-                    logger.info(f"  ✓ {conf} {year} 完成")
-                else:
-                    logger.warning(f"  ✗ {conf} {year} 未找到论文")
-            
-            except Exception as e:
-                logger.error(f"  ✗ {conf} {year} 失败: {e}")
+    if args.engine == 'stream':
+        from crawlers.pipeline import IngestPipeline
+        
+        # 不带 --resume 时重置这些目标的作业状态，全部重新爬取
+        jobs = [(conf, year) for _, conf, year in targets]
+        db.register_crawl_jobs(jobs, reset=not args.resume)
+        writer = IngestPipeline(db, full=args.full, prune=args.prune,
+                                concurrency=args.concurrency, queue_size=args.queue_size,
+                                worker=args.worker, max_attempts=args.max_attempts, lease=args.lease,
+                                skip_unchanged=not args.reparse)
+        writer.run(targets)
+        print_job_summary(db, jobs)
+    else:
+        from crawlers.async_engine import AsyncCrawlEngine
+        
+        writer = ResultWriter(db, args.full, args.prune)
+        engine = AsyncCrawlEngine(max_concurrency=args.concurrency, per_host=args.per_host,
+                                  rate_limiter=rate_limiter)
+        engine.crawl_all(targets, writer)
+    total_papers = writer.total_papers
+    summary = writer.summary
     
-    # 步骤4: 汇总统计
+    if args.enrich:
+        run_enrichment(args, db, unique_crawlers)
+    
+    # 步骤3: 汇总统计
     logger.info("\n" + "=" * 60)
-    logger.info("步骤4: 数据统计")
+    logger.info("步骤3: 数据统计")
     logger.info("=" * 60)
     
-    conn = sqlite3.connect('data/papers.db')
-    cursor = conn.cursor()
-    
     logger.info(f"\n总共收集: {total_papers} 篇论文\n")
     
-    logger.info("IACR会议:")
+    if summary:
+        print_diff_summary(summary, args.prune)
+    
+    logger.info("\nIACR会议:")
     for conf in iacr_conferences.keys():
-        cursor.execute("SELECT year, COUNT(*) FROM papers WHERE conference=? GROUP BY year ORDER BY year DESC", (conf,))
-        results = cursor.fetchall()
+        results = db.count_by_year(conf)
         
         if results:
             for year, count in results:
@@ -157,8 +337,7 @@ def main():
     
     logger.info("\n四大安全会议:")
     for conf in security_conferences.keys():
-        cursor.execute("SELECT year, COUNT(*) FROM papers WHERE conference=? GROUP BY year ORDER BY year DESC", (conf,))
-        results = cursor.fetchall()
+        results = db.count_by_year(conf)
         
         if results:
             for year, count in results:
@@ -166,7 +345,9 @@ def main():
         else:
             logger.info(f"  {conf}: 0 篇")
     
-    conn.close()
+    for crawler in unique_crawlers:
+        crawler.close()
+    db.close()
     
     logger.info("\n" + "=" * 60)
     logger.info("数据更新完成！")
@@ -1,7 +1,28 @@
 """
 工具包初始化文件
+
+包内的名称在第一次访问时才导入（PEP 562）：导入 utils.database 不会连带导入
+rate_limiter（asyncio）等只有爬虫和下载器才用到的模块。
 """
-from .database import DatabaseManager
-from .logger import setup_logger
+import importlib
+
+_EXPORTS = {
+    'DatabaseManager': 'utils.database',
+    'DownloadStatusRecorder': 'utils.status_recorder',
+    'HostScheduler': 'utils.host_scheduler',
+    'Paper': 'utils.models',
+    'RateLimiter': 'utils.rate_limiter',
+    'RetryScheduler': 'utils.retry_scheduler',
+    'setup_logger': 'utils.logger',
+}
+
+__all__ = sorted(_EXPORTS)
+
 
-__all__ = ['DatabaseManager', 'setup_logger']
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
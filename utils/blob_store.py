@@ -0,0 +1,123 @@
+"""
+按内容寻址的PDF存储 - objects/ab/cdef... 以 SHA-256 为文件名，内容相同只存一份
+
+人可读的目录结构（<会议>_<年份>/<id>_<标题>.pdf）由指向对象的硬链接组成；
+文件系统不支持硬链接时退回到符号链接，再不行才复制。对象设为只读：硬链接与
+对象是同一个文件，通过人可读路径修改文件会改坏所有引用该内容的论文。
+"""
+import hashlib
+import logging
+import os
+import shutil
+from pathlib import Path
+from typing import Iterator, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+PathLike = Union[str, Path]
+
+
+def hash_file(path: PathLike, chunk_size: int = 1024 * 1024) -> str:
+    """文件内容的 SHA-256（十六进制）"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BlobStore:
+    """
+    内容寻址的文件存储
+    
+    用法:
+        store = BlobStore('data/pdfs/objects')
+        digest, added = store.add('paper.pdf.part')     # 移入存储，重复内容直接删除
+        store.link(digest, 'data/pdfs/CRYPTO_2025/1_Title.pdf')
+    """
+    
+    def __init__(self, root: PathLike):
+        """
+        Args:
+            root: 存储目录，对象保存在 root/<前2位>/<其余62位>
+        """
+        self.root = Path(root)
+    
+    def object_path(self, digest: str) -> Path:
+        """对象的路径"""
+        return self.root / digest[:2] / digest[2:]
+    
+    def has(self, digest: str) -> bool:
+        """存储中是否已有该内容"""
+        return self.object_path(digest).is_file()
+    
+    def add(self, path: PathLike, digest: str = None) -> Tuple[str, bool]:
+        """
+        把文件移入存储，原路径上的文件被移走
+        
+        Args:
+            path: 文件路径，须与存储在同一文件系统上
+            digest: 已知的 SHA-256，省略时计算
+        
+        Returns:
+            (SHA-256, 是否为新内容)；内容已存在时直接删除该文件
+        """
+        digest = digest or hash_file(path)
+        target = self.object_path(digest)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.chmod(path, 0o444)
+        try:
+            # 硬链接只在目标不存在时创建，并发加入相同内容时不会替换已被链接的对象
+            os.link(path, target)
+            added = True
+        except FileExistsError:
+            added = False
+        except OSError:
+            # 不支持硬链接的文件系统
+            if target.exists():
+                added = False
+            else:
+                os.replace(path, target)
+                return digest, True
+        os.unlink(path)
+        return digest, added
+    
+    def link(self, digest: str, dest: PathLike) -> bool:
+        """
+        在 dest 建立指向对象的链接（已有文件被原子替换）
+        
+        Returns:
+            是否新建了链接；dest 已指向该对象时为False
+        """
+        source = self.object_path(digest)
+        dest = Path(dest)
+        try:
+            if os.path.samefile(source, dest):
+                return False
+        except OSError:
+            pass
+        
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        temp = dest.with_name(dest.name + '.link')
+        if temp.exists() or temp.is_symlink():
+            temp.unlink()
+        try:
+            os.link(source, temp)
+        except OSError:
+            try:
+                os.symlink(os.path.relpath(source, dest.parent), temp)
+            except OSError:
+                shutil.copyfile(source, temp)
+        os.replace(temp, dest)
+        return True
+    
+    def iter_objects(self) -> Iterator[Tuple[str, Path]]:
+        """遍历存储中的全部对象，产出 (SHA-256, 路径)"""
+        if not self.root.is_dir():
+            return
+        for prefix in os.scandir(self.root):
+            if not prefix.is_dir() or len(prefix.name) != 2:
+                continue
+            for entry in os.scandir(prefix.path):
+                if entry.is_file():
+                    yield prefix.name + entry.name, Path(entry.path)
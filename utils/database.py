@@ -3,24 +3,153 @@
 """
 import sqlite3
 import logging
-from typing import Optional, List, Dict, Any
+import threading
+from contextlib import contextmanager
+from typing import Optional, List, Dict, Any, Iterable, Iterator, Tuple, Union
 from datetime import datetime
 import os
 
+from utils.models import Paper
+
 logger = logging.getLogger(__name__)
 
+# 默认连接参数（PRAGMA）
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',       # 读写并发，读者不会被写者阻塞
+    'synchronous': 'NORMAL',     # WAL模式下NORMAL已足够安全
+    'cache_size': -64000,        # 负数表示KB，约64MB页缓存
+    'mmap_size': 268435456,      # 256MB内存映射
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000,        # 毫秒，锁冲突时等待而不是立即报错
+}
+
+# 爬虫写入的元数据列（顺序即INSERT参数顺序）
+PAPER_COLUMNS = (
+    'paper_key', 'title', 'authors', 'abstract', 'year', 'conference',
+    'url', 'pdf_url', 'eprint_url', 'slides_url', 'video_url', 'doi', 'dblp_key',
+    'keywords', 'affiliations', 'meta_hash'
+)
+
+# 增量刷新时由爬虫数据覆盖的列，pdf_path/download_status/notes 等本地状态不受影响
+UPSERT_COLUMNS = Paper.METADATA_FIELDS
+
+# 由论文详情页补全的列（crawlers.enrichment）。增量刷新时列表页给出的空值不覆盖已补全的值
+ENRICHED_COLUMNS = ('abstract', 'pdf_url', 'doi')
+
+# 旧数据库需要补充的列
+MIGRATED_COLUMNS = {
+    'paper_key': 'TEXT',
+    'keywords': 'TEXT',
+    'eprint_url': 'TEXT',
+    'slides_url': 'TEXT',
+    'video_url': 'TEXT',
+    'affiliations': 'TEXT',
+    'meta_hash': 'TEXT',     # 最近一次写入的元数据指纹（Paper.metadata_hash）
+    'pdf_sha256': 'TEXT',    # 已下载PDF的内容哈希，即 objects/ 中的对象名（utils.blob_store）
+    'pdf_size': 'INTEGER',   # 已下载PDF的字节数
+    'downloaded_at': 'TIMESTAMP',
+}
+
+# download_log 需要补充的列
+MIGRATED_DOWNLOAD_LOG_COLUMNS = {
+    'bytes': 'INTEGER',      # 下载完成时的文件字节数
+    'duration': 'REAL',      # 本次下载耗时（秒，含续传）
+    'error_kind': 'TEXT',    # 失败的类型：permanent / transient（utils.retry_scheduler）
+}
+
+# 下载状态：pending 待下载，downloaded 已下载，failed 最近一次下载失败（退避后重试），
+# parked 反复失败后不再自动重试（download --retry-parked）
+DOWNLOAD_STATUSES = ('pending', 'downloaded', 'failed', 'parked')
+
+# 全文索引的列及其bm25权重（标题命中最重要）
+FTS_COLUMNS = ('title', 'authors', 'abstract', 'keywords')
+FTS_WEIGHTS = (10.0, 4.0, 1.0, 3.0)
+
+# SQLite单条语句的参数上限为999
+_MAX_SQL_VARIABLES = 900
+
+def missing_sql(column: str, table: str = 'papers') -> str:
+    """
+    判断补全列缺失的SQL条件：空值，或（pdf_url）与详情页URL相同的占位链接
+    
+    Args:
+        column: ENRICHED_COLUMNS 中的列名
+        table: 表名或别名（如 excluded）
+    """
+    if column == 'pdf_url':
+        return f"COALESCE({table}.pdf_url, '') IN ('', COALESCE({table}.url, ''))"
+    return f"COALESCE({table}.{column}, '') = ''"
+
+
+def make_paper_key(paper_data: Union[Paper, Dict[str, Any]]) -> str:
+    """
+    生成论文的稳定自然键
+    
+    优先级: DOI > IACR eprint编号 > 规范化(标题+会议+年份)的哈希，详见 Paper.natural_key
+    """
+    return Paper.coerce(paper_data).natural_key()
+
+
+def iter_rows(cursor: sqlite3.Cursor, chunk_size: int = 500) -> Iterator[Dict[str, Any]]:
+    """
+    分块读取游标结果，逐行生成字典，内存占用与结果集大小无关
+    
+    Args:
+        cursor: 已执行查询的游标
+        chunk_size: 每次 fetchmany 的行数
+    """
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            return
+        for row in rows:
+            yield dict(row)
+
+
+def connect(db_path: str, check_same_thread: bool = True, **pragmas) -> sqlite3.Connection:
+    """
+    创建并配置数据库连接
+    
+    Args:
+        db_path: 数据库文件路径
+        check_same_thread: 是否禁止跨线程使用连接
+        **pragmas: 覆盖 DEFAULT_PRAGMAS 中的参数，值为None表示不设置
+        
+    Returns:
+        配置好的连接（autocommit模式，事务由调用方显式控制）
+    """
+    settings = dict(DEFAULT_PRAGMAS)
+    settings.update(pragmas)
+    
+    conn = sqlite3.connect(db_path, isolation_level=None,
+                           check_same_thread=check_same_thread)
+    conn.row_factory = sqlite3.Row
+    for name, value in settings.items():
+        if value is None:
+            continue
+        conn.execute(f"PRAGMA {name} = {value}")
+    return conn
+
 
 class DatabaseManager:
     """数据库管理类"""
     
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, **pragmas):
         """
         初始化数据库管理器
         
+        每个线程持有一个长连接，首次使用时创建，调用 close() 统一关闭。
+        
         Args:
             db_path: 数据库文件路径
+            **pragmas: 连接参数，如 synchronous='FULL'、cache_size=-128000、
+                mmap_size=0，详见 DEFAULT_PRAGMAS
         """
         self.db_path = db_path
+        self.pragmas = pragmas
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
         self._ensure_db_directory()
         self._init_database()
     
@@ -32,107 +161,820 @@ class DatabaseManager:
             logger.info(f"创建数据库目录: {db_dir}")
     
     def _get_connection(self) -> sqlite3.Connection:
-        """获取数据库连接"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+        """获取当前线程的数据库连接（不存在则创建）"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # 允许 close() 在其他线程中关闭连接，连接本身仍只在创建线程中使用
+            conn = connect(self.db_path, check_same_thread=False, **self.pragmas)
+            self._local.conn = conn
+            self._local.depth = 0
+            with self._connections_lock:
+                self._connections.append(conn)
         return conn
     
+    @contextmanager
+    def transaction(self, immediate: bool = False) -> Iterator[sqlite3.Connection]:
+        """
+        显式事务上下文
+        
+        正常退出时提交，异常时回滚。嵌套调用会并入最外层事务（以SAVEPOINT
+        隔离，内层失败只回滚内层），因此可以把多次 insert_paper /
+        update_download_status 包在一个事务中。
+        
+        Args:
+            immediate: 是否使用 BEGIN IMMEDIATE 立即获取写锁
+            
+        Yields:
+            当前线程的连接
+        """
+        conn = self._get_connection()
+        if self._local.depth > 0:
+            savepoint = f"sp_{self._local.depth}"
+            conn.execute(f"SAVEPOINT {savepoint}")
+            self._local.depth += 1
+            try:
+                yield conn
+            except BaseException:
+                conn.execute(f"ROLLBACK TO {savepoint}")
+                conn.execute(f"RELEASE {savepoint}")
+                raise
+            else:
+                conn.execute(f"RELEASE {savepoint}")
+            finally:
+                self._local.depth -= 1
+            return
+        
+        conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+        self._local.depth = 1
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+        finally:
+            self._local.depth = 0
+    
+    def close_thread_connection(self):
+        """关闭当前线程的连接（工作线程退出前调用）"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            return
+        with self._connections_lock:
+            if conn in self._connections:
+                self._connections.remove(conn)
+        conn.close()
+        self._local.conn = None
+    
+    def close(self):
+        """关闭所有线程创建的连接"""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+    
     def _init_database(self):
         """初始化数据库表结构"""
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        
-        # 创建论文表
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS papers (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                authors TEXT,
-                abstract TEXT,
-                year INTEGER,
-                conference TEXT NOT NULL,
-                url TEXT,
-                pdf_url TEXT,
-                pdf_path TEXT,
-                doi TEXT,
-                dblp_key TEXT UNIQUE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                download_status TEXT DEFAULT 'pending',
-                notes TEXT
-            )
+        with self.transaction() as conn:
+            cursor = conn.cursor()
+            
+            # 创建论文表
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS papers (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    title TEXT NOT NULL,
+                    authors TEXT,
+                    abstract TEXT,
+                    year INTEGER,
+                    conference TEXT NOT NULL,
+                    url TEXT,
+                    pdf_url TEXT,
+                    pdf_path TEXT,
+                    doi TEXT,
+                    dblp_key TEXT UNIQUE,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    download_status TEXT DEFAULT 'pending',
+                    notes TEXT
+                )
+            """)
+            
+            # 创建索引
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_conference_year 
+                ON papers(conference, year)
+            """)
+            
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_download_status 
+                ON papers(download_status)
+            """)
+            
+            # 键集分页索引: ORDER BY title, id
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_title_id
+                ON papers(title, id)
+            """)
+            
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_conference_year_title
+                ON papers(conference, year, title, id)
+            """)
+            
+            added = self._ensure_columns(conn, 'papers', MIGRATED_COLUMNS)
+            key_index = cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_paper_key'").fetchone()
+            if 'paper_key' in added or key_index is None:
+                # 建立唯一索引后写入的记录都带有paper_key，只在升级时补算一次
+                self._backfill_paper_keys(conn)
+            if 'meta_hash' in added:
+                # 之后写入的记录都带有指纹，只在新增该列时补算，避免每次打开都扫描全表
+                self._backfill_meta_hashes(conn)
+            if 'downloaded_at' in added:
+                # 早期文档中的状态名 completed 与 downloaded 同义，升级时统一
+                cursor.execute("UPDATE papers SET download_status = 'downloaded' "
+                               "WHERE download_status = 'completed'")
+            cursor.execute("""
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_paper_key
+                ON papers(paper_key)
+            """)
+            
+            # 创建下载日志表
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS download_log (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    paper_id INTEGER,
+                    attempt_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    status TEXT,
+                    error_message TEXT,
+                    bytes INTEGER,
+                    duration REAL,
+                    error_kind TEXT,
+                    FOREIGN KEY (paper_id) REFERENCES papers(id)
+                )
+            """)
+            self._ensure_columns(conn, 'download_log', MIGRATED_DOWNLOAD_LOG_COLUMNS)
+            # 重试调度按论文读取最近的失败记录
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_download_log_paper
+                ON download_log(paper_id, id)
+            """)
+            
+            # 下载过的链接 -> 内容哈希（utils.blob_store）。论文被删除后重新插入（新ID）
+            # 或多篇论文使用同一链接时，内容已在存储中就不必重新下载
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS pdf_blobs (
+                    pdf_url TEXT PRIMARY KEY,
+                    pdf_sha256 TEXT NOT NULL,
+                    fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
+            # status-update 扫描过的PDF目录及当时的 mtime，增量扫描时跳过未变化的目录。
+            # mtime_ns 为NULL表示扫描时目录不存在
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS pdf_dir_scans (
+                    directory TEXT PRIMARY KEY,
+                    mtime_ns INTEGER,
+                    scanned_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
+            # 详情页补全日志：每篇论文一行，中断后据此跳过已访问的详情页
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS enrichment_log (
+                    paper_id INTEGER PRIMARY KEY,
+                    url TEXT,
+                    status TEXT NOT NULL,
+                    fields TEXT,
+                    error_message TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    attempt_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (paper_id) REFERENCES papers(id)
+                )
+            """)
+            
+            # 爬取作业日志：每个 (会议, 年份) 目标一行，支持中断后继续和多个进程分摊目标
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS crawl_jobs (
+                    conference TEXT NOT NULL,
+                    year INTEGER NOT NULL,
+                    state TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    worker TEXT,
+                    content_hash TEXT,
+                    paper_count INTEGER,
+                    error_message TEXT,
+                    started_at TIMESTAMP,
+                    finished_at TIMESTAMP,
+                    duration REAL,
+                    PRIMARY KEY (conference, year)
+                )
+            """)
+            
+            self.fts_enabled = self._init_search_index(conn)
+            self._init_stats_table(conn)
+        
+        logger.info(f"数据库初始化完成: {self.db_path}")
+    
+    @staticmethod
+    def _init_search_index(conn: sqlite3.Connection) -> bool:
+        """
+        创建FTS5全文索引及同步触发器
+        
+        Returns:
+            FTS5是否可用（部分SQLite编译版本不包含FTS5）
+        """
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'papers_fts'").fetchone()
+        columns = ', '.join(FTS_COLUMNS)
+        new_columns = ', '.join(f"new.{column}" for column in FTS_COLUMNS)
+        old_columns = ', '.join(f"old.{column}" for column in FTS_COLUMNS)
+        
+        try:
+            conn.execute(f"""
+                CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5(
+                    {columns},
+                    content='papers', content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2'
+                )
+            """)
+        except sqlite3.OperationalError as e:
+            logger.warning(f"FTS5不可用，搜索将退化为LIKE查询: {e}")
+            return False
+        
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS papers_fts_insert AFTER INSERT ON papers BEGIN
+                INSERT INTO papers_fts(rowid, {columns}) VALUES (new.id, {new_columns});
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS papers_fts_delete AFTER DELETE ON papers BEGIN
+                INSERT INTO papers_fts(papers_fts, rowid, {columns}) VALUES ('delete', old.id, {old_columns});
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS papers_fts_update AFTER UPDATE OF {columns} ON papers BEGIN
+                INSERT INTO papers_fts(papers_fts, rowid, {columns}) VALUES ('delete', old.id, {old_columns});
+                INSERT INTO papers_fts(rowid, {columns}) VALUES (new.id, {new_columns});
+            END
         """)
         
-        # 创建索引
-        cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_conference_year 
-            ON papers(conference, year)
+        if not exists:
+            # 已有数据的旧数据库需要一次性建立索引
+            conn.execute("INSERT INTO papers_fts(papers_fts) VALUES ('rebuild')")
+            logger.info("数据库迁移: 已建立全文索引 papers_fts")
+        return True
+    
+    @staticmethod
+    def _init_stats_table(conn: sqlite3.Connection):
+        """
+        创建按 (会议, 年份, 下载状态) 分组的统计表及维护触发器
+        
+        year 为NULL记为0，download_status 为NULL记为''，以便作为主键
+        """
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'paper_stats'").fetchone()
+        
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS paper_stats (
+                conference TEXT NOT NULL,
+                year INTEGER NOT NULL,
+                download_status TEXT NOT NULL,
+                paper_count INTEGER NOT NULL DEFAULT 0,
+                with_pdf_url INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (conference, year, download_status)
+            ) WITHOUT ROWID
         """)
         
-        cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_download_status 
-            ON papers(download_status)
+        def add(row: str) -> str:
+            return f"""
+                INSERT INTO paper_stats (conference, year, download_status, paper_count, with_pdf_url)
+                VALUES ({row}.conference, IFNULL({row}.year, 0), IFNULL({row}.download_status, ''),
+                        1, IFNULL({row}.pdf_url, '') != '')
+                ON CONFLICT (conference, year, download_status) DO UPDATE SET
+                    paper_count = paper_count + 1,
+                    with_pdf_url = with_pdf_url + excluded.with_pdf_url;
+            """
+        
+        def remove(row: str) -> str:
+            group = (f"conference = {row}.conference AND year = IFNULL({row}.year, 0) "
+                     f"AND download_status = IFNULL({row}.download_status, '')")
+            return f"""
+                UPDATE paper_stats SET
+                    paper_count = paper_count - 1,
+                    with_pdf_url = with_pdf_url - (IFNULL({row}.pdf_url, '') != '')
+                WHERE {group};
+                DELETE FROM paper_stats WHERE {group} AND paper_count <= 0;
+            """
+        
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS paper_stats_insert AFTER INSERT ON papers BEGIN
+                {add('new')}
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS paper_stats_delete AFTER DELETE ON papers BEGIN
+                {remove('old')}
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS paper_stats_update
+            AFTER UPDATE OF conference, year, download_status, pdf_url ON papers BEGIN
+                {remove('old')}
+                {add('new')}
+            END
         """)
         
-        # 创建下载日志表
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS download_log (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                paper_id INTEGER,
-                attempt_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                status TEXT,
-                error_message TEXT,
-                FOREIGN KEY (paper_id) REFERENCES papers(id)
-            )
+        if not exists:
+            DatabaseManager._fill_stats_table(conn)
+            logger.info("数据库迁移: 已建立统计表 paper_stats")
+    
+    @staticmethod
+    def _fill_stats_table(conn: sqlite3.Connection):
+        """根据papers表全量重算统计表"""
+        conn.execute("DELETE FROM paper_stats")
+        conn.execute("""
+            INSERT INTO paper_stats (conference, year, download_status, paper_count, with_pdf_url)
+            SELECT conference, IFNULL(year, 0), IFNULL(download_status, ''),
+                   COUNT(*), SUM(IFNULL(pdf_url, '') != '')
+            FROM papers
+            GROUP BY 1, 2, 3
         """)
+    
+    def check_statistics(self, repair: bool = False) -> List[Dict[str, Any]]:
+        """
+        校验统计表与papers表是否一致（需要全表扫描）
         
-        conn.commit()
-        conn.close()
-        logger.info(f"数据库初始化完成: {self.db_path}")
+        Args:
+            repair: 发现不一致时是否重建统计表
+            
+        Returns:
+            不一致的分组列表，每项包含 expected/actual 计数
+        """
+        conn = self._get_connection()
+        expected = {
+            (row[0], row[1], row[2]): (row[3], row[4]) for row in conn.execute("""
+                SELECT conference, IFNULL(year, 0), IFNULL(download_status, ''),
+                       COUNT(*), SUM(IFNULL(pdf_url, '') != '')
+                FROM papers GROUP BY 1, 2, 3
+            """)
+        }
+        actual = {
+            (row[0], row[1], row[2]): (row[3], row[4]) for row in conn.execute(
+                "SELECT conference, year, download_status, paper_count, with_pdf_url FROM paper_stats")
+        }
+        
+        mismatches = []
+        for group in sorted(set(expected) | set(actual), key=str):
+            if expected.get(group) != actual.get(group):
+                mismatches.append({
+                    'conference': group[0],
+                    'year': group[1] or None,
+                    'download_status': group[2] or None,
+                    'expected': expected.get(group, (0, 0)),
+                    'actual': actual.get(group, (0, 0)),
+                })
+        
+        if mismatches and repair:
+            self.rebuild_statistics()
+        return mismatches
+    
+    def rebuild_statistics(self):
+        """重建统计表"""
+        with self.transaction() as conn:
+            self._fill_stats_table(conn)
+        logger.info("统计表重建完成")
     
-    def insert_paper(self, paper_data: Dict[str, Any]) -> Optional[int]:
+    def rebuild_search_index(self) -> int:
         """
-        插入论文记录
+        从papers表重建全文索引并合并索引段
+        
+        Returns:
+            索引的论文数量
+        """
+        if not self.fts_enabled:
+            logger.warning("FTS5不可用，无法重建全文索引")
+            return 0
+        
+        with self.transaction() as conn:
+            conn.execute("INSERT INTO papers_fts(papers_fts) VALUES ('rebuild')")
+            conn.execute("INSERT INTO papers_fts(papers_fts) VALUES ('optimize')")
+            total = conn.execute("SELECT COUNT(*) FROM papers").fetchone()[0]
+        logger.info(f"全文索引重建完成: {total} 篇论文")
+        return total
+    
+    @staticmethod
+    def build_match_query(text: str, mode: str = 'terms') -> str:
+        """
+        把用户输入转换为FTS5 MATCH表达式
+        
+        Args:
+            text: 用户输入
+            mode: terms(所有词都出现) / prefix(所有词按前缀匹配) /
+                  phrase(整句短语) / raw(原样使用FTS5语法)
+                  
+        Returns:
+            MATCH表达式
+        """
+        if mode == 'raw':
+            return text
+        
+        def quote(term: str) -> str:
+            return '"' + term.replace('"', '""') + '"'
+        
+        if mode == 'phrase':
+            return quote(text.strip())
+        
+        terms = text.split()
+        if mode == 'prefix':
+            return ' '.join(quote(term) + '*' for term in terms)
+        return ' '.join(quote(term) for term in terms)
+    
+    def search_papers(self, text: str, mode: str = 'terms', conference: Optional[str] = None,
+                      year: Optional[int] = None, limit: int = 10,
+                      highlight: Tuple[str, str] = ('[', ']')) -> List[Dict[str, Any]]:
+        """
+        全文搜索论文（标题、作者、摘要、关键词），按bm25相关度排序
         
         Args:
-            paper_data: 论文数据字典
+            text: 搜索内容
+            mode: 匹配模式，见 build_match_query
+            conference: 会议过滤（可选）
+            year: 年份过滤（可选）
+            limit: 返回数量
+            highlight: 高亮标记的开始/结束字符串
             
         Returns:
-            插入的记录ID，如果已存在则返回None
+            论文列表，包含 title_highlight、snippet、score 字段
         """
+        filters = []
+        params: List[Any] = []
+        if conference:
+            filters.append("p.conference = ?")
+            params.append(conference)
+        if year:
+            filters.append("p.year = ?")
+            params.append(year)
+        
         conn = self._get_connection()
-        cursor = conn.cursor()
         
+        if not self.fts_enabled:
+            like = f"%{text}%"
+            where = " AND ".join(["(p.title LIKE ? OR p.authors LIKE ? OR p.abstract LIKE ?)"] + filters)
+            rows = conn.execute(f"""
+                SELECT p.id, p.title, p.authors, p.year, p.conference, p.download_status,
+                       p.title AS title_highlight, '' AS snippet, 0 AS score
+                FROM papers p WHERE {where} LIMIT ?
+            """, [like, like, like] + params + [limit]).fetchall()
+            return [dict(row) for row in rows]
+        
+        start, end = highlight
+        weights = ', '.join(str(weight) for weight in FTS_WEIGHTS)
+        where = " AND ".join(["papers_fts MATCH ?"] + filters)
+        rows = conn.execute(f"""
+            SELECT p.id, p.title, p.authors, p.year, p.conference, p.download_status,
+                   highlight(papers_fts, 0, ?, ?) AS title_highlight,
+                   snippet(papers_fts, -1, ?, ?, '...', 16) AS snippet,
+                   bm25(papers_fts, {weights}) AS score
+            FROM papers_fts
+            JOIN papers p ON p.id = papers_fts.rowid
+            WHERE {where}
+            ORDER BY score
+            LIMIT ?
+        """, [start, end, start, end, self.build_match_query(text, mode)] + params + [limit]).fetchall()
+        return [dict(row) for row in rows]
+    
+    @staticmethod
+    def _ensure_columns(conn: sqlite3.Connection, table: str, columns: Dict[str, str]) -> List[str]:
+        """为旧数据库补充缺失的列，返回新增的列名"""
+        existing = {row['name'] for row in conn.execute(f"PRAGMA table_info({table})")}
+        added = []
+        for name, decl in columns.items():
+            if name not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
+                logger.info(f"数据库迁移: {table} 新增列 {name}")
+                added.append(name)
+        return added
+    
+    @staticmethod
+    def _backfill_paper_keys(conn: sqlite3.Connection):
+        """
+        为没有自然键的旧记录生成paper_key
+        
+        自然键相同的重复记录只保留一条：优先保留有下载状态（已下载或有本地PDF）的记录，
+        其次ID最小的；其余记录的下载日志和补全日志并入保留的记录后删除，
+        保证每条记录都有paper_key，能被增量刷新和 --prune 处理。
+        """
+        rows = conn.execute("""
+            SELECT id, title, year, conference, url, pdf_url, eprint_url, doi,
+                   paper_key, download_status, pdf_path, pdf_sha256
+            FROM papers ORDER BY id
+        """).fetchall()
+        if not any(row['paper_key'] is None for row in rows):
+            return
+        
+        groups: Dict[str, List[sqlite3.Row]] = {}
+        for row in rows:
+            key = row['paper_key'] or Paper.from_row(row).natural_key()
+            groups.setdefault(key, []).append(row)
+        
+        updates = []
+        merged = []
+        for key, group in groups.items():
+            keep = min(group, key=lambda row: (
+                not (row['download_status'] in ('downloaded', 'completed')
+                     or row['pdf_path'] or row['pdf_sha256']),
+                row['id']))
+            if keep['paper_key'] is None:
+                updates.append((key, keep['id']))
+            merged.extend((keep['id'], row['id']) for row in group if row is not keep)
+        
+        tables = {row['name'] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'")}
+        if merged:
+            if 'download_log' in tables:
+                conn.executemany("UPDATE download_log SET paper_id = ? WHERE paper_id = ?", merged)
+            if 'enrichment_log' in tables:
+                # 每篇论文一行，保留的记录已有补全日志时丢弃重复记录的
+                conn.executemany("UPDATE OR IGNORE enrichment_log SET paper_id = ? WHERE paper_id = ?",
+                                 merged)
+                conn.executemany("DELETE FROM enrichment_log WHERE paper_id = ?",
+                                 [(duplicate,) for _, duplicate in merged])
+            # 先删除重复记录再写入paper_key，唯一索引已存在时也不会冲突
+            conn.executemany("DELETE FROM papers WHERE id = ?",
+                             [(duplicate,) for _, duplicate in merged])
+        conn.executemany("UPDATE papers SET paper_key = ? WHERE id = ?", updates)
+        
+        message = f"数据库迁移: 为 {len(updates)} 条记录生成 paper_key"
+        if merged:
+            message += f"，删除 {len(merged)} 条重复记录"
+        logger.info(message)
+    
+    @staticmethod
+    def _backfill_meta_hashes(conn: sqlite3.Connection):
+        """为没有元数据指纹的旧记录按当前字段计算指纹"""
+        columns = ', '.join(('id',) + UPSERT_COLUMNS)
+        rows = conn.execute(f"SELECT {columns} FROM papers WHERE meta_hash IS NULL").fetchall()
+        if not rows:
+            return
+        conn.executemany("UPDATE papers SET meta_hash = ? WHERE id = ?",
+                         [(Paper.from_row(row).metadata_hash(), row['id']) for row in rows])
+        logger.info(f"数据库迁移: 为 {len(rows)} 条记录生成 meta_hash")
+    
+    def insert_paper(self, paper_data: Union[Paper, Dict[str, Any]]) -> Optional[int]:
+        """
+        插入论文记录
+        
+        Args:
+            paper_data: 论文记录（Paper 或字典）
+            
+        Returns:
+            插入的记录ID，如果已存在则返回None
+        """
+        paper = Paper.coerce(paper_data)
         try:
-            cursor.execute("""
-                INSERT INTO papers (
-                    title, authors, abstract, year, conference, 
-                    url, pdf_url, doi, dblp_key
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                paper_data.get('title'),
-                paper_data.get('authors'),
-                paper_data.get('abstract'),
-                paper_data.get('year'),
-                paper_data.get('conference'),
-                paper_data.get('url'),
-                paper_data.get('pdf_url'),
-                paper_data.get('doi'),
-                paper_data.get('dblp_key')
-            ))
-            conn.commit()
+            with self.transaction() as conn:
+                cursor = conn.execute(self._insert_sql('INSERT'), paper.to_row(PAPER_COLUMNS))
             paper_id = cursor.lastrowid
-            logger.info(f"插入论文: {paper_data.get('title')[:50]}...")
+            logger.info(f"插入论文: {paper.title[:50]}...")
             return paper_id
         except sqlite3.IntegrityError:
-            logger.debug(f"论文已存在: {paper_data.get('dblp_key')}")
+            logger.debug(f"论文已存在: {paper.natural_key()}")
             return None
         except Exception as e:
             logger.error(f"插入论文失败: {e}")
-            conn.rollback()
             return None
-        finally:
-            conn.close()
+    
+    def insert_papers(self, papers: Iterable[Union[Paper, Dict[str, Any]]],
+                      batch_size: int = 500) -> Dict[str, int]:
+        """
+        批量插入论文记录
+        
+        每批在一个事务中用 executemany 写入，已存在的记录被忽略。
+        
+        Args:
+            papers: 论文记录（Paper 或字典）的可迭代对象
+            batch_size: 每个事务写入的记录数
+            
+        Returns:
+            统计字典 {'inserted': 新插入数, 'duplicates': 已存在数, 'failed': 失败数}
+        """
+        counts = {'inserted': 0, 'duplicates': 0, 'failed': 0}
+        batch = []
+        
+        for paper in papers:
+            paper = Paper.coerce(paper)
+            if not paper.title or not paper.conference:
+                counts['failed'] += 1
+                continue
+            batch.append(paper.to_row(PAPER_COLUMNS))
+            if len(batch) >= batch_size:
+                self._insert_batch(batch, counts)
+                batch = []
+        
+        if batch:
+            self._insert_batch(batch, counts)
+        
+        logger.info(f"批量插入完成: 新增 {counts['inserted']}, "
+                    f"已存在 {counts['duplicates']}, 失败 {counts['failed']}")
+        return counts
+    
+    @staticmethod
+    def _insert_sql(verb: str = 'INSERT') -> str:
+        """生成INSERT语句"""
+        return (f"{verb} INTO papers ({', '.join(PAPER_COLUMNS)}) "
+                f"VALUES ({', '.join('?' for _ in PAPER_COLUMNS)})")
+    
+    def _insert_batch(self, rows: List[Tuple], counts: Dict[str, int]):
+        """在一个事务中写入一批记录，整批失败时逐条重试以定位坏数据"""
+        sql = self._insert_sql('INSERT OR IGNORE')
+        try:
+            with self.transaction() as conn:
+                inserted = conn.executemany(sql, rows).rowcount
+            counts['inserted'] += inserted
+            counts['duplicates'] += len(rows) - inserted
+            return
+        except sqlite3.Error as e:
+            logger.warning(f"批量插入失败，改为逐条插入: {e}")
+        
+        with self.transaction() as conn:
+            for row in rows:
+                try:
+                    with self.transaction():
+                        inserted = conn.execute(sql, row).rowcount
+                except sqlite3.Error as e:
+                    logger.error(f"插入论文失败: {row[1][:50]}... - {e}")
+                    counts['failed'] += 1
+                    continue
+                if inserted:
+                    counts['inserted'] += 1
+                else:
+                    counts['duplicates'] += 1
+    
+    def upsert_papers(self, papers: Iterable[Union[Paper, Dict[str, Any]]],
+                      batch_size: int = 500) -> Dict[str, int]:
+        """
+        按自然键(paper_key)增量写入论文
+        
+        新论文插入；已存在的论文仅在元数据指纹（meta_hash）变化时更新，
+        指纹相同的论文不执行任何写入。pdf_path、download_status、notes 等
+        本地字段保持不变。
+        
+        Args:
+            papers: 论文记录（Paper 或字典）的可迭代对象
+            batch_size: 每个事务写入的记录数
+            
+        Returns:
+            统计字典 {'added', 'changed', 'unchanged', 'failed'}
+        """
+        counts = {'added': 0, 'changed': 0, 'unchanged': 0, 'failed': 0}
+        batch = []
+        
+        for paper in papers:
+            paper = Paper.coerce(paper)
+            if not paper.title or not paper.conference:
+                counts['failed'] += 1
+                continue
+            batch.append(paper.to_row(PAPER_COLUMNS))
+            if len(batch) >= batch_size:
+                self._upsert_batch(batch, counts)
+                batch = []
+        
+        if batch:
+            self._upsert_batch(batch, counts)
+        
+        return counts
+    
+    @staticmethod
+    def _upsert_value(column: str) -> str:
+        """UPSERT时列的新值：列表页缺少而数据库中已补全的字段保留原值"""
+        if column not in ENRICHED_COLUMNS:
+            return f"excluded.{column}"
+        return (f"CASE WHEN {missing_sql(column, 'excluded')} AND NOT {missing_sql(column)} "
+                f"THEN papers.{column} ELSE excluded.{column} END")
+    
+    def _upsert_batch(self, rows: List[Tuple], counts: Dict[str, int]):
+        """在一个事务中UPSERT一批记录，元数据指纹未变的记录不写入"""
+        values = {column: self._upsert_value(column) for column in UPSERT_COLUMNS}
+        assignments = ", ".join(f"{column} = {value}" for column, value in values.items())
+        # 指纹不同但保留补全字段后各列不变时（旧记录的指纹含补全内容）只更新指纹
+        changed = " OR ".join(f"papers.{column} IS NOT {value}" for column, value in values.items())
+        sql = (f"{self._insert_sql('INSERT')} "
+               f"ON CONFLICT(paper_key) DO UPDATE SET {assignments}, meta_hash = excluded.meta_hash, "
+               f"updated_at = CASE WHEN {changed} THEN CURRENT_TIMESTAMP ELSE papers.updated_at END "
+               f"WHERE papers.meta_hash IS NOT excluded.meta_hash")
+        hash_index = PAPER_COLUMNS.index('meta_hash')
+        
+        # 先读后写：立即获取写锁，避免其他进程在读取之后提交导致写入时 database is locked
+        with self.transaction(immediate=True) as conn:
+            existing = self._existing_hashes(conn, [row[0] for row in rows])
+            pending = [row for row in rows if existing.get(row[0], '') != row[hash_index]]
+            added = len({row[0] for row in pending} - existing.keys())
+            try:
+                with self.transaction():
+                    touched = conn.executemany(sql, pending).rowcount if pending else 0
+            except sqlite3.Error as e:
+                logger.error(f"增量写入失败: {e}")
+                counts['failed'] += len(rows)
+                return
+        
+        counts['added'] += added
+        counts['changed'] += touched - added
+        counts['unchanged'] += len(rows) - touched
+    
+    @staticmethod
+    def _existing_hashes(conn: sqlite3.Connection, keys: List[str]) -> Dict[str, Optional[str]]:
+        """查询已存在于数据库中的paper_key及其元数据指纹"""
+        existing = {}
+        for i in range(0, len(keys), _MAX_SQL_VARIABLES):
+            chunk = keys[i:i + _MAX_SQL_VARIABLES]
+            placeholders = ','.join('?' for _ in chunk)
+            existing.update(conn.execute(
+                f"SELECT paper_key, meta_hash FROM papers WHERE paper_key IN ({placeholders})", chunk))
+        return existing
+    
+    def sync_papers(self, conference: str, year: int, papers: Iterable[Union[Paper, Dict[str, Any]]],
+                    prune: bool = False) -> Dict[str, int]:
+        """
+        用一次爬取结果增量刷新某会议某年份的论文
+        
+        Args:
+            conference: 会议名称
+            year: 年份
+            papers: 本次爬取到的论文
+            prune: 是否删除网站上已不存在的论文
+            
+        Returns:
+            统计字典 {'added', 'changed', 'unchanged', 'removed', 'failed'}，
+            prune=False 时 removed 表示数据库中多出、但未删除的论文数
+        """
+        unique = {}
+        for paper in papers:
+            paper = Paper.coerce(paper)
+            paper.paper_key = paper.natural_key()
+            unique.setdefault(paper.paper_key, paper)
+        
+        with self.transaction(immediate=True):
+            stale = self.stale_paper_keys(conference, year, unique)
+            
+            counts = self.upsert_papers(unique.values())
+            counts['removed'] = len(stale)
+            
+            if prune and stale:
+                self.delete_papers_by_keys(stale)
+        
+        return counts
+    
+    def stale_paper_keys(self, conference: str, year: int, seen) -> List[str]:
+        """
+        某会议某年份中不在本次爬取结果里的论文
+        
+        Args:
+            conference: 会议名称
+            year: 年份
+            seen: 本次爬取到的paper_key集合
+            
+        Returns:
+            数据库中多出的paper_key列表
+        """
+        conn = self._get_connection()
+        return [row[0] for row in conn.execute(
+            "SELECT paper_key FROM papers WHERE conference = ? AND year = ? AND paper_key IS NOT NULL",
+            (conference, year)) if row[0] not in seen]
+    
+    def delete_papers_by_keys(self, keys: List[str]) -> int:
+        """按paper_key删除论文，返回删除数量"""
+        deleted = 0
+        with self.transaction() as conn:
+            for i in range(0, len(keys), _MAX_SQL_VARIABLES):
+                chunk = keys[i:i + _MAX_SQL_VARIABLES]
+                placeholders = ','.join('?' for _ in chunk)
+                deleted += conn.execute(
+                    f"DELETE FROM papers WHERE paper_key IN ({placeholders})", chunk).rowcount
+        return deleted
+    
+    def delete_papers_by_conference(self, conferences: List[str]) -> int:
+        """删除指定会议的全部论文，返回删除数量"""
+        placeholders = ','.join('?' for _ in conferences)
+        with self.transaction() as conn:
+            return conn.execute(
+                f"DELETE FROM papers WHERE conference IN ({placeholders})", conferences).rowcount
+    
+    def count_by_year(self, conference: str) -> List[Tuple[int, int]]:
+        """统计某会议每年的论文数，按年份倒序"""
+        conn = self._get_connection()
+        return [(row[0] or None, row[1]) for row in conn.execute(
+            "SELECT year, SUM(paper_count) FROM paper_stats WHERE conference = ? GROUP BY year ORDER BY year DESC",
+            (conference,))]
     
     def update_paper(self, paper_id: int, update_data: Dict[str, Any]) -> bool:
         """
@@ -148,66 +990,136 @@ class DatabaseManager:
         if not update_data:
             return False
         
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        
         try:
             # 构建SET子句
             set_clause = ", ".join([f"{key} = ?" for key in update_data.keys()])
             set_clause += ", updated_at = CURRENT_TIMESTAMP"
             values = list(update_data.values()) + [paper_id]
             
-            cursor.execute(f"""
-                UPDATE papers SET {set_clause} WHERE id = ?
-            """, values)
+            with self.transaction() as conn:
+                conn.execute(f"""
+                    UPDATE papers SET {set_clause} WHERE id = ?
+                """, values)
             
-            conn.commit()
             logger.debug(f"更新论文ID {paper_id}")
             return True
         except Exception as e:
             logger.error(f"更新论文失败: {e}")
-            conn.rollback()
             return False
-        finally:
-            conn.close()
     
     def get_paper_by_id(self, paper_id: int) -> Optional[Dict[str, Any]]:
         """根据ID获取论文"""
         conn = self._get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM papers WHERE id = ?", (paper_id,))
-        row = cursor.fetchone()
-        conn.close()
+        row = conn.execute("SELECT * FROM papers WHERE id = ?", (paper_id,)).fetchone()
         return dict(row) if row else None
     
-    def get_papers_by_conference(self, conference: str, year: Optional[int] = None) -> List[Dict[str, Any]]:
+    def iter_papers(self, conference: Optional[str] = None, year: Optional[int] = None,
+                    status: Optional[str] = None, after_title: Optional[str] = None,
+                    after_id: Optional[int] = None, limit: Optional[int] = None,
+                    columns: str = '*', chunk_size: int = 500) -> Iterator[Dict[str, Any]]:
         """
-        根据会议名称获取论文列表
+        按 (title, id) 顺序流式读取论文，支持键集分页
         
         Args:
-            conference: 会议名称
+            conference: 会议名称（可选）
             year: 年份（可选）
+            status: 下载状态（可选）
+            after_title: 上一页最后一条的标题，与 after_id 一起使用
+            after_id: 上一页最后一条的ID
+            limit: 返回数量限制
+            columns: 查询的列
+            chunk_size: 每次从数据库读取的行数
             
+        Yields:
+            论文字典
+        """
+        where = []
+        params: List[Any] = []
+        if conference:
+            where.append("conference = ?")
+            params.append(conference)
+        if year:
+            where.append("year = ?")
+            params.append(year)
+        if status:
+            where.append("download_status = ?")
+            params.append(status)
+        if after_id is not None:
+            # 行值比较可直接利用 (title, id) 索引定位到下一页起点
+            where.append("(title, id) > (?, ?)")
+            params.extend([after_title or '', after_id])
+        elif after_title is not None:
+            where.append("title > ?")
+            params.append(after_title)
+        
+        query = f"SELECT {columns} FROM papers"
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        query += " ORDER BY title, id"
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        
+        cursor = self._get_connection().execute(query, params)
+        yield from iter_rows(cursor, chunk_size)
+    
+    def get_papers_page(self, conference: Optional[str] = None, year: Optional[int] = None,
+                        after_title: Optional[str] = None, after_id: Optional[int] = None,
+                        limit: int = 50) -> Tuple[List[Dict[str, Any]], Optional[Tuple[str, int]]]:
+        """
+        获取一页论文
+        
         Returns:
-            论文列表
+            (论文列表, 下一页游标 (after_title, after_id))，没有下一页时游标为None
         """
+        papers = list(self.iter_papers(conference, year, after_title=after_title,
+                                       after_id=after_id, limit=limit))
+        if len(papers) < limit:
+            return papers, None
+        return papers, (papers[-1]['title'], papers[-1]['id'])
+    
+    def iter_papers_by_conference(self, conference: str, year: Optional[int] = None,
+                                  chunk_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """根据会议名称流式读取论文，排序同 get_papers_by_conference"""
         conn = self._get_connection()
-        cursor = conn.cursor()
         
         if year:
-            cursor.execute(
+            cursor = conn.execute(
                 "SELECT * FROM papers WHERE conference = ? AND year = ? ORDER BY title",
                 (conference, year)
             )
         else:
-            cursor.execute(
+            cursor = conn.execute(
                 "SELECT * FROM papers WHERE conference = ? ORDER BY year DESC, title",
                 (conference,)
             )
         
-        rows = cursor.fetchall()
-        conn.close()
-        return [dict(row) for row in rows]
+        yield from iter_rows(cursor, chunk_size)
+    
+    def get_papers_by_conference(self, conference: str, year: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        根据会议名称获取论文列表
+        
+        Args:
+            conference: 会议名称
+            year: 年份（可选）
+            
+        Returns:
+            论文列表
+        """
+        return list(self.iter_papers_by_conference(conference, year))
+    
+    def iter_pending_downloads(self, limit: Optional[int] = None,
+                               chunk_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """流式读取待下载的论文"""
+        query = "SELECT * FROM papers WHERE download_status = 'pending' AND pdf_url IS NOT NULL"
+        params: List[Any] = []
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        
+        cursor = self._get_connection().execute(query, params)
+        yield from iter_rows(cursor, chunk_size)
     
     def get_pending_downloads(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
         """
@@ -219,88 +1131,446 @@ class DatabaseManager:
         Returns:
             待下载论文列表
         """
-        conn = self._get_connection()
-        cursor = conn.cursor()
+        return list(self.iter_pending_downloads(limit))
+    
+    def get_download_candidates(self, conference: Optional[str] = None, year: Optional[int] = None,
+                                limit: Optional[int] = None, recheck: bool = False,
+                                retry_parked: bool = False,
+                                limit_failed: bool = True) -> List[Dict[str, Any]]:
+        """
+        需要下载的论文（PDFDownloader.get_papers_to_download）
         
-        query = "SELECT * FROM papers WHERE download_status = 'pending' AND pdf_url IS NOT NULL"
-        if limit:
-            query += f" LIMIT {limit}"
+        只选取 download_status 为 pending 或 failed 的论文（走 download_status 索引），
+        pending 排在 failed 之前。url_sha256 为该链接之前下载到的内容哈希（pdf_blobs）。
         
-        cursor.execute(query)
-        rows = cursor.fetchall()
-        conn.close()
+        Args:
+            conference: 会议名称
+            year: 年份
+            limit: 返回数量限制
+            recheck: 同时选取已下载的论文
+            retry_parked: 同时选取被搁置的论文
+            limit_failed: limit 是否同样限制 failed 的论文。为False时失败过的论文全部返回，
+                由调用方按退避时间筛选后再截取（否则总是选中同一批尚未到时间的论文）
+        """
+        query = """
+            SELECT p.id, p.title, p.conference, p.year, p.pdf_url, p.pdf_sha256,
+                   p.download_status, b.pdf_sha256 AS url_sha256
+            FROM papers p LEFT JOIN pdf_blobs b ON b.pdf_url = p.pdf_url
+            WHERE p.pdf_url IS NOT NULL AND p.pdf_url != ''
+        """
+        params: List[Any] = []
+        if retry_parked and not recheck:
+            query += " AND p.download_status IN ('pending', 'failed', 'parked')"
+        elif not recheck:
+            query += " AND p.download_status IN ('pending', 'failed')"
+        if conference:
+            query += " AND p.conference = ?"
+            params.append(conference)
+        if year:
+            query += " AND p.year = ?"
+            params.append(year)
+        order = " ORDER BY p.download_status != 'pending', p.conference, p.year DESC, p.title"
+        conn = self._get_connection()
+        if not limit:
+            return [dict(row) for row in conn.execute(query + order, params)]
+        if limit_failed:
+            return [dict(row) for row in conn.execute(query + order + " LIMIT ?", params + [limit])]
+        
+        rows = conn.execute(query + " AND p.download_status != 'failed'" + order + " LIMIT ?",
+                            params + [limit]).fetchall()
+        rows += conn.execute(query + " AND p.download_status = 'failed'" + order, params).fetchall()
         return [dict(row) for row in rows]
     
-    def update_download_status(self, paper_id: int, status: str, pdf_path: Optional[str] = None, error_msg: Optional[str] = None):
+    def update_download_status(self, paper_id: int, status: str, pdf_path: Optional[str] = None,
+                               error_msg: Optional[str] = None, pdf_sha256: Optional[str] = None,
+                               pdf_size: Optional[int] = None, duration: Optional[float] = None,
+                               error_kind: Optional[str] = None):
         """
         更新下载状态
         
         Args:
             paper_id: 论文ID
-            status: 状态 (pending, downloading, completed, failed)
+            status: 状态，见 DOWNLOAD_STATUSES
             pdf_path: PDF文件路径
             error_msg: 错误信息
+            pdf_sha256: PDF内容的 SHA-256
+            pdf_size: PDF字节数
+            duration: 下载耗时（秒）
+            error_kind: 失败的类型（permanent / transient）
         """
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        
         try:
-            # 更新论文表
-            if pdf_path:
-                cursor.execute("""
-                    UPDATE papers 
-                    SET download_status = ?, pdf_path = ?, updated_at = CURRENT_TIMESTAMP
-                    WHERE id = ?
-                """, (status, pdf_path, paper_id))
-            else:
-                cursor.execute("""
-                    UPDATE papers 
-                    SET download_status = ?, updated_at = CURRENT_TIMESTAMP
-                    WHERE id = ?
-                """, (status, paper_id))
-            
-            # 插入下载日志
-            cursor.execute("""
-                INSERT INTO download_log (paper_id, status, error_message)
-                VALUES (?, ?, ?)
-            """, (paper_id, status, error_msg))
-            
-            conn.commit()
+            self.update_download_statuses([(paper_id, status, pdf_path, error_msg, None,
+                                            pdf_sha256, pdf_size, duration, error_kind)])
         except Exception as e:
             logger.error(f"更新下载状态失败: {e}")
-            conn.rollback()
-        finally:
-            conn.close()
     
-    def get_statistics(self) -> Dict[str, Any]:
-        """获取统计信息"""
+    def update_download_statuses(self, events: List[Tuple]):
+        """
+        在一个事务中批量更新下载状态并写入下载日志
+        
+        Args:
+            events: (paper_id, status, pdf_path, error_msg, attempt_time, pdf_sha256,
+                pdf_size, duration, error_kind) 元组列表。pdf_path/pdf_sha256/pdf_size 为None时保留原值，
+                attempt_time 为None时使用当前时间；状态为 downloaded 时同时记录下载时间
+        """
+        with self.transaction() as conn:
+            conn.executemany("""
+                UPDATE papers 
+                SET download_status = ?, pdf_path = COALESCE(?, pdf_path),
+                    pdf_sha256 = COALESCE(?, pdf_sha256), pdf_size = COALESCE(?, pdf_size),
+                    downloaded_at = CASE WHEN ? THEN COALESCE(?, CURRENT_TIMESTAMP)
+                                         ELSE downloaded_at END,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, [(status, pdf_path or None, pdf_sha256, pdf_size, status == 'downloaded',
+                   attempt_time, paper_id)
+                  for paper_id, status, pdf_path, _, attempt_time, pdf_sha256, pdf_size, _, _ in events])
+            self._remember_blobs(conn, [(event[0], event[5]) for event in events if event[5]])
+            
+            conn.executemany("""
+                INSERT INTO download_log (paper_id, status, error_message, attempt_time, bytes,
+                                          duration, error_kind)
+                VALUES (?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP), ?, ?, ?)
+            """, [(paper_id, status, error_msg, attempt_time, pdf_size, duration, error_kind)
+                  for paper_id, status, _, error_msg, attempt_time, _, pdf_size, duration, error_kind
+                  in events])
+    
+    @staticmethod
+    def _remember_blobs(conn: sqlite3.Connection, rows: List[Tuple[int, str]]):
+        """把论文当前的 pdf_url 和内容哈希记入 pdf_blobs，rows 为 (paper_id, pdf_sha256)"""
+        conn.executemany("""
+            INSERT INTO pdf_blobs (pdf_url, pdf_sha256)
+            SELECT pdf_url, ? FROM papers WHERE id = ? AND pdf_url IS NOT NULL AND pdf_url != ''
+            ON CONFLICT (pdf_url) DO UPDATE SET
+                pdf_sha256 = excluded.pdf_sha256, fetched_at = CURRENT_TIMESTAMP
+        """, [(digest, paper_id) for paper_id, digest in rows])
+    
+    def get_failure_history(self, paper_ids: List[int]) -> Dict[int, List[Tuple]]:
+        """
+        论文最近一次成功（或被搁置、重新排队）之后的连续失败记录
+        
+        Args:
+            paper_ids: 论文ID列表
+            
+        Returns:
+            {paper_id: [(attempt_time, error_kind, error_message), ...]}，按时间先后排列，
+            没有失败记录的论文不出现
+        """
         conn = self._get_connection()
-        cursor = conn.cursor()
+        history: Dict[int, List[Tuple]] = {}
+        for i in range(0, len(paper_ids), _MAX_SQL_VARIABLES):
+            chunk = paper_ids[i:i + _MAX_SQL_VARIABLES]
+            placeholders = ','.join('?' for _ in chunk)
+            rows = conn.execute(f"""
+                SELECT l.paper_id, l.attempt_time, l.error_kind, l.error_message
+                FROM download_log l
+                WHERE l.paper_id IN ({placeholders}) AND l.status = 'failed'
+                  AND l.id > IFNULL((SELECT MAX(s.id) FROM download_log s
+                                     WHERE s.paper_id = l.paper_id AND s.status != 'failed'), 0)
+                ORDER BY l.paper_id, l.id
+            """, chunk)
+            for paper_id, attempt_time, error_kind, error_message in rows:
+                history.setdefault(paper_id, []).append((attempt_time, error_kind, error_message))
+        return history
+    
+    def get_pdf_hashes(self) -> Dict[int, str]:
+        """已存入内容存储的论文，{paper_id: pdf_sha256}"""
+        return dict(self._get_connection().execute(
+            "SELECT id, pdf_sha256 FROM papers WHERE pdf_sha256 IS NOT NULL"))
+    
+    def link_pdf_blobs(self, rows: List[Tuple[int, str, str]]) -> int:
+        """
+        记录已存入内容存储的PDF（导入已有文件时使用，不写下载日志）
+        
+        Args:
+            rows: (paper_id, pdf_path, pdf_sha256, pdf_size) 列表
+            
+        Returns:
+            更新的论文数（论文已删除的行被忽略）
+        """
+        with self.transaction() as conn:
+            cursor = conn.executemany("""
+                UPDATE papers
+                SET pdf_path = ?, pdf_sha256 = ?, pdf_size = ?, download_status = 'downloaded',
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, [(pdf_path, digest, size, paper_id) for paper_id, pdf_path, digest, size in rows])
+            updated = cursor.rowcount
+            self._remember_blobs(conn, [(row[0], row[2]) for row in rows])
+            return updated
+    
+    def get_conference_years(self) -> List[Tuple[str, Optional[int]]]:
+        """数据库中的全部 (会议, 年份)（走 idx_conference_year 索引）"""
+        return [tuple(row) for row in self._get_connection().execute(
+            "SELECT DISTINCT conference, year FROM papers")]
+    
+    def get_download_rows(self, conference: str, year: Optional[int]) -> List[Tuple]:
+        """一个 (会议, 年份) 中有下载链接的论文，(id, download_status, pdf_path, pdf_size) 列表"""
+        return [tuple(row) for row in self._get_connection().execute("""
+            SELECT id, download_status, pdf_path, pdf_size FROM papers
+            WHERE conference = ? AND year IS ? AND pdf_url IS NOT NULL AND pdf_url != ''
+        """, (conference, year))]
+    
+    def get_dir_scans(self) -> Dict[str, Optional[int]]:
+        """上次扫描时的目录 mtime，{目录: mtime_ns}"""
+        return dict(self._get_connection().execute("SELECT directory, mtime_ns FROM pdf_dir_scans"))
+    
+    def apply_dir_scan(self, updates: List[Tuple], directories: List[Tuple[str, Optional[int]]]):
+        """
+        在一个事务中写入扫描结果（不写下载日志）
         
-        # 总论文数
-        cursor.execute("SELECT COUNT(*) as total FROM papers")
-        total = cursor.fetchone()['total']
+        Args:
+            updates: (paper_id, download_status, pdf_path, pdf_size) 列表，只含有变化的论文
+            directories: 本次扫描的 (目录, mtime_ns) 列表
+        """
+        with self.transaction() as conn:
+            conn.executemany("""
+                UPDATE papers
+                SET download_status = ?, pdf_path = ?, pdf_size = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, [(status, pdf_path, pdf_size, paper_id)
+                  for paper_id, status, pdf_path, pdf_size in updates])
+            conn.executemany("""
+                INSERT INTO pdf_dir_scans (directory, mtime_ns) VALUES (?, ?)
+                ON CONFLICT (directory) DO UPDATE SET
+                    mtime_ns = excluded.mtime_ns, scanned_at = CURRENT_TIMESTAMP
+            """, directories)
+    
+    def get_enrichment_candidates(self, conferences: List[str], retry: bool = False,
+                                  max_attempts: int = 3,
+                                  limit: Optional[int] = None) -> List[Tuple[int, str, str]]:
+        """
+        需要访问详情页补全字段的论文
         
-        # 按会议统计
-        cursor.execute("""
-            SELECT conference, COUNT(*) as count 
-            FROM papers 
-            GROUP BY conference
-        """)
-        by_conference = {row['conference']: row['count'] for row in cursor.fetchall()}
+        有详情页URL且缺少摘要、PDF链接或DOI中任一项的论文。已访问过同一URL的论文
+        （补全成功或页面上没有这些字段）跳过，请求失败的论文最多重试 max_attempts 次。
+        
+        Args:
+            conferences: 会议名称列表
+            retry: 忽略补全日志，重新访问所有缺少字段的论文
+            max_attempts: 请求失败的最多尝试次数
+            limit: 返回数量限制
+            
+        Returns:
+            (paper_id, 会议名称, 详情页URL) 列表，按ID排序
+        """
+        if not conferences:
+            return []
+        missing = " OR ".join(missing_sql(column, 'p') for column in ENRICHED_COLUMNS)
+        query = f"""
+            SELECT p.id, p.conference, p.url FROM papers p
+            LEFT JOIN enrichment_log e ON e.paper_id = p.id
+            WHERE p.conference IN ({','.join('?' for _ in conferences)})
+              AND COALESCE(p.url, '') != '' AND ({missing})
+        """
+        params: List[Any] = list(conferences)
+        if not retry:
+            query += """
+              AND (e.paper_id IS NULL OR e.url IS NOT p.url
+                   OR (e.status = 'failed' AND e.attempts < ?))
+            """
+            params.append(max_attempts)
+        query += " ORDER BY p.id"
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        
+        conn = self._get_connection()
+        return [tuple(row) for row in conn.execute(query, params)]
+    
+    def apply_enrichment(self, results: List[Tuple]) -> int:
+        """
+        在一个事务中写入一批详情页补全结果
         
-        # 下载状态统计
-        cursor.execute("""
-            SELECT download_status, COUNT(*) as count 
-            FROM papers 
-            GROUP BY download_status
+        只填写仍然缺失的字段，已有的值不会被覆盖。
+        
+        Args:
+            results: (paper_id, url, status, fields, error_msg) 元组列表，
+                status 为 enriched/empty/failed，fields 为 {'abstract', 'pdf_url', 'doi'} 中找到的字段
+                
+        Returns:
+            实际更新的论文数
+        """
+        assignments = ", ".join(
+            f"{column} = CASE WHEN {missing_sql(column)} THEN COALESCE(:{column}, {column}) "
+            f"ELSE {column} END" for column in ENRICHED_COLUMNS)
+        fills = " OR ".join(f"(:{column} IS NOT NULL AND {missing_sql(column)})"
+                            for column in ENRICHED_COLUMNS)
+        
+        with self.transaction() as conn:
+            updated = conn.executemany(
+                f"UPDATE papers SET {assignments}, updated_at = CURRENT_TIMESTAMP "
+                f"WHERE id = :id AND ({fills})",
+                [dict({column: fields.get(column) for column in ENRICHED_COLUMNS}, id=paper_id)
+                 for paper_id, _, status, fields, _ in results if fields]).rowcount
+            
+            conn.executemany("""
+                INSERT INTO enrichment_log (paper_id, url, status, fields, error_message, attempts)
+                VALUES (?, ?, ?, ?, ?, 1)
+                ON CONFLICT(paper_id) DO UPDATE SET
+                    url = excluded.url, status = excluded.status, fields = excluded.fields,
+                    error_message = excluded.error_message,
+                    attempts = CASE WHEN enrichment_log.url IS excluded.url
+                                    THEN enrichment_log.attempts + 1 ELSE 1 END,
+                    attempt_time = CURRENT_TIMESTAMP
+            """, [(paper_id, url, status, ','.join(fields) or None, error_msg)
+                  for paper_id, url, status, fields, error_msg in results])
+        return max(updated, 0)
+    
+    def register_crawl_jobs(self, targets: List[Tuple[str, int]], reset: bool = False):
+        """
+        在作业日志中登记爬取目标
+        
+        Args:
+            targets: (会议名称, 年份) 列表
+            reset: 把已登记的目标重置为待爬取（开始新一轮完整爬取），否则保留原状态
+        """
+        with self.transaction() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO crawl_jobs (conference, year) VALUES (?, ?)", targets)
+            if reset:
+                conn.executemany("""
+                    UPDATE crawl_jobs SET state = 'pending', attempts = 0, worker = NULL,
+                        error_message = NULL
+                    WHERE conference = ? AND year = ?
+                """, targets)
+    
+    def claim_crawl_job(self, worker: str, targets: Iterable[Tuple[str, int]], max_attempts: int = 3,
+                        lease: float = 3600) -> Optional[Tuple[str, int]]:
+        """
+        领取一个待爬取的目标并标记为 running
+        
+        可领取的目标: pending；failed 且尝试次数未达上限；running 但属于本工作进程
+        （上次运行中断）或开始时间已超过租期（其他进程已退出）。在 IMMEDIATE 事务中
+        完成选择和标记，多个进程同时领取也不会拿到同一目标。
+        
+        Args:
+            worker: 工作进程名称
+            targets: 本进程负责的 (会议名称, 年份) 范围
+            max_attempts: failed 目标的最多尝试次数
+            lease: running 目标的租期（秒）
+            
+        Returns:
+            (会议名称, 年份)，没有可领取的目标时返回None
+        """
+        targets = set(targets)
+        with self.transaction(immediate=True) as conn:
+            rows = conn.execute("""
+                SELECT conference, year FROM crawl_jobs
+                WHERE state = 'pending'
+                   OR (state = 'failed' AND attempts < ?)
+                   OR (state = 'running' AND (worker = ? OR started_at <= datetime('now', ?)))
+                ORDER BY attempts, conference, year
+            """, (max_attempts, worker, f"-{int(lease)} seconds")).fetchall()
+            job = next(((row[0], row[1]) for row in rows if (row[0], row[1]) in targets), None)
+            if job is not None:
+                conn.execute("""
+                    UPDATE crawl_jobs SET state = 'running', worker = ?, attempts = attempts + 1,
+                        started_at = strftime('%Y-%m-%d %H:%M:%f', 'now'), finished_at = NULL, duration = NULL,
+                        error_message = NULL
+                    WHERE conference = ? AND year = ?
+                """, (worker, *job))
+        return job
+    
+    def finish_crawl_job(self, conference: str, year: int, worker: str, ok: bool,
+                         content_hash: Optional[str] = None, paper_count: Optional[int] = None,
+                         error_msg: Optional[str] = None) -> bool:
+        """
+        记录目标的爬取结果
+        
+        Args:
+            conference: 会议名称
+            year: 年份
+            worker: 领取该目标的工作进程名称
+            ok: 是否成功（done），否则为 failed
+            content_hash: 页面内容的哈希，None 时保留原值
+            paper_count: 写入的论文数，None 时保留原值
+            error_msg: 错误信息
+            
+        Returns:
+            是否记录成功；目标已因租期过期被其他进程领取时返回False
+        """
+        with self.transaction() as conn:
+            return conn.execute("""
+                UPDATE crawl_jobs SET state = ?, content_hash = COALESCE(?, content_hash),
+                    paper_count = COALESCE(?, paper_count), error_message = ?,
+                    finished_at = CURRENT_TIMESTAMP,
+                    duration = (julianday('now') - julianday(started_at)) * 86400
+                WHERE conference = ? AND year = ? AND state = 'running' AND worker = ?
+            """, ('done' if ok else 'failed', content_hash, paper_count, error_msg,
+                  conference, year, worker)).rowcount > 0
+    
+    def get_unchanged_candidates(self) -> Dict[Tuple[str, int], Tuple[str, int]]:
+        """
+        可以按页面哈希跳过解析的目标
+        
+        上次成功写入过论文、且数据库中该会议年份的论文数不少于当时写入数的目标
+        （论文被手动删除后需要重新解析）。
+        
+        Returns:
+            {(会议名称, 年份): (页面哈希, 论文数)}
+        """
+        rows = self._get_connection().execute("""
+            SELECT j.conference, j.year, j.content_hash, j.paper_count FROM crawl_jobs j
+            WHERE j.content_hash IS NOT NULL AND j.paper_count > 0
+              AND j.paper_count <= (SELECT IFNULL(SUM(s.paper_count), 0) FROM paper_stats s
+                                    WHERE s.conference = j.conference AND s.year = j.year)
         """)
-        by_status = {row['download_status']: row['count'] for row in cursor.fetchall()}
+        return {(row[0], row[1]): (row[2], row[3]) for row in rows}
+    
+    def get_crawl_jobs(self, state: Optional[str] = None) -> List[Dict[str, Any]]:
+        """作业日志中的目标，按会议和年份排序"""
+        query = "SELECT * FROM crawl_jobs"
+        params: List[Any] = []
+        if state:
+            query += " WHERE state = ?"
+            params.append(state)
+        query += " ORDER BY conference, year"
+        return [dict(row) for row in self._get_connection().execute(query, params)]
+    
+    def get_stats_groups(self) -> List[Dict[str, Any]]:
+        """
+        读取统计表的全部分组
         
-        conn.close()
+        Returns:
+            每项包含 conference, year, download_status, paper_count, with_pdf_url
+        """
+        conn = self._get_connection()
+        rows = conn.execute("""
+            SELECT conference, year, download_status, paper_count, with_pdf_url
+            FROM paper_stats
+            ORDER BY conference, year DESC, download_status
+        """).fetchall()
+        groups = []
+        for row in rows:
+            group = dict(row)
+            group['year'] = group['year'] or None
+            group['download_status'] = group['download_status'] or None
+            groups.append(group)
+        return groups
+    
+    def get_statistics(self) -> Dict[str, Any]:
+        """获取统计信息（读取触发器维护的统计表，耗时与分组数成正比）"""
+        total = 0
+        with_pdf_url = 0
+        by_conference: Dict[str, int] = {}
+        by_conference_year: Dict[str, Dict[Optional[int], int]] = {}
+        by_status: Dict[Optional[str], int] = {}
+        
+        for group in self.get_stats_groups():
+            count = group['paper_count']
+            total += count
+            with_pdf_url += group['with_pdf_url']
+            conference = group['conference']
+            by_conference[conference] = by_conference.get(conference, 0) + count
+            years = by_conference_year.setdefault(conference, {})
+            years[group['year']] = years.get(group['year'], 0) + count
+            by_status[group['download_status']] = by_status.get(group['download_status'], 0) + count
         
         return {
             'total': total,
+            'with_pdf_url': with_pdf_url,
             'by_conference': by_conference,
+            'by_conference_year': by_conference_year,
             'by_status': by_status
         }
@@ -0,0 +1,134 @@
+"""
+按主机调度下载任务 - 每个主机独立排队，限制并发和请求间隔，主机之间并行
+
+下载线程从调度器领取任务，调度器只交出已就绪主机的任务：该主机正在进行的
+下载数低于并发上限，且限速器不需要等待。一个主机被限速时，线程转而处理其他
+主机的任务，而不是阻塞在 RateLimiter.acquire() 中。
+"""
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Optional
+
+from utils.rate_limiter import CircuitOpenError, RateLimiter, lookup_host
+
+
+class Task:
+    """调度器交出的一个任务"""
+    
+    __slots__ = ('url', 'host', 'item', 'error')
+    
+    def __init__(self, url: str, host: str, item: Any):
+        self.url = url
+        self.host = host
+        self.item = item
+        # 主机熔断时为 CircuitOpenError，任务未预约请求，调用方应直接跳过
+        self.error: Optional[Exception] = None
+
+
+class HostScheduler:
+    """
+    线程安全的按主机任务调度器
+    
+    用法:
+        scheduler = HostScheduler(rate_limiter, max_per_host=2)
+        for paper in papers:
+            scheduler.add(paper['pdf_url'], paper)
+        
+        # 每个下载线程
+        while True:
+            task = scheduler.get()
+            if task is None:
+                break
+            try:
+                download(task.item)   # 第一个请求已由调度器预约，不必再 acquire
+            finally:
+                scheduler.done(task)
+    """
+    
+    def __init__(self, rate_limiter: RateLimiter, max_per_host: int = 2,
+                 host_limits: Optional[Dict[str, int]] = None):
+        """
+        Args:
+            rate_limiter: 限速器，控制每个主机的请求间隔
+            max_per_host: 未单独配置的主机同时进行的最多下载数
+            host_limits: {主机名后缀: 并发上限}
+        """
+        self.rate_limiter = rate_limiter
+        self.max_per_host = max_per_host
+        self.host_limits = {host.lower(): limit for host, limit in (host_limits or {}).items()}
+        # 主机 -> 待处理任务，按轮转顺序排列
+        self._pending: 'OrderedDict[str, Deque[Task]]' = OrderedDict()
+        self._active: Dict[str, int] = {}
+        self._cond = threading.Condition()
+    
+    def limit(self, host: str) -> int:
+        """主机的并发上限"""
+        return lookup_host(self.host_limits, host, self.max_per_host)
+    
+    def add(self, url: str, item: Any):
+        """加入一个任务"""
+        host = self.rate_limiter.host_of(url)
+        with self._cond:
+            self._pending.setdefault(host, deque()).append(Task(url, host, item))
+            self._cond.notify()
+    
+    def pending(self) -> int:
+        """尚未交出的任务数"""
+        with self._cond:
+            return sum(len(tasks) for tasks in self._pending.values())
+    
+    def get(self) -> Optional[Task]:
+        """
+        领取下一个就绪的任务，必要时等待
+        
+        交出任务前已为它向限速器预约了一个请求。
+        
+        Returns:
+            任务；没有待处理和进行中的任务时返回None
+        """
+        with self._cond:
+            while True:
+                if not self._pending:
+                    if not any(self._active.values()):
+                        return None
+                    # 进行中的任务可能重新加入队列，等它们结束
+                    self._cond.wait()
+                    continue
+                
+                wait = None
+                for host, tasks in self._pending.items():
+                    if self._active.get(host, 0) >= self.limit(host):
+                        continue
+                    delay = self.rate_limiter.ready_in(tasks[0].url)
+                    if delay > 0:
+                        wait = delay if wait is None else min(wait, delay)
+                        continue
+                    return self._dispatch(host)
+                
+                # 所有主机都在并发上限或限速等待中
+                self._cond.wait(wait)
+    
+    def _dispatch(self, host: str) -> Task:
+        """从主机队列取出一个任务并预约请求（调用方持有锁）"""
+        tasks = self._pending[host]
+        task = tasks.popleft()
+        if tasks:
+            # 轮转到队尾，让其他就绪主机先被选中
+            self._pending.move_to_end(host)
+        else:
+            del self._pending[host]
+        try:
+            self.rate_limiter.reserve(task.url)
+        except CircuitOpenError as e:
+            task.error = e
+            return task
+        self._active[host] = self._active.get(host, 0) + 1
+        return task
+    
+    def done(self, task: Task):
+        """任务结束（无论成功与否），释放该主机的并发名额"""
+        if task.error is not None:
+            return
+        with self._cond:
+            self._active[task.host] -= 1
+            self._cond.notify_all()
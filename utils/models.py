@@ -0,0 +1,152 @@
+"""
+数据模型 - 论文记录
+"""
+import hashlib
+import json
+import re
+import sys
+import unicodedata
+from typing import Optional, Dict, Any, Tuple, Union, Mapping
+
+_EPRINT_PATTERN = re.compile(r'eprint\.iacr\.org/(\d{4})/(\d+)')
+
+# 可能以列表形式出现、入库时用 "; " 连接的字段
+_LIST_FIELDS = ('authors', 'keywords', 'affiliations')
+
+
+def _normalize_title(title: str) -> str:
+    """标题规范化：兼容字符折叠、忽略大小写和标点"""
+    title = unicodedata.normalize('NFKD', title or '').casefold()
+    title = re.sub(r'[^\w\s]', ' ', title)
+    return ' '.join(title.split())
+
+
+class Paper:
+    """
+    论文记录
+    
+    爬虫、数据库和导出器之间统一传递的数据类型。使用 __slots__ 代替字典，
+    大批量回填时每条记录的内存占用约为同等字典的几分之一；会议名称经过
+    sys.intern，同一会议的所有记录共享一个字符串对象。
+    """
+    
+    # 字段顺序即 to_json 的输出顺序
+    FIELDS = (
+        'id', 'paper_key', 'title', 'authors', 'abstract', 'year', 'conference',
+        'url', 'pdf_url', 'eprint_url', 'slides_url', 'video_url', 'doi', 'dblp_key',
+        'keywords', 'affiliations', 'pdf_path', 'download_status', 'notes',
+        'created_at', 'updated_at'
+    )
+    
+    __slots__ = FIELDS
+    
+    # 来自会议网站的元数据字段，metadata_hash 的计算范围
+    METADATA_FIELDS = (
+        'title', 'authors', 'abstract', 'year', 'conference', 'url', 'pdf_url',
+        'eprint_url', 'slides_url', 'video_url', 'doi', 'keywords', 'affiliations'
+    )
+    
+    def __init__(self, title: str, conference: str, year: Optional[int] = None, **fields):
+        """
+        创建论文记录
+        
+        Args:
+            title: 标题
+            conference: 会议名称
+            year: 年份
+            **fields: 其他字段，必须是 FIELDS 中的名称
+        """
+        for name in self.FIELDS:
+            object.__setattr__(self, name, None)
+        self.title = title
+        self.conference = sys.intern(conference) if conference else conference
+        self.year = year
+        for name, value in fields.items():
+            if name not in self.FIELDS:
+                raise TypeError(f"Paper 没有字段 {name!r}")
+            if name in _LIST_FIELDS and isinstance(value, (list, tuple)):
+                value = '; '.join(value)
+            setattr(self, name, value)
+    
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> 'Paper':
+        """从字典创建，忽略未知的键"""
+        fields = {name: data[name] for name in cls.FIELDS
+                  if name in data and name not in ('title', 'conference', 'year')}
+        return cls(data.get('title'), data.get('conference'), data.get('year'), **fields)
+    
+    @classmethod
+    def from_row(cls, row: Mapping[str, Any]) -> 'Paper':
+        """从 sqlite3.Row 或查询结果字典创建，忽略 FIELDS 以外的列"""
+        keys = row.keys()
+        fields = {name: row[name] for name in cls.FIELDS
+                  if name in keys and name not in ('title', 'conference', 'year')}
+        return cls(row['title'], row['conference'], row['year'] if 'year' in keys else None, **fields)
+    
+    @classmethod
+    def coerce(cls, paper: Union['Paper', Mapping[str, Any]]) -> 'Paper':
+        """把字典统一转换为 Paper，已是 Paper 时原样返回"""
+        return paper if isinstance(paper, Paper) else cls.from_dict(paper)
+    
+    def to_row(self, columns: Tuple[str, ...]) -> Tuple:
+        """
+        按列顺序生成数据库参数元组
+        
+        Args:
+            columns: 列名元组，paper_key 为空时自动生成，meta_hash 总是按当前字段计算
+        """
+        return tuple(self.natural_key() if name == 'paper_key'
+                     else self.metadata_hash() if name == 'meta_hash'
+                     else getattr(self, name) for name in columns)
+    
+    def to_json(self) -> Dict[str, Any]:
+        """转换为可直接 json.dump 的字典"""
+        return {name: getattr(self, name) for name in self.FIELDS}
+    
+    def get(self, name: str, default: Any = None) -> Any:
+        """与 dict.get 相同的访问方式，值为None时返回默认值"""
+        value = getattr(self, name, None)
+        return default if value is None else value
+    
+    def natural_key(self) -> str:
+        """
+        论文的稳定自然键
+        
+        优先级: 已有paper_key > DOI > IACR eprint编号 > 规范化(标题+会议+年份)的哈希
+        
+        Returns:
+            形如 doi:10.1007/... / eprint:2025/123 / title:<sha1> 的键
+        """
+        if self.paper_key:
+            return self.paper_key
+        
+        doi = (self.doi or '').strip().lower()
+        if doi:
+            doi = re.sub(r'^https?://(dx\.)?doi\.org/', '', doi)
+            return f"doi:{doi}"
+        
+        for url in (self.eprint_url, self.url, self.pdf_url):
+            match = _EPRINT_PATTERN.search(url or '')
+            if match:
+                return f"eprint:{match.group(1)}/{int(match.group(2))}"
+        
+        raw = f"{_normalize_title(self.title)}|{self.conference}|{self.year}"
+        return "title:" + hashlib.sha1(raw.encode('utf-8')).hexdigest()
+    
+    def metadata_hash(self) -> str:
+        """
+        元数据指纹：METADATA_FIELDS 的值相同时相同
+        
+        增量刷新时与数据库中保存的指纹比较，只有元数据确有变化的论文才需要UPDATE。
+        """
+        values = [getattr(self, name) for name in self.METADATA_FIELDS]
+        raw = json.dumps(values, ensure_ascii=False, separators=(',', ':'))
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+    
+    def __eq__(self, other):
+        if not isinstance(other, Paper):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.FIELDS)
+    
+    def __repr__(self):
+        return f"Paper(title={self.title!r}, conference={self.conference!r}, year={self.year!r})"
@@ -0,0 +1,239 @@
+"""
+按主机限速 - 令牌桶、带抖动的指数退避、Retry-After 和熔断
+
+爬虫（同步和异步）和PDF下载器共用同一个 RateLimiter 实例，
+对同一站点的所有请求合计不超过该站点配置的速率。
+"""
+import asyncio
+import logging
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# 需要退避重试的HTTP状态码
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# 默认的站点速率（请求/秒, 突发量），按主机名后缀匹配
+DEFAULT_HOST_RATES: Dict[str, Tuple[float, int]] = {
+    'eprint.iacr.org': (1.0, 2),
+    'iacr.org': (2.0, 2),
+    'usenix.org': (1.0, 2),
+    'ndss-symposium.org': (1.0, 2),
+    'ieee-security.org': (1.0, 2),
+    'sigsac.org': (1.0, 2),
+}
+
+
+class CircuitOpenError(Exception):
+    """站点连续失败次数过多，熔断期间拒绝请求"""
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    解析 Retry-After 响应头
+    
+    Args:
+        value: 秒数或HTTP日期
+    
+    Returns:
+        需要等待的秒数，无法解析时返回None
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def parse_host_rates(items, convert: Callable[[str], Any] = float) -> Dict[str, Any]:
+    """
+    解析命令行的 "HOST=VALUE" 列表
+    
+    Args:
+        items: 如 ["eprint.iacr.org=0.5"]
+        convert: 值的类型转换，如并发数用 int
+    """
+    rates = {}
+    for item in items or ():
+        host, _, rate = item.rpartition('=')
+        rates[host.strip().lower()] = convert(rate)
+    return rates
+
+
+def lookup_host(table: Mapping[str, Any], host: str, default: Any = None) -> Any:
+    """按主机名后缀查找配置，最长的后缀优先（a.iacr.org 先查 a.iacr.org，再查 iacr.org）"""
+    labels = host.split('.')
+    for i in range(len(labels)):
+        value = table.get('.'.join(labels[i:]))
+        if value is not None:
+            return value
+    return default
+
+
+class _HostState:
+    """单个主机的令牌桶和熔断状态"""
+    
+    __slots__ = ('rate', 'burst', 'tokens', 'updated', 'blocked_until', 'failures', 'open_until')
+    
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.failures = 0
+        self.open_until = 0.0
+
+
+class RateLimiter:
+    """
+    线程安全的按主机令牌桶限速器
+    
+    reserve() 立即扣除一个令牌并返回调用方需要等待的时间（令牌可以透支，
+    并发调用方因此自动排队）；acquire() / acquire_async() 在此基础上等待。
+    请求结果通过 record_success() / record_failure() 反馈，连续失败达到
+    阈值时熔断该主机，冷却后放行一个探测请求。
+    """
+    
+    def __init__(self, default_rate: float = 2.0, default_burst: int = 2,
+                 host_rates: Optional[Dict[str, Union[float, Tuple[float, int]]]] = None,
+                 backoff_base: float = 1.0, backoff_max: float = 60.0,
+                 failure_threshold: int = 5, cooldown: float = 60.0):
+        """
+        初始化限速器
+        
+        Args:
+            default_rate: 未单独配置的主机的速率（请求/秒）
+            default_burst: 默认突发量
+            host_rates: {主机名后缀: 速率 或 (速率, 突发量)}，覆盖 DEFAULT_HOST_RATES
+            backoff_base: 指数退避的基础延迟（秒）
+            backoff_max: 退避延迟上限（秒）
+            failure_threshold: 触发熔断的连续失败次数
+            cooldown: 熔断持续时间（秒）
+        """
+        self.default_rate = default_rate
+        self.default_burst = default_burst
+        self.host_rates: Dict[str, Tuple[float, int]] = dict(DEFAULT_HOST_RATES)
+        for host, rate in (host_rates or {}).items():
+            self.host_rates[host.lower()] = rate if isinstance(rate, tuple) else (rate, default_burst)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._hosts: Dict[str, _HostState] = {}
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def host_of(url: str) -> str:
+        """URL对应的主机名"""
+        return (urlsplit(url).hostname or '').lower()
+    
+    def _policy(self, host: str) -> Tuple[float, int]:
+        """按主机名后缀查找速率配置"""
+        return lookup_host(self.host_rates, host, (self.default_rate, self.default_burst))
+    
+    def _state(self, host: str) -> _HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _HostState(*self._policy(host))
+        return state
+    
+    def reserve(self, url: str) -> float:
+        """
+        预约一次请求
+        
+        Returns:
+            需要等待的秒数
+        
+        Raises:
+            CircuitOpenError: 主机处于熔断期
+        """
+        host = self.host_of(url)
+        with self._lock:
+            state = self._state(host)
+            now = time.monotonic()
+            if state.open_until > now:
+                raise CircuitOpenError(f"{host} 熔断中，{state.open_until - now:.0f}s 后重试")
+            if state.failures >= self.failure_threshold:
+                # 半开状态：放行这一个探测请求，结果返回前其余请求继续被拒绝
+                state.open_until = now + self.cooldown
+            
+            if state.rate > 0:
+                state.tokens = min(state.burst, state.tokens + (now - state.updated) * state.rate)
+                state.updated = now
+                state.tokens -= 1
+                wait = -state.tokens / state.rate if state.tokens < 0 else 0.0
+            else:
+                wait = 0.0
+            return max(wait, state.blocked_until - now)
+    
+    def ready_in(self, url: str) -> float:
+        """
+        距离该主机可以不等待地发送下一个请求的秒数，不扣除令牌
+        
+        调度器据此挑选已就绪的主机，熔断状态由随后的 reserve() 判断。
+        """
+        host = self.host_of(url)
+        with self._lock:
+            state = self._state(host)
+            now = time.monotonic()
+            wait = state.blocked_until - now
+            if state.rate > 0:
+                tokens = min(state.burst, state.tokens + (now - state.updated) * state.rate)
+                wait = max(wait, (1 - tokens) / state.rate)
+            return max(wait, 0.0)
+    
+    def acquire(self, url: str):
+        """阻塞直到可以发送请求"""
+        wait = self.reserve(url)
+        if wait > 0:
+            time.sleep(wait)
+    
+    async def acquire_async(self, url: str):
+        """异步等待直到可以发送请求"""
+        wait = self.reserve(url)
+        if wait > 0:
+            await asyncio.sleep(wait)
+    
+    def backoff_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        第 attempt 次失败后的重试延迟（从0计数）
+        
+        优先使用服务器给出的 Retry-After，否则为带完全抖动的指数退避。
+        """
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+    
+    def defer(self, url: str, delay: float):
+        """推迟该主机的所有后续请求（用于 429/503 的 Retry-After）"""
+        host = self.host_of(url)
+        with self._lock:
+            state = self._state(host)
+            state.blocked_until = max(state.blocked_until, time.monotonic() + delay)
+    
+    def record_success(self, url: str):
+        """请求成功，重置失败计数并关闭熔断"""
+        with self._lock:
+            state = self._state(self.host_of(url))
+            state.failures = 0
+            state.open_until = 0.0
+    
+    def record_failure(self, url: str):
+        """请求失败（网络错误或可重试状态码），连续失败达到阈值时熔断"""
+        host = self.host_of(url)
+        with self._lock:
+            state = self._state(host)
+            state.failures += 1
+            if state.failures >= self.failure_threshold:
+                state.open_until = time.monotonic() + self.cooldown
+                logger.warning(f"{host} 连续失败 {state.failures} 次，熔断 {self.cooldown:.0f}s")
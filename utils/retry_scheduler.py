@@ -0,0 +1,167 @@
+"""
+下载失败的重试调度 - 根据 download_log 中的连续失败记录决定论文何时再试
+
+失败分为两类：
+- permanent：HTTP 4xx（408/425/429 除外）、返回的不是PDF（错误页面、登录页）。
+  链接多半已失效，隔较长时间再确认一次，仍然失败就搁置（parked）
+- transient：5xx、超时、连接中断、传输不完整。按指数退避重试，连续失败
+  max_failures 次后搁置
+站点熔断时跳过的论文记为 skipped，不计入失败次数。
+
+搁置的论文不再被自动选中，用 download --retry-parked 重新排队。
+"""
+import heapq
+import itertools
+import re
+import time
+from datetime import datetime, timezone
+from typing import Any, List, Optional, Tuple
+
+PERMANENT = 'permanent'
+TRANSIENT = 'transient'
+SKIPPED = 'skipped'
+
+# 4xx 中可能自行恢复的状态码
+_TRANSIENT_CLIENT_STATUSES = frozenset({408, 425, 429})
+
+_HTTP_STATUS = re.compile(r'HTTP (\d{3})\b')
+
+
+def classify_error(message: Optional[str]) -> str:
+    """
+    按 PDFDownloader 记录的错误信息判断失败的类型
+    
+    "HTTP <状态码>" 中的 4xx（408/425/429 除外）和 "不是PDF文件" 为 permanent，
+    其余（5xx、超时、连接错误、传输不完整）为 transient。
+    """
+    message = message or ''
+    match = _HTTP_STATUS.match(message)
+    if match:
+        status = int(match.group(1))
+        if 400 <= status < 500 and status not in _TRANSIENT_CLIENT_STATUSES:
+            return PERMANENT
+        return TRANSIENT
+    if message.startswith('不是PDF文件'):
+        return PERMANENT
+    return TRANSIENT
+
+
+def parse_attempt_time(value: Optional[str]) -> float:
+    """download_log.attempt_time（UTC，'YYYY-MM-DD HH:MM:SS'）转换为时间戳，无法解析时为0"""
+    try:
+        return datetime.strptime(value[:19], '%Y-%m-%d %H:%M:%S').replace(
+            tzinfo=timezone.utc).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class RetryScheduler:
+    """
+    按失败历史排序的下载优先队列
+    
+    每篇论文按失败历史算出最早可重试的时间，未到时间的论文在等待队列中
+    （按时间排序），到时间后进入就绪队列。就绪队列按 (连续失败次数, 可重试时间)
+    排序：从未失败的论文最先，失败次数少的先于失败次数多的。
+    
+    用法:
+        retry = RetryScheduler()
+        history = db.get_failure_history([paper['id'] for paper in papers])
+        for paper in papers:
+            reason = retry.add(paper, history.get(paper['id'], []))
+            if reason:
+                ...                       # 记为 parked
+        due = retry.pop_due()             # 已到重试时间的论文，按优先级排列
+        retry.next_due()                  # 等待中的论文最早何时可以重试
+    """
+    
+    def __init__(self, base_delay: float = 1800.0, max_delay: float = 7 * 86400.0,
+                 permanent_delay: float = 86400.0, max_failures: int = 8,
+                 max_permanent: int = 2):
+        """
+        Args:
+            base_delay: 第一次临时性失败后的等待时间（秒），之后每次失败翻倍
+            max_delay: 临时性失败的最长等待时间（秒）
+            permanent_delay: 永久性失败后再确认一次前的等待时间（秒）
+            max_failures: 连续失败多少次后搁置
+            max_permanent: 连续失败中有多少次永久性错误后搁置
+        """
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.permanent_delay = permanent_delay
+        self.max_failures = max_failures
+        self.max_permanent = max_permanent
+        # (可重试时间, 序号, 失败次数, 论文)
+        self._waiting: List[Tuple[float, int, int, Any]] = []
+        # (失败次数, 可重试时间, 序号, 论文)
+        self._ready: List[Tuple[int, float, int, Any]] = []
+        self._seq = itertools.count()
+    
+    def plan(self, history: List[Tuple]) -> Tuple[int, float, Optional[str]]:
+        """
+        按一篇论文的连续失败记录计算下次可以重试的时间
+        
+        Args:
+            history: [(attempt_time, error_kind, error_message), ...]，按时间先后排列；
+                error_kind 为空的旧记录按错误信息分类
+        
+        Returns:
+            (失败次数, 可重试的时间戳, 搁置原因)；应搁置时原因不为None
+        """
+        failures = [(attempt_time, kind or classify_error(message), message)
+                    for attempt_time, kind, message in history if kind != SKIPPED]
+        if not failures:
+            return 0, 0.0, None
+        
+        attempt_time, kind, message = failures[-1]
+        permanent = sum(1 for _, k, _ in failures if k == PERMANENT)
+        if permanent >= self.max_permanent:
+            return len(failures), 0.0, f"{permanent} 次永久性错误: {(message or '')[:200]}"
+        if len(failures) >= self.max_failures:
+            return len(failures), 0.0, f"连续失败 {len(failures)} 次: {(message or '')[:200]}"
+        
+        if kind == PERMANENT:
+            delay = self.permanent_delay
+        else:
+            delay = min(self.max_delay, self.base_delay * 2 ** (len(failures) - 1))
+        return len(failures), parse_attempt_time(attempt_time) + delay, None
+    
+    def push(self, item: Any, failures: int = 0, not_before: float = 0.0):
+        """加入一个任务，not_before 之前不会被取出"""
+        heapq.heappush(self._waiting, (not_before, next(self._seq), failures, item))
+    
+    def add(self, item: Any, history: List[Tuple]) -> Optional[str]:
+        """
+        按失败历史加入一篇论文
+        
+        Returns:
+            应搁置时返回原因，论文不加入队列；否则为None
+        """
+        failures, not_before, reason = self.plan(history)
+        if reason is None:
+            self.push(item, failures, not_before)
+        return reason
+    
+    def _promote(self, now: float):
+        """把已到时间的任务移入就绪队列"""
+        while self._waiting and self._waiting[0][0] <= now:
+            not_before, seq, failures, item = heapq.heappop(self._waiting)
+            heapq.heappush(self._ready, (failures, not_before, seq, item))
+    
+    def pop(self, now: Optional[float] = None) -> Optional[Any]:
+        """取出优先级最高的已到时间的任务，没有时返回None"""
+        self._promote(time.time() if now is None else now)
+        if not self._ready:
+            return None
+        return heapq.heappop(self._ready)[-1]
+    
+    def pop_due(self, now: Optional[float] = None) -> List[Any]:
+        """取出全部已到时间的任务，按优先级排列"""
+        self._promote(time.time() if now is None else now)
+        return [heapq.heappop(self._ready)[-1] for _ in range(len(self._ready))]
+    
+    def next_due(self) -> Optional[float]:
+        """等待中的任务最早可以取出的时间戳，没有等待中的任务时为None"""
+        return self._waiting[0][0] if self._waiting else None
+    
+    def __len__(self) -> int:
+        return len(self._waiting) + len(self._ready)
@@ -0,0 +1,201 @@
+"""
+下载状态写入队列 - 后台线程批量写入下载状态和下载日志
+"""
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional, List, Tuple
+
+from utils.database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+# 队列中的停止标记
+_STOP = object()
+
+
+class _Waiter:
+    """等待一批事件提交的线程；提交最终失败时 error 为最后一次的异常"""
+    
+    __slots__ = ('event', 'error')
+    
+    def __init__(self):
+        self.event = threading.Event()
+        self.error: Optional[Exception] = None
+    
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """等待提交完成，返回是否在超时前完成；提交失败时抛出该异常"""
+        if not self.event.wait(timeout):
+            return False
+        if self.error is not None:
+            raise self.error
+        return True
+
+
+class DownloadStatusRecorder:
+    """
+    下载状态的写后缓冲（write-behind）
+    
+    下载线程调用 record() 把事件放入队列后立即返回，单个写入线程按数量或时间阈值
+    合并成一个事务提交，避免每个PDF一次加锁和一次fsync。提交遇到锁冲突时退避重试，
+    仍然失败时该批事件被丢弃，错误交给正在等待的 record(wait=True) 和 flush()。
+    
+    用法:
+        with DownloadStatusRecorder(db) as recorder:
+            recorder.record(paper_id, 'downloaded', pdf_path)
+            recorder.record(paper_id, 'failed', error_msg=msg, wait=True)   # 提交后返回
+    """
+    
+    def __init__(self, db: DatabaseManager, batch_size: int = 200, flush_interval: float = 1.0,
+                 max_pending: int = 10000, max_retries: int = 5, retry_delay: float = 0.2):
+        """
+        初始化写入队列并启动写入线程
+        
+        Args:
+            db: 数据库管理器
+            batch_size: 累计多少条事件提交一次
+            flush_interval: 最长多少秒提交一次
+            max_pending: 队列容量，写入跟不上时 record() 会阻塞
+            max_retries: 提交遇到锁冲突（database is locked）等操作错误时的最多重试次数
+            retry_delay: 第一次重试前的等待时间（秒），之后每次翻倍
+        """
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_pending)
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='download-status-writer', daemon=True)
+        self._thread.start()
+    
+    def record(self, paper_id: int, status: str, pdf_path: Optional[str] = None,
+               error_msg: Optional[str] = None, pdf_sha256: Optional[str] = None,
+               pdf_size: Optional[int] = None, duration: Optional[float] = None,
+               error_kind: Optional[str] = None, wait: bool = False):
+        """
+        记录一次下载状态变化
+        
+        Args:
+            paper_id: 论文ID
+            status: 状态，见 utils.database.DOWNLOAD_STATUSES
+            pdf_path: PDF文件路径
+            error_msg: 错误信息
+            pdf_sha256: PDF内容的 SHA-256
+            pdf_size: PDF字节数
+            duration: 下载耗时（秒）
+            error_kind: 失败的类型（permanent / transient）
+            wait: 阻塞到事件所在批次提交后才返回（多个线程的事件仍合并为一次提交）
+        
+        Raises:
+            Exception: wait 为True且重试后仍提交失败时，抛出写入线程遇到的异常
+        """
+        if self._closed:
+            raise RuntimeError("DownloadStatusRecorder 已关闭")
+        
+        # 记录事件发生的时间，而不是写入数据库的时间
+        attempt_time = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        event = (paper_id, status, pdf_path, error_msg, attempt_time, pdf_sha256, pdf_size,
+                 duration, error_kind)
+        
+        if not wait:
+            self._queue.put((event, None))
+            return
+        
+        waiter = _Waiter()
+        self._queue.put((event, waiter))
+        waiter.wait()
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待此前记录的所有事件写入数据库
+        
+        Returns:
+            是否在超时前完成
+        
+        Raises:
+            Exception: 最后一批事件重试后仍提交失败时，抛出写入线程遇到的异常
+        """
+        waiter = _Waiter()
+        self._queue.put((None, waiter))
+        return waiter.wait(timeout)
+    
+    def close(self):
+        """写入剩余事件并停止写入线程"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+    
+    def _run(self):
+        """写入线程主循环"""
+        batch: List[Tuple] = []
+        waiters: List[_Waiter] = []
+        deadline = None
+        
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            
+            stop = item is _STOP
+            if item is not None and not stop:
+                event, done = item
+                if event is not None:
+                    batch.append(event)
+                if done is not None:
+                    waiters.append(done)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+            
+            # 提交条件: 停止 / 到达时间阈值 / 达到批量 / 有线程在等待且队列已取空（组提交）
+            if (stop or item is None or len(batch) >= self.batch_size
+                    or (waiters and self._queue.empty())):
+                error = self._commit(batch)
+                for waiter in waiters:
+                    waiter.error = error
+                    waiter.event.set()
+                batch, waiters, deadline = [], [], None
+            
+            if stop:
+                self.db.close_thread_connection()
+                return
+    
+    def _commit(self, batch: List[Tuple]) -> Optional[Exception]:
+        """
+        提交一批事件，锁冲突等操作错误按指数退避重试
+        
+        Returns:
+            重试后仍失败时为最后一次的异常（该批事件被丢弃），否则为None
+        """
+        if not batch:
+            return None
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.db.update_download_statuses(batch)
+                logger.debug(f"写入 {len(batch)} 条下载状态")
+                return None
+            except sqlite3.OperationalError as e:
+                if attempt == self.max_retries:
+                    error = e
+                    break
+                delay = self.retry_delay * 2 ** attempt
+                logger.warning(f"批量写入下载状态失败 ({len(batch)} 条)，{delay:.1f} 秒后重试: {e}")
+                time.sleep(delay)
+            except Exception as e:
+                error = e
+                break
+        logger.error(f"批量写入下载状态失败，丢弃 {len(batch)} 条: {error}")
+        return error